@@ -20,4 +20,27 @@ def create_app(config_class=Config):
     from app.views import main
     app.register_blueprint(main)
     
+    from app.api import api
+    app.register_blueprint(api)
+    
+    from app.services.cache import init_report_cache
+    init_report_cache(app)
+    
+    from app.utils.ocr_cache import init_ocr_cache
+    from app.utils.ocr import init_ocr_client
+    init_ocr_cache(app)
+    init_ocr_client(app)
+    
+    from app.services.ocr_jobs import init_ocr_jobs
+    init_ocr_jobs(app)
+    
+    from app.services.import_jobs import init_import_jobs
+    init_import_jobs(app)
+    
+    from app.services.summary import rebuild_summary_command
+    app.cli.add_command(rebuild_summary_command)
+    
+    from app.services.holdings import rebuild_holdings_command
+    app.cli.add_command(rebuild_holdings_command)
+    
     return app
@@ -0,0 +1,115 @@
+from datetime import date
+
+from flask import Blueprint, request, jsonify, current_app
+
+from app.services.reports import (
+    income_statement_report, balance_sheet_report, cash_flow_report,
+    expense_analysis_report, dashboard_report, comparison_report, financial_health_report,
+    financial_health_trend_report, net_worth_curve_report
+)
+from app.services.holdings import net_worth_as_of
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+def to_json(value):
+    """将报表字典转换为可JSON序列化的结构：日期转为ISO字符串，查询结果行转为字典"""
+    if hasattr(value, '_asdict'):
+        return to_json(value._asdict())
+    if isinstance(value, dict):
+        return {str(key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, range)):
+        return [to_json(item) for item in value]
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def conditional_json(payload):
+    """
+    返回带ETag的JSON响应；请求的 If-None-Match 与ETag一致时返回304，不再传输数据
+    Cache-Control: no-cache 让浏览器每次都带上ETag重新验证
+    """
+    response = jsonify(to_json(payload))
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+
+@api.route('/income_statement', methods=['GET'])
+def income_statement():
+    """收入利润表数据"""
+    return conditional_json(income_statement_report(
+        request.args.get('year'), request.args.get('period_type', 'all')
+    ))
+
+
+@api.route('/balance_sheet', methods=['GET'])
+def balance_sheet():
+    """资产负债表数据"""
+    return conditional_json(balance_sheet_report(
+        request.args.get('year'), request.args.get('period_type', 'all')
+    ))
+
+
+@api.route('/net_worth', methods=['GET'])
+def net_worth():
+    """各持有项截至某日的余额与净资产，参数 date 为 YYYY-MM-DD，缺省或无效时为今天"""
+    try:
+        as_of = date.fromisoformat(request.args.get('date', ''))
+    except ValueError:
+        as_of = date.today()
+    return conditional_json(net_worth_as_of(as_of))
+
+
+@api.route('/net_worth_curve', methods=['GET'])
+def net_worth_curve():
+    """净资产曲线数据：指定 year 时为该年逐日，否则为全部历史逐月"""
+    return conditional_json(net_worth_curve_report(request.args.get('year')))
+
+
+@api.route('/cash_flow', methods=['GET'])
+def cash_flow():
+    """现金流量表数据"""
+    return conditional_json(cash_flow_report(
+        request.args.get('year'), request.args.get('period_type', 'all')
+    ))
+
+
+@api.route('/expense_analysis', methods=['GET'])
+def expense_analysis():
+    """支出分析数据"""
+    return conditional_json(expense_analysis_report(request.args.get('year')))
+
+
+@api.route('/dashboard', methods=['GET'])
+def dashboard():
+    """仪表盘数据"""
+    return conditional_json(dashboard_report(request.args.get('year'), request.args.get('month')))
+
+
+@api.route('/comparison_chart', methods=['GET'])
+def comparison_chart():
+    """历年收入支出结余对比数据"""
+    return conditional_json(comparison_report())
+
+
+@api.route('/financial_health', methods=['GET'])
+def financial_health():
+    """财务健康指标与得分"""
+    return conditional_json(financial_health_report(request.args.get('year')))
+
+
+@api.route('/financial_health/trend', methods=['GET'])
+def financial_health_trend():
+    """历年财务健康指标与得分"""
+    return conditional_json(financial_health_trend_report())
+
+
+@api.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """报表缓存命中/未命中计数（当前进程）"""
+    cache = current_app.extensions.get('report_cache')
+    if cache is None:
+        return jsonify({'backend': None})
+    return jsonify(cache.stats())
@@ -8,4 +8,30 @@ class Config:
         'sqlite:///' + os.path.join(basedir, '../family_finance.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     UPLOAD_FOLDER = os.path.join(basedir, '../uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = 1024 * 1024 * 1024  # 1GB max file size（大文件自动使用流式导入）
+    IMPORT_CHUNK_SIZE = 5000  # CSV批量导入每批写入的行数
+    STREAM_IMPORT_CHUNK_ROWS = 20000  # CSV流式导入每次读取并提交的行数
+    STREAM_IMPORT_THRESHOLD = 16 * 1024 * 1024  # 超过此大小的CSV自动改用流式导入，不整体读入内存
+    IMPORT_MAX_WORKERS = 1  # 同时在后台执行的流式导入任务数（SQLite同一时间只允许一个写事务）
+    IMPORT_JOB_LEASE = 10 * 60  # 导入中的任务超过此秒数未提交新的数据块才视为所在进程已退出、可以续传
+    DATA_LIST_PAGE_SIZE = 50  # 数据列表每页默认行数
+    OCR_API_URL = os.environ.get('OCR_API_URL') or 'http://localhost:1234/v1/chat/completions'  # 本地OCR模型服务地址
+    OCR_MAX_WORKERS = 4  # 批量图像OCR的最大并发请求数（也是HTTP连接池大小）
+    OCR_CONNECT_TIMEOUT = 3.05  # 连接OCR服务的超时秒数
+    OCR_READ_TIMEOUT = 180  # 等待模型返回结果的超时秒数
+    OCR_MAX_RETRIES = 2  # 连接失败或服务返回429/502/503/504时的重试次数
+    OCR_RETRY_BACKOFF = 0.5  # 重试退避的基准秒数（指数增长并加随机抖动）
+    OCR_BREAKER_THRESHOLD = 3  # 连续失败多少次后熔断，直接拒绝OCR请求
+    OCR_BREAKER_RESET_TIMEOUT = 30  # 熔断后多少秒放行一次试探请求
+    OCR_STREAM = True  # 后台识别时以流式方式接收模型输出，边接收边解析并推送到进度页面
+    OCR_JOB_LEASE = 30 * 60  # 识别中的任务超过此秒数未更新才视为所在进程已退出、可被其他进程重新执行（需大于单个任务的最长耗时）
+    OCR_PREVIEW_TTL = 24 * 3600  # 识别结果预览的有效秒数，过期未确认导入的批次需重新上传
+    OCR_IMAGE_MAX_EDGE = 1600  # 上传给模型前图像最长边的像素上限，0表示上传原图（不做预处理）
+    OCR_IMAGE_FORMAT = 'JPEG'  # 预处理后的编码格式：'JPEG' 或 'WEBP'
+    OCR_IMAGE_QUALITY = 80  # 预处理后的编码质量（1-95）
+    OCR_IMAGE_GRAYSCALE = True  # 图像基本无彩色时转为灰度
+    OCR_CACHE_MAX_BYTES = 50 * 1024 * 1024  # OCR结果磁盘缓存的大小上限，0表示关闭缓存
+    OCR_CACHE_PATH = os.environ.get('OCR_CACHE_PATH')  # OCR缓存文件，默认位于实例目录 instance/ocr_cache.db
+    REPORT_CACHE_BACKEND = os.environ.get('REPORT_CACHE_BACKEND') or 'memory'  # 报表缓存后端：'memory'、'sqlite' 或 'none'
+    REPORT_CACHE_SIZE = 256  # 报表缓存最多保留的条目数（LRU淘汰）
+    REPORT_CACHE_PATH = os.path.join(basedir, '../report_cache.db')  # sqlite后端的缓存文件
@@ -1,5 +1,6 @@
 from app import db
 from datetime import datetime
+from sqlalchemy import event
 
 class Income(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -11,6 +12,13 @@ class Income(db.Model):
     description = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # 报表按日期区间+期间类型、类别、来源过滤；索引包含金额，年度汇总可只读索引
+    __table_args__ = (
+        db.Index('ix_income_date_period_type', 'date', 'period_type', 'category', 'amount'),
+        db.Index('ix_income_category_date', 'category', 'date', 'period_type', 'amount'),
+        db.Index('ix_income_source_date', 'source', 'date'),
+    )
+
     def __repr__(self):
         return f'<Income {self.id}: {self.category} - {self.amount}>'
 
@@ -24,9 +32,32 @@ class Expense(db.Model):
     description = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # 报表按日期区间+期间类型、类别、支付人过滤；索引包含金额，年度汇总可只读索引
+    __table_args__ = (
+        db.Index('ix_expense_date_period_type', 'date', 'period_type', 'category', 'amount'),
+        db.Index('ix_expense_category_date', 'category', 'date', 'period_type', 'amount'),
+        db.Index('ix_expense_payer_date', 'payer', 'date'),
+    )
+
     def __repr__(self):
         return f'<Expense {self.id}: {self.category} - {self.amount}>'
 
+class Holding(db.Model):
+    """资产或负债持有项，按 (名称, 类型, 所有者) 区分；各快照记录通过 holding_id 关联，按日期构成余额历史"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # asset / liability
+    name = db.Column(db.String(100), nullable=False)
+    type = db.Column(db.String(50), nullable=False)
+    owner = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'name', 'type', 'owner', name='uq_holding_key'),
+    )
+
+    def __repr__(self):
+        return f'<Holding {self.id}: {self.kind} {self.name} - {self.owner}>'
+
 class Asset(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -37,6 +68,15 @@ class Asset(db.Model):
     period_type = db.Column(db.String(10), nullable=False, default='monthly')  # 'monthly' 或 'annual'
     description = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    holding_id = db.Column(db.Integer, db.ForeignKey('holding.id'))  # 所属持有项，导入和编辑时维护
+
+    # 报表按更新日期+期间类型、所有者过滤，并按(名称, 类型, 所有者)取最新快照；余额历史按持有项、日期顺序读取
+    __table_args__ = (
+        db.Index('ix_asset_update_date_period_type', 'update_date', 'period_type', 'type', 'amount'),
+        db.Index('ix_asset_holding_update_date', 'name', 'type', 'owner', 'update_date'),
+        db.Index('ix_asset_owner_update_date', 'owner', 'update_date'),
+        db.Index('ix_asset_holding_id_update_date', 'holding_id', 'update_date', 'id', 'amount'),
+    )
 
     def __repr__(self):
         return f'<Asset {self.id}: {self.name} - {self.amount}>'
@@ -51,6 +91,154 @@ class Liability(db.Model):
     period_type = db.Column(db.String(10), nullable=False, default='monthly')  # 'monthly' 或 'annual'
     description = db.Column(db.String(200))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    holding_id = db.Column(db.Integer, db.ForeignKey('holding.id'))  # 所属持有项，导入和编辑时维护
+
+    # 报表按更新日期+期间类型、所有者过滤，并按(名称, 类型, 所有者)取最新快照；余额历史按持有项、日期顺序读取
+    __table_args__ = (
+        db.Index('ix_liability_update_date_period_type', 'update_date', 'period_type', 'type', 'amount'),
+        db.Index('ix_liability_holding_update_date', 'name', 'type', 'owner', 'update_date'),
+        db.Index('ix_liability_owner_update_date', 'owner', 'update_date'),
+        db.Index('ix_liability_holding_id_update_date', 'holding_id', 'update_date', 'id', 'amount'),
+    )
 
     def __repr__(self):
         return f'<Liability {self.id}: {self.name} - {self.amount}>'
+
+class ImportJob(db.Model):
+    """CSV流式导入任务，记录已提交的字节偏移量以便中断后续传"""
+    id = db.Column(db.Integer, primary_key=True)
+    data_type = db.Column(db.String(20), nullable=False)  # income / expense / asset / liability
+    filename = db.Column(db.String(200), nullable=False)  # 用户上传时的文件名
+    file_path = db.Column(db.String(300), nullable=False)  # 上传目录中保存的文件
+    file_size = db.Column(db.BigInteger, nullable=False, default=0)
+    byte_offset = db.Column(db.BigInteger, nullable=False, default=0)  # 已提交数据的结束位置
+    rows_imported = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending'、'running'、'failed' 或 'completed'
+    error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def progress(self):
+        """已导入的字节比例（0-100）"""
+        if not self.file_size:
+            return 0
+        return min(self.byte_offset / self.file_size * 100, 100)
+
+    def __repr__(self):
+        return f'<ImportJob {self.id}: {self.filename} - {self.status}>'
+
+class OCRJob(db.Model):
+    """后台OCR识别任务，同一次上传的图像属于同一批次；进程重启后未完成的任务会继续执行"""
+    id = db.Column(db.Integer, primary_key=True)
+    batch_id = db.Column(db.String(32), nullable=False, index=True)
+    filename = db.Column(db.String(200), nullable=False)  # 用户上传时的文件名
+    file_path = db.Column(db.String(300), nullable=False)  # 上传目录中保存的图像，识别结束后删除
+    report_month = db.Column(db.String(7), nullable=False)  # YYYY-MM
+    data_type = db.Column(db.String(20), nullable=False)  # income / expense
+    owner = db.Column(db.String(50), nullable=False)
+    use_cache = db.Column(db.Boolean, nullable=False, default=True)
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)  # 'pending'、'running'、'failed' 或 'completed'
+    result = db.Column(db.Text)  # analyze_bank_report 的结果（JSON）
+    error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def __repr__(self):
+        return f'<OCRJob {self.id}: {self.filename} - {self.status}>'
+
+class MonthlySummary(db.Model):
+    """按月预汇总的流水金额，导入、编辑、删除时增量维护，报表直接读取"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # income / expense / asset / liability
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    category = db.Column(db.String(50), nullable=False)  # 收支类别或资产/负债类型
+    person = db.Column(db.String(50), nullable=False)  # 来源/支付人/所有者
+    period_type = db.Column(db.String(10), nullable=False, default='monthly')
+    total = db.Column(db.Float, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('kind', 'year', 'month', 'category', 'person', 'period_type',
+                            name='uq_monthly_summary_key'),
+    )
+
+    def __repr__(self):
+        return f'<MonthlySummary {self.kind} {self.year}-{self.month}: {self.category} - {self.total}>'
+
+# 支出分析大类：(键, 显示名称)，未在分类规则中列出的类别归为消费
+EXPENSE_BUCKETS = [
+    ('rent_mortgage', '房租房贷'),
+    ('repayments', '还款'),
+    ('consumption', '消费')
+]
+
+DEFAULT_EXPENSE_CLASSIFICATION = {
+    '房租': 'rent_mortgage',
+    '房贷': 'rent_mortgage',
+    '房租房贷': 'rent_mortgage',
+    '还款': 'repayments',
+    '转账给他人': 'repayments',
+    '转账给自己': 'repayments'
+}
+
+class ExpenseClassification(db.Model):
+    """支出类别到分析大类的映射，供支出分析在SQL中分组"""
+    id = db.Column(db.Integer, primary_key=True)
+    category = db.Column(db.String(50), nullable=False, unique=True)
+    bucket = db.Column(db.String(20), nullable=False)  # 'rent_mortgage'、'repayments' 或 'consumption'
+
+    def __repr__(self):
+        return f'<ExpenseClassification {self.category} -> {self.bucket}>'
+
+@event.listens_for(ExpenseClassification.__table__, 'after_create')
+def seed_expense_classification(target, connection, **kw):
+    """新建表时写入默认分类规则"""
+    connection.execute(target.insert(), [
+        {'category': category, 'bucket': bucket}
+        for category, bucket in DEFAULT_EXPENSE_CLASSIFICATION.items()
+    ])
+
+class DataVersion(db.Model):
+    """全局数据版本号，任何写入流水或分析规则的操作都会加一，报表缓存据此判断是否失效"""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # 修改或删除已有流水时另外加一（只追加新流水时不变），列式流水快照据此判断能否按id水位增量刷新
+    rewrite_version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<DataVersion {self.version}>'
+
+@event.listens_for(DataVersion.__table__, 'after_create')
+def seed_data_version(target, connection, **kw):
+    """新建表时写入唯一的版本号行"""
+    connection.execute(target.insert(), [{'id': 1, 'version': 0}])
+
+# 家庭设置的默认值（键 -> 字符串值），取值的解析与校验见 app/services/settings.py
+DEFAULT_SETTINGS = {
+    'annual_savings_goal': '120000'
+}
+
+class Setting(db.Model):
+    """家庭设置（键值对），如年度储蓄目标；修改时数据版本号加一，报表随之重新计算"""
+    id = db.Column(db.Integer, primary_key=True)
+    key = db.Column(db.String(50), nullable=False, unique=True)
+    value = db.Column(db.String(200), nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Setting {self.key}={self.value}>'
+
+@event.listens_for(Setting.__table__, 'after_create')
+def seed_settings(target, connection, **kw):
+    """新建表时写入默认设置"""
+    connection.execute(target.insert(), [
+        {'key': key, 'value': value}
+        for key, value in DEFAULT_SETTINGS.items()
+    ])
@@ -0,0 +1,128 @@
+from collections import namedtuple
+from datetime import date, datetime
+
+from app import db
+from app.models import Income, Expense, Asset, Liability, MonthlySummary
+
+# 各数据类型对应的模型及日期、类别、人员列
+LEDGERS = {
+    'income': (Income, Income.date, Income.category, Income.source),
+    'expense': (Expense, Expense.date, Expense.category, Expense.payer),
+    'asset': (Asset, Asset.update_date, Asset.type, Asset.owner),
+    'liability': (Liability, Liability.update_date, Liability.type, Liability.owner)
+}
+
+DIMENSIONS = ('year', 'month', 'category', 'owner')
+
+# 汇总结果：未参与分组的维度为None；kind 只在同时汇总多种数据类型并按其分组时有值
+Rollup = namedtuple('Rollup', ('kind',) + DIMENSIONS + ('total', 'count'), defaults=(None,) * 5 + (0, 0))
+
+
+def year_bounds(year):
+    """返回年份对应的日期区间 [当年1月1日, 次年1月1日)"""
+    return date(year, 1, 1), date(year + 1, 1, 1)
+
+
+def month_bounds(year, month):
+    """返回月份对应的日期区间 [当月1日, 次月1日)"""
+    if month == 12:
+        return date(year, 12, 1), date(year + 1, 1, 1)
+    return date(year, month, 1), date(year, month + 1, 1)
+
+
+def filter_by_year(query, date_column, year, period_type='all', period_column=None, month=None):
+    """
+    在SQL中按年份（日期区间）和期间类型过滤，兼容SQLite和PostgreSQL，可使用日期列索引
+    :param query: 待过滤的查询
+    :param date_column: 日期列，如 Income.date、Asset.update_date
+    :param year: 年份
+    :param period_type: 'all'、'monthly' 或 'annual'
+    :param period_column: 期间类型列
+    :param month: 月份（可选），指定时只保留该月
+    :return: 过滤后的查询
+    """
+    start, end = year_bounds(year) if month is None else month_bounds(year, month)
+    query = query.filter(date_column >= start, date_column < end)
+    if period_type != 'all' and period_column is not None:
+        query = query.filter(period_column == period_type)
+    return query
+
+
+def latest_data_year(*date_columns):
+    """返回给定日期列中最新数据所在的年份，若无数据则为当前年份"""
+    latest_dates = [db.session.query(db.func.max(column)).scalar() for column in date_columns]
+    latest_dates = [d for d in latest_dates if d is not None]
+    return max(latest_dates).year if latest_dates else datetime.now().year
+
+
+def rollup(kind, year=None, month=None, period_type='all', group_by=DIMENSIONS):
+    """
+    按维度 GROUP BY 汇总金额和笔数，读取增量维护的月度汇总表（见 app/services/summary.py），
+    不扫描流水表
+    :param kind: 数据类型："income"、"expense"、"asset"或"liability"，也可为多种数据类型的元组（一次查询）
+    :param year: 年份（可选），指定时只汇总该年
+    :param month: 月份（可选），需与year一起使用
+    :param period_type: 'all'、'monthly' 或 'annual'
+    :param group_by: 分组维度，取自 ('year', 'month', 'category', 'owner')，汇总多种数据类型时可加 'kind'
+    :return: Rollup列表，按各组首次出现的顺序排列
+    """
+    dimensions = {
+        'kind': MonthlySummary.kind,
+        'year': MonthlySummary.year,
+        'month': MonthlySummary.month,
+        'category': MonthlySummary.category,
+        'owner': MonthlySummary.person
+    }
+    group_columns = [dimensions[name] for name in group_by]
+
+    query = db.session.query(
+        *[column.label(name) for name, column in zip(group_by, group_columns)],
+        db.func.sum(MonthlySummary.total).label('total'),
+        db.func.sum(MonthlySummary.count).label('count')
+    )
+    if isinstance(kind, str):
+        query = query.filter(MonthlySummary.kind == kind)
+    else:
+        query = query.filter(MonthlySummary.kind.in_(kind))
+    if year is not None:
+        query = query.filter(MonthlySummary.year == year)
+        if month is not None:
+            query = query.filter(MonthlySummary.month == month)
+    if period_type != 'all':
+        query = query.filter(MonthlySummary.period_type == period_type)
+
+    if group_columns:
+        query = query.group_by(*group_columns).order_by(db.func.min(MonthlySummary.id))
+
+    return [
+        Rollup(**{name: row._mapping[name] for name in group_by},
+               total=row.total or 0, count=row.count or 0)
+        for row in query
+    ]
+
+
+def totals_by(rollups, dimension):
+    """将汇总结果按某一维度合并为 {维度值: 金额} 字典（保持顺序）"""
+    totals = {}
+    for item in rollups:
+        key = getattr(item, dimension)
+        totals[key] = totals.get(key, 0) + item.total
+    return totals
+
+
+def grand_total(rollups):
+    """汇总结果的金额合计"""
+    return sum(item.total for item in rollups)
+
+
+def ledger_rows(kind, year, period_type='all'):
+    """
+    查询某年的明细行，只取报表需要的列，不构造ORM实例
+    :return: 行列表，日期列统一为 date，其余列沿用模型中的列名（如 category/type、source/payer/owner、name）
+    """
+    model, date_column, category_column, owner_column = LEDGERS[kind]
+    columns = [model.id, date_column.label('date'), category_column, model.amount, owner_column]
+    if hasattr(model, 'name'):
+        columns.append(model.name)
+    query = filter_by_year(db.session.query(*columns), date_column, year, period_type, model.period_type)
+    return query.order_by(model.id).all()
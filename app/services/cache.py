@@ -0,0 +1,194 @@
+import functools
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+from app import db
+from app.models import DataVersion
+
+
+def current_data_version():
+    """读取全局数据版本号"""
+    return db.session.query(DataVersion.version).filter(DataVersion.id == 1).scalar() or 0
+
+
+def bump_data_version(rewrite=False):
+    """
+    数据版本号加一，使所有报表缓存失效；与数据写入在同一事务中，调用方负责提交
+    :param rewrite: 本次写入修改或删除了已有的收支流水（而不只是追加）时为True
+    """
+    values = {'version': DataVersion.version + 1}
+    if rewrite:
+        values['rewrite_version'] = DataVersion.rewrite_version + 1
+    updated = db.session.execute(
+        db.update(DataVersion).where(DataVersion.id == 1).values(**values)
+    ).rowcount
+    if not updated:
+        db.session.add(DataVersion(id=1, version=1, rewrite_version=1 if rewrite else 0))
+
+
+class MemoryBackend:
+    """进程内LRU缓存（OrderedDict），多线程安全"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """本地SQLite文件缓存，多个进程可共享；按最近访问时间淘汰"""
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS report_cache ('
+                'key TEXT PRIMARY KEY, entry BLOB NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_report_cache_accessed_at ON report_cache (accessed_at)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute('SELECT entry FROM report_cache WHERE key = ?', (repr(key),)).fetchone()
+            if row is None:
+                return None
+            conn.execute('UPDATE report_cache SET accessed_at = ? WHERE key = ?', (time.time(), repr(key)))
+        return pickle.loads(row[0])
+
+    def set(self, key, entry):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO report_cache (key, entry, accessed_at) VALUES (?, ?, ?)',
+                (repr(key), pickle.dumps(entry), time.time())
+            )
+            conn.execute(
+                'DELETE FROM report_cache WHERE key NOT IN '
+                '(SELECT key FROM report_cache ORDER BY accessed_at DESC LIMIT ?)',
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM report_cache')
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute('SELECT COUNT(*) FROM report_cache').fetchone()[0]
+
+
+class ReportCache:
+    """
+    报表结果缓存：键为 (报表, 年份, 月份, 期间类型)，值附带计算时的数据版本号，
+    版本号与数据库中的不一致即视为未命中并重新计算
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        version = current_data_version()
+        entry = self.backend.get(key)
+        if entry is not None and entry[0] == version:
+            with self._lock:
+                self.hits += 1
+            return entry[1]
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        self.backend.set(key, (version, value))
+        return value
+
+    def stats(self):
+        """命中/未命中计数与当前条目数"""
+        total = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0
+        }
+
+
+def init_report_cache(app):
+    """按配置创建报表缓存，REPORT_CACHE_BACKEND 为 'memory'、'sqlite' 或 'none'"""
+    backend_name = app.config.get('REPORT_CACHE_BACKEND', 'memory')
+    max_entries = app.config.get('REPORT_CACHE_SIZE', 256)
+
+    if backend_name == 'memory':
+        backend = MemoryBackend(max_entries)
+    elif backend_name == 'sqlite':
+        backend = SQLiteBackend(app.config['REPORT_CACHE_PATH'], max_entries)
+        # 缓存文件可能来自另一个数据库（版本号从0重新计数），启动时清空
+        backend.clear()
+    elif backend_name == 'none':
+        app.extensions['report_cache'] = None
+        return None
+    else:
+        raise ValueError(f"未知的报表缓存后端：{backend_name}")
+
+    cache = ReportCache(backend)
+    app.extensions['report_cache'] = cache
+    return cache
+
+
+def cached_report(view):
+    """
+    报表函数装饰器：按 (view, year, month, period_type) 缓存返回值，未提供的参数记为None
+    缓存被禁用时直接计算
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions.get('report_cache')
+            if cache is None:
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = bound.arguments
+            key = (view, params.get('year'), params.get('month'), params.get('period_type'))
+            return cache.get_or_compute(key, lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
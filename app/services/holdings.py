@@ -0,0 +1,217 @@
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import db
+from app.models import Holding
+from app.services.cache import current_data_version, bump_data_version
+from app.services.snapshots import HOLDINGS
+
+
+def holding_ids(kind, keys):
+    """
+    返回持有项 (名称, 类型, 所有者) 对应的ID，不存在的持有项先插入，调用方负责提交事务
+    :param kind: "asset" 或 "liability"
+    :param keys: 可迭代的 (名称, 类型, 所有者)
+    :return: {(名称, 类型, 所有者): 持有项ID}
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+
+    def load():
+        rows = db.session.execute(
+            db.select(Holding.name, Holding.type, Holding.owner, Holding.id).where(Holding.kind == kind)
+        )
+        return {(name, type_, owner): holding_id for name, type_, owner, holding_id in rows}
+
+    ids = load()
+    missing = sorted(key for key in keys if key not in ids)
+    if missing:
+        db.session.execute(db.insert(Holding), [
+            {'kind': kind, 'name': name, 'type': type_, 'owner': owner} for name, type_, owner in missing
+        ])
+        ids = load()
+    return {key: ids[key] for key in keys}
+
+
+def assign_holdings(kind, records):
+    """为批量导入的记录（字典列表）填写 holding_id，需在插入记录之前调用"""
+    ids = holding_ids(kind, ((record['name'], record['type'], record['owner']) for record in records))
+    for record in records:
+        record['holding_id'] = ids[(record['name'], record['type'], record['owner'])]
+
+
+def assign_holding(kind, item):
+    """按ORM记录当前的名称、类型、所有者填写 holding_id（新增或编辑后调用）"""
+    key = (item.name, item.type, item.owner)
+    item.holding_id = holding_ids(kind, [key])[key]
+
+
+def rebuild_holdings(kinds=None):
+    """
+    从快照记录全量重建持有项并回填 holding_id，删除已没有快照的持有项，调用方负责提交事务
+    :param kinds: 需要重建的数据类型列表，默认全部
+    """
+    for kind in kinds or HOLDINGS:
+        model = HOLDINGS[kind]
+        matching = db.select(Holding.id).where(
+            Holding.kind == kind, Holding.name == model.name,
+            Holding.type == model.type, Holding.owner == model.owner
+        )
+        missing = db.select(db.literal(kind), model.name, model.type, model.owner).where(
+            ~matching.exists()
+        ).group_by(model.name, model.type, model.owner).order_by(db.func.min(model.id))
+        db.session.execute(db.insert(Holding).from_select(['kind', 'name', 'type', 'owner'], missing))
+        db.session.execute(db.update(model).values(holding_id=matching.scalar_subquery()))
+        db.session.execute(db.delete(Holding).where(
+            Holding.kind == kind, ~db.select(model.id).where(model.holding_id == Holding.id).exists()
+        ))
+
+
+@click.command('rebuild-holdings')
+@with_appcontext
+def rebuild_holdings_command():
+    """从资产、负债记录全量重建持有项"""
+    rebuild_holdings()
+    bump_data_version()
+    db.session.commit()
+    click.echo(f'持有项重建完成，共 {Holding.query.count()} 个')
+
+
+class BalanceHistory:
+    """
+    某类持有项的余额历史：每个持有项一组按日期升序排列的快照，截至任意日期的余额由二分查找得到，
+    所有持有项的合计为 O(持有项数 · log 快照数)；同一日期有多条快照时取最后录入的一条
+    （与 latest_snapshots_select 一致），某日期之前没有快照的持有项余额为0
+    """
+
+    def __init__(self, kind, snapshot_holdings, dates, amounts):
+        """
+        :param snapshot_holdings: 各快照的持有项ID（int数组），按持有项、日期、ID升序排列
+        :param dates: 各快照的日期（datetime64[D]数组）
+        :param amounts: 各快照的金额（float数组）
+        """
+        self.kind = kind
+        bounds = np.flatnonzero(np.diff(snapshot_holdings)) + 1
+        self.holding_ids = [int(group[0]) for group in np.split(snapshot_holdings, bounds)] if len(dates) else []
+        self.dates = np.split(dates, bounds) if len(dates) else []
+        # 金额前补一个0，二分查找得到的位置即为余额下标（位置0表示尚无快照）
+        self.amounts = [np.concatenate(([0.0], group)) for group in np.split(amounts, bounds)] if len(amounts) else []
+
+    @classmethod
+    def load(cls, kind):
+        """按持有项、日期顺序一次读取某类全部快照（走 holding_id 复合索引）"""
+        model = HOLDINGS[kind]
+        rows = db.session.execute(
+            db.select(model.holding_id, model.update_date, model.amount).where(
+                model.holding_id.isnot(None)
+            ).order_by(model.holding_id, model.update_date, model.id)
+        ).all()
+        return cls(
+            kind,
+            np.array([row[0] for row in rows], dtype=np.int64),
+            np.array([row[1] for row in rows], dtype='datetime64[D]'),
+            np.array([row[2] for row in rows], dtype=float)
+        )
+
+    @property
+    def first_date(self):
+        """最早的快照日期，无快照时为None"""
+        return min(dates[0] for dates in self.dates).item() if self.dates else None
+
+    @property
+    def last_date(self):
+        """最晚的快照日期，无快照时为None"""
+        return max(dates[-1] for dates in self.dates).item() if self.dates else None
+
+    def balances(self, as_of):
+        """
+        各持有项截至 as_of（含）的余额
+        :return: {持有项ID: 余额}，as_of 之前没有快照的持有项不包含在内
+        """
+        as_of = np.datetime64(as_of, 'D')
+        balances = {}
+        for holding_id, dates, amounts in zip(self.holding_ids, self.dates, self.amounts):
+            position = np.searchsorted(dates, as_of, side='right')
+            if position:
+                balances[holding_id] = float(amounts[position])
+        return balances
+
+    def total(self, as_of):
+        """截至 as_of（含）所有持有项的余额合计"""
+        return sum(self.balances(as_of).values())
+
+    def totals(self, dates):
+        """
+        多个日期的余额合计，每个持有项对全部日期做一次向量化二分查找
+        :param dates: 日期序列
+        :return: float数组，与 dates 一一对应
+        """
+        dates = np.asarray(dates, dtype='datetime64[D]')
+        totals = np.zeros(len(dates))
+        for holding_dates, amounts in zip(self.dates, self.amounts):
+            totals += amounts[np.searchsorted(holding_dates, dates, side='right')]
+        return totals
+
+
+def balance_history(kind):
+    """读取某类持有项的余额历史，按数据版本号缓存在进程内，数据变化后重新加载"""
+    histories = current_app.extensions.setdefault('balance_history', {})
+    version = current_data_version()
+    cached = histories.get(kind)
+    if cached is None or cached[0] != version:
+        cached = (version, BalanceHistory.load(kind))
+        histories[kind] = cached
+    return cached[1]
+
+
+def history_span():
+    """资产、负债快照的最早和最晚日期，无快照时为None"""
+    histories = [balance_history(kind) for kind in HOLDINGS]
+    first_dates = [history.first_date for history in histories if history.first_date is not None]
+    if not first_dates:
+        return None
+    return min(first_dates), max(history.last_date for history in histories if history.last_date is not None)
+
+
+def net_worth_as_of(as_of):
+    """
+    截至 as_of（含）各持有项的余额与净资产
+    :return: {'as_of', 'holdings': [{kind, name, type, owner, amount}], 'total_assets', 'total_liabilities', 'net_worth'}
+    """
+    balances = {kind: balance_history(kind).balances(as_of) for kind in HOLDINGS}
+    holdings = Holding.query.filter(
+        Holding.id.in_([holding_id for kind_balances in balances.values() for holding_id in kind_balances])
+    ).order_by(Holding.kind, Holding.type, Holding.name, Holding.owner).all()
+
+    total_assets = sum(balances['asset'].values())
+    total_liabilities = sum(balances['liability'].values())
+    return {
+        'as_of': as_of,
+        'holdings': [
+            {'kind': holding.kind, 'name': holding.name, 'type': holding.type, 'owner': holding.owner,
+             'amount': balances[holding.kind][holding.id]}
+            for holding in holdings
+        ],
+        'total_assets': total_assets,
+        'total_liabilities': total_liabilities,
+        'net_worth': total_assets - total_liabilities
+    }
+
+
+def net_worth_curve(dates):
+    """
+    各日期的资产合计、负债合计与净资产
+    :param dates: 升序的日期列表
+    :return: {'dates', 'assets', 'liabilities', 'net_worth'}，金额列表与日期一一对应
+    """
+    assets = balance_history('asset').totals(dates)
+    liabilities = balance_history('liability').totals(dates)
+    return {
+        'dates': list(dates),
+        'assets': assets.tolist(),
+        'liabilities': liabilities.tolist(),
+        'net_worth': (assets - liabilities).tolist()
+    }
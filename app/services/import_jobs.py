@@ -0,0 +1,106 @@
+import contextlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import ImportJob
+from app.utils.importer import stream_import_job
+
+
+def claim_import_job(job_id, lease):
+    """
+    原子地把导入任务改为running：只有pending、failed，或running但超过 lease 秒未更新
+    （所在进程已退出）的任务才能被领取，避免同一任务被两个请求同时续传
+    :param lease: 秒数
+    :return: 是否领取成功
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=lease)
+    claimed = db.session.execute(
+        db.update(ImportJob)
+        .where(ImportJob.id == job_id, db.or_(
+            ImportJob.status.in_(('pending', 'failed')),
+            db.and_(ImportJob.status == 'running', ImportJob.updated_at < cutoff)
+        ))
+        .values(status='running', updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return bool(claimed)
+
+
+def run_import_job(job_id):
+    """
+    执行（或续传）已领取的流式导入任务，完成后删除上传文件；
+    失败原因记录在任务的error中，可在导入页面续传
+    """
+    job = db.session.get(ImportJob, job_id)
+    if not os.path.exists(job.file_path):
+        job.status = 'failed'
+        job.error = f"上传文件 {job.filename} 已不存在，无法续传"
+        db.session.commit()
+        return
+
+    try:
+        stream_import_job(
+            job,
+            chunk_rows=current_app.config['STREAM_IMPORT_CHUNK_ROWS'],
+            chunk_size=current_app.config['IMPORT_CHUNK_SIZE']
+        )
+    except Exception:
+        # stream_import_job 已把任务标记为failed并记录原因
+        return
+
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(job.file_path)
+
+
+def import_job_status(job):
+    """
+    导入任务的状态
+    :return: 可JSON序列化的字典，供进度页面轮询
+    """
+    return {
+        'id': job.id,
+        'filename': job.filename,
+        'status': job.status,
+        'rows_imported': job.rows_imported,
+        'progress': round(job.progress, 1),
+        'error': job.error,
+        'done': job.status in ('completed', 'failed')
+    }
+
+
+class ImportJobRunner:
+    """进程内的流式导入线程池，任务状态与进度保存在数据库中，请求线程领取任务并提交后立即返回"""
+
+    def __init__(self, app, max_workers=1, lease=600):
+        self.app = app
+        self.lease = lease  # running状态的任务超过此秒数未更新，才视为所在进程已退出、可以续传
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='import-job')
+
+    def start(self, job_id):
+        """
+        领取任务并提交到线程池
+        :return: 是否领取成功（任务已完成或正在其他线程、进程中执行时返回False）
+        """
+        if not claim_import_job(job_id, self.lease):
+            return False
+        self.executor.submit(self._run, job_id)
+        return True
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                run_import_job(job_id)
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('导入任务 %s 执行出错', job_id)
+
+
+def init_import_jobs(app):
+    """创建流式导入任务线程池"""
+    runner = ImportJobRunner(app, app.config.get('IMPORT_MAX_WORKERS', 1), app.config.get('IMPORT_JOB_LEASE', 600))
+    app.extensions['import_jobs'] = runner
+    return runner
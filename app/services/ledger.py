@@ -0,0 +1,230 @@
+import threading
+from collections import namedtuple
+
+import numpy as np
+from flask import current_app
+
+from app import db
+from app.models import DataVersion, ExpenseClassification
+from app.services.aggregates import LEDGERS, DIMENSIONS, Rollup
+
+# 组合键取值范围不超过此值（或记录数）时用 bincount 分组
+DENSE_GROUP_LIMIT = 1 << 16
+
+# 支出按 (年份, 分析大类, 类别) 汇总的结果行
+BucketRollup = namedtuple('BucketRollup', ('year', 'bucket', 'category', 'total'))
+
+
+def _encode(values, index):
+    """
+    字典编码：将取值转换为整数代码，新出现的取值追加到字典末尾
+    :param values: 取值序列
+    :param index: {取值: 代码}，原地扩充
+    :return: int32代码数组
+    """
+    return np.fromiter((index.setdefault(value, len(index)) for value in values), dtype=np.int32, count=len(values))
+
+
+class ColumnarLedger:
+    """
+    一类流水（收入或支出）的列式内存快照：日期、年、月、金额为NumPy数组，类别、人员、期间类型
+    字典编码为整数代码；不构造ORM实例。快照不可变，追加新记录时返回新的快照，读取中的请求不受影响
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.watermark = 0  # 已加载记录的最大id
+        self.dates = np.empty(0, dtype='datetime64[D]')
+        self.years = np.empty(0, dtype=np.int16)
+        self.months = np.empty(0, dtype=np.int8)
+        self.amounts = np.empty(0, dtype=float)
+        self.category_codes = np.empty(0, dtype=np.int32)
+        self.person_codes = np.empty(0, dtype=np.int32)
+        self.period_codes = np.empty(0, dtype=np.int32)
+        # 字典：{取值: 代码}，代码即插入顺序
+        self.category_index = {}
+        self.person_index = {}
+        self.period_index = {}
+
+    def __len__(self):
+        return len(self.amounts)
+
+    @property
+    def categories(self):
+        return list(self.category_index)
+
+    @property
+    def people(self):
+        return list(self.person_index)
+
+    def extended(self, rows):
+        """
+        追加记录，返回新的快照
+        :param rows: (id, 日期, 类别, 人员, 期间类型, 金额) 序列，按id升序
+        """
+        if not rows:
+            return self
+
+        ledger = ColumnarLedger(self.kind)
+        ledger.category_index = dict(self.category_index)
+        ledger.person_index = dict(self.person_index)
+        ledger.period_index = dict(self.period_index)
+        # 按列取出（比 zip(*rows) 快得多）；日期为ISO字符串时NumPy可直接批量解析
+        ids, dates, categories, people, periods, amounts = ([row[i] for row in rows] for i in range(6))
+        dates = np.array(dates, dtype='datetime64[D]')
+        ledger.watermark = max(self.watermark, int(ids[-1]))
+        ledger.dates = np.concatenate((self.dates, dates))
+        ledger.years = np.concatenate((self.years, (dates.astype('datetime64[Y]').astype(np.int64) + 1970).astype(np.int16)))
+        ledger.months = np.concatenate((self.months, (dates.astype('datetime64[M]').astype(np.int64) % 12 + 1).astype(np.int8)))
+        ledger.amounts = np.concatenate((self.amounts, np.array(amounts, dtype=float)))
+        ledger.category_codes = np.concatenate((self.category_codes, _encode(categories, ledger.category_index)))
+        ledger.person_codes = np.concatenate((self.person_codes, _encode(people, ledger.person_index)))
+        ledger.period_codes = np.concatenate((self.period_codes, _encode(periods, ledger.period_index)))
+        return ledger
+
+    def _mask(self, year, month, period_type):
+        mask = np.ones(len(self), dtype=bool)
+        if year is not None:
+            mask &= self.years == year
+            if month is not None:
+                mask &= self.months == month
+        if period_type != 'all':
+            mask &= self.period_codes == self.period_index.get(period_type, -1)
+        return mask
+
+    def rollup(self, year=None, month=None, period_type='all', group_by=DIMENSIONS):
+        """
+        向量化分组汇总，参数与返回值同 app/services/aggregates.py 中的 rollup
+        各维度的代码组合为一个整数键，np.bincount 分组求和计数（键范围过大时先用 np.unique 压缩）
+        :return: Rollup列表，按各组首条记录的id顺序排列
+        """
+        positions = np.flatnonzero(self._mask(year, month, period_type))
+        amounts = self.amounts[positions]
+        if not group_by:
+            return [Rollup(total=float(amounts.sum()), count=len(positions))]
+        if not len(positions):
+            return []
+
+        # kind 在同一快照内为常量，不参与组合键
+        columns = {
+            'year': self.years,
+            'month': self.months,
+            'category': self.category_codes,
+            'owner': self.person_codes
+        }
+        key = np.zeros(len(positions), dtype=np.int64)
+        for name in group_by:
+            if name == 'kind':
+                continue
+            column = columns[name][positions].astype(np.int64)
+            low = column.min()
+            key = key * (column.max() - low + 1) + (column - low)
+
+        size = int(key.max()) + 1
+        if size <= max(len(key), DENSE_GROUP_LIMIT):
+            # 组合键取值范围不大时直接按键 bincount，省去 np.unique 的排序；各组首条记录位置由 minimum.at 求得
+            counts = np.bincount(key, minlength=size)
+            groups = np.flatnonzero(counts)
+            counts = counts[groups]
+            totals = np.bincount(key, weights=amounts, minlength=size)[groups]
+            first = np.full(size, len(key))
+            np.minimum.at(first, key, np.arange(len(key)))
+            first = first[groups]
+        else:
+            _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+            totals = np.bincount(inverse, weights=amounts)
+            counts = np.bincount(inverse)
+
+        categories, people = self.categories, self.people
+        decoders = {
+            'kind': lambda row: self.kind,
+            'year': lambda row: int(self.years[row]),
+            'month': lambda row: int(self.months[row]),
+            'category': lambda row: categories[self.category_codes[row]],
+            'owner': lambda row: people[self.person_codes[row]]
+        }
+        return [
+            Rollup(**{name: decoders[name](positions[first[group]]) for name in group_by},
+                   total=float(totals[group]), count=int(counts[group]))
+            for group in np.argsort(first, kind='stable')
+        ]
+
+
+def _load_rows(kind, after_id=0):
+    """按id顺序读取某类流水中 id > after_id 的记录，只取快照需要的列"""
+    model, date_column, category_column, person_column = LEDGERS[kind]
+    # 日期以ISO字符串读取，省去逐行构造date对象
+    return db.session.execute(
+        db.select(
+            model.id, db.cast(date_column, db.String), category_column, person_column, model.period_type, model.amount
+        ).where(
+            model.id > after_id
+        ).order_by(model.id)
+    ).all()
+
+
+def _row_count(kind):
+    model = LEDGERS[kind][0]
+    return db.session.execute(db.select(db.func.count(model.id))).scalar()
+
+
+_refresh_lock = threading.Lock()
+
+
+def ledger_snapshot(kind):
+    """
+    读取某类流水的列式快照，缓存在进程内：
+    - 数据版本号未变时直接返回
+    - 只追加了新流水时按id水位增量加载新记录
+    - 已有流水被修改或删除（rewrite_version变化），或增量加载后记录数与数据库不一致
+      （例如并发事务的较小id晚于较大id提交）时全量重新加载
+    """
+    version, rewrite_version = db.session.execute(
+        db.select(DataVersion.version, DataVersion.rewrite_version).where(DataVersion.id == 1)
+    ).one_or_none() or (0, 0)
+    snapshots = current_app.extensions.setdefault('ledger_snapshots', {})
+    cached = snapshots.get(kind)
+    if cached is not None and cached[0] == version:
+        return cached[2]
+
+    with _refresh_lock:
+        cached = snapshots.get(kind)
+        if cached is not None and cached[0] == version:
+            return cached[2]
+
+        ledger = None
+        if cached is not None and cached[1] == rewrite_version:
+            ledger = cached[2].extended(_load_rows(kind, cached[2].watermark))
+            if len(ledger) != _row_count(kind):
+                ledger = None
+        if ledger is None:
+            ledger = ColumnarLedger(kind).extended(_load_rows(kind))
+        snapshots[kind] = (version, rewrite_version, ledger)
+        return ledger
+
+
+def ledger_rollup(kind, year=None, month=None, period_type='all', group_by=DIMENSIONS):
+    """
+    与 app/services/aggregates.py 中的 rollup 接口相同，在列式快照上汇总收入、支出
+    :param kind: "income"、"expense"，或两者的元组（此时 group_by 须包含 'kind'，结果按类型依次排列）
+    """
+    if isinstance(kind, str):
+        return ledger_snapshot(kind).rollup(year, month, period_type, group_by)
+    if 'kind' not in group_by:
+        raise ValueError("汇总多种流水时须按 'kind' 分组")
+    return [item for name in kind for item in ledger_snapshot(name).rollup(year, month, period_type, group_by)]
+
+
+def ledger_bucket_rollup():
+    """
+    在列式快照上按 (年份, 分析大类, 类别) 汇总全部支出：
+    先按 (年份, 类别) 向量化分组，再按去除首尾空格后的类别查 ExpenseClassification，未列出的归为消费
+    :return: BucketRollup列表，按各组首次出现的顺序排列
+    """
+    buckets = dict(db.session.execute(db.select(ExpenseClassification.category, ExpenseClassification.bucket)).all())
+    totals = {}
+    for item in ledger_snapshot('expense').rollup(group_by=('year', 'category')):
+        category = item.category.strip()
+        key = (item.year, buckets.get(category, 'consumption'), category)
+        totals[key] = totals.get(key, 0) + item.total
+    return [BucketRollup(year, bucket, category, total) for (year, bucket, category), total in totals.items()]
@@ -0,0 +1,210 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app import db
+from app.models import OCRJob
+
+
+def create_ocr_jobs(uploads, data_type, owner, use_cache=True):
+    """
+    为一批已保存的图像创建OCR任务（同时清除预览已过期的批次）
+    :param uploads: [(用户上传的文件名, 保存路径, 报告月份)] 列表
+    :param data_type: income / expense
+    :param owner: 所属人
+    :param use_cache: 为False时跳过OCR结果缓存重新识别
+    :return: (批次ID, 任务列表)
+    """
+    purge_expired_ocr_jobs(current_app.config['OCR_PREVIEW_TTL'])
+    batch_id = uuid.uuid4().hex
+    jobs = [
+        OCRJob(batch_id=batch_id, filename=filename, file_path=file_path, report_month=report_month,
+               data_type=data_type, owner=owner, use_cache=use_cache)
+        for filename, file_path, report_month in uploads
+    ]
+    db.session.add_all(jobs)
+    db.session.commit()
+    return batch_id, jobs
+
+
+def run_ocr_job(job_id, on_category=None):
+    """
+    执行一个OCR任务：先把状态从pending原子地改为running（已被其他线程领取则直接返回），
+    识别完成后保存结果并删除上传的图像
+    :param on_category: 回调函数（可选），流式识别过程中每解析出一个分类调用一次
+    """
+    claimed = db.session.execute(
+        db.update(OCRJob)
+        .where(OCRJob.id == job_id, OCRJob.status == 'pending')
+        .values(status='running', updated_at=datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    if not claimed:
+        return
+
+    job = db.session.get(OCRJob, job_id)
+    if not os.path.exists(job.file_path):
+        job.status = 'failed'
+        job.error = f"上传的图像 {job.filename} 已不存在"
+        db.session.commit()
+        return
+
+    try:
+        ocr_result = current_app.extensions['ocr_client'].analyze_bank_report(
+            job.file_path,
+            report_type=job.data_type,
+            use_cache=job.use_cache,
+            on_category=on_category
+        )
+    except Exception as e:
+        job.status = 'failed'
+        job.error = f"OCR识别失败：{str(e)}"[:500]
+    else:
+        job.status = 'completed'
+        job.result = json.dumps({
+            'raw_content': ocr_result['raw_content'],
+            'merged_content': ocr_result['merged_content'],
+            'categories': ocr_result['structured_data']['categories']
+        }, ensure_ascii=False)
+    db.session.commit()
+
+    # 识别期间图像可能已被清理（如任务被其他进程重新执行），结果已保存，不再视为出错
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(job.file_path)
+
+
+class OCRJobRunner:
+    """
+    进程内的OCR任务线程池，任务状态保存在数据库中，请求线程提交后立即返回
+    流式识别过程中已解析出的分类只保存在内存中，供进度页面实时显示，任务结束后丢弃
+    """
+
+    def __init__(self, app, max_workers=4, lease=1800):
+        self.app = app
+        self.lease = lease  # running状态的任务超过此秒数未更新，才视为所在进程已退出
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-job')
+        self.partial = {}  # 任务ID -> 已解析出的分类
+        self.version = 0  # 每次有新分类或任务结束时加一
+        self._updated = threading.Condition()
+        self._resumed = False
+        self._lock = threading.Lock()
+
+    def submit(self, job_id):
+        self.executor.submit(self._run, job_id)
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                run_ocr_job(job_id, on_category=functools.partial(self.publish, job_id))
+            except Exception:
+                db.session.rollback()
+                self.app.logger.exception('OCR任务 %s 执行出错', job_id)
+            finally:
+                with self._updated:
+                    self.partial.pop(job_id, None)
+                    self._notify()
+
+    def _notify(self):
+        self.version += 1
+        self._updated.notify_all()
+
+    def publish(self, job_id, category):
+        """记录任务新解析出的分类并唤醒等待中的进度推送"""
+        with self._updated:
+            self.partial.setdefault(job_id, []).append(category)
+            self._notify()
+
+    def partial_categories(self, job_id):
+        """任务到目前为止解析出的分类（副本）"""
+        with self._updated:
+            return list(self.partial.get(job_id, ()))
+
+    def wait_for_update(self, version, timeout):
+        """
+        等待到有新分类或任务结束（version 与当前版本不同）或超时
+        :return: 当前版本号
+        """
+        with self._updated:
+            self._updated.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+    def resume_pending_jobs(self):
+        """
+        重新提交上次进程退出时未完成的任务，每个进程只执行一次；
+        多个工作进程共用数据库时，running状态的任务可能正由其他进程执行，
+        只有超过租约时间（lease）仍未更新的才重置为pending后重新执行
+        :return: 重新提交的任务数
+        """
+        with self._lock:
+            if self._resumed:
+                return 0
+            self._resumed = True
+
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease)
+        db.session.execute(
+            db.update(OCRJob).where(
+                OCRJob.status == 'running', OCRJob.updated_at < cutoff
+            ).values(status='pending', updated_at=datetime.utcnow())
+        )
+        db.session.commit()
+        job_ids = db.session.scalars(
+            db.select(OCRJob.id).where(OCRJob.status == 'pending').order_by(OCRJob.id)
+        ).all()
+        for job_id in job_ids:
+            self.submit(job_id)
+        return len(job_ids)
+
+
+def batch_status(jobs):
+    """
+    汇总一个批次的任务状态
+    :return: 可JSON序列化的字典（total、completed、failed、done 与各任务状态）
+    """
+    return {
+        'total': len(jobs),
+        'completed': sum(1 for job in jobs if job.status == 'completed'),
+        'failed': sum(1 for job in jobs if job.status == 'failed'),
+        'done': all(job.finished for job in jobs),
+        'jobs': [{'id': job.id, 'filename': job.filename, 'status': job.status} for job in jobs]
+    }
+
+
+def preview_expired(jobs, ttl):
+    """
+    识别结果预览是否已过期：批次中任一任务识别结束超过 ttl 秒
+    批次ID即预览令牌，识别结果保存在任务记录中，确认导入时直接读取，不再重新解析
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    return any(job.finished and job.updated_at < cutoff for job in jobs)
+
+
+def purge_expired_ocr_jobs(ttl):
+    """
+    删除识别结束超过 ttl 秒仍未确认导入的任务记录
+    :return: 删除的任务数
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=ttl)
+    deleted = OCRJob.query.filter(
+        OCRJob.status.in_(('completed', 'failed')), OCRJob.updated_at < cutoff
+    ).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def init_ocr_jobs(app):
+    """创建OCR任务线程池；第一个请求到来时恢复未完成的任务（flask命令行不会触发）"""
+    runner = OCRJobRunner(app, app.config.get('OCR_MAX_WORKERS', 4), app.config.get('OCR_JOB_LEASE', 1800))
+    app.extensions['ocr_jobs'] = runner
+
+    @app.before_request
+    def resume_ocr_jobs():
+        runner.resume_pending_jobs()
+
+    return runner
@@ -0,0 +1,131 @@
+import heapq
+from datetime import date
+
+from app import db
+from app.models import MonthlySummary
+from app.services.aggregates import LEDGERS, filter_by_year
+
+# 合并多个数据类型时的固定顺序，作为 (日期, 类型, id) 排序键的第二位
+KIND_ORDER = ['income', 'expense', 'asset', 'liability']
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+PAGE_SIZE_CHOICES = [20, 50, 100, 200]
+
+
+def encode_cursor(row):
+    """将一行的排序键编码为游标字符串：日期:类型:id"""
+    return f"{row.date.isoformat()}:{row.kind}:{row.id}"
+
+
+def decode_cursor(cursor):
+    """
+    解析游标字符串
+    :return: (日期, 类型序号, id)，游标无效时返回None
+    """
+    try:
+        date_text, kind, id_text = cursor.split(':')
+        return date.fromisoformat(date_text), KIND_ORDER.index(kind), int(id_text)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _sort_key(row):
+    return row.date, KIND_ORDER.index(row.kind), row.id
+
+
+def _keyset_filter(query, date_column, id_column, rank, cursor, before):
+    """
+    按 (日期, 类型序号, id) 的游标位置过滤：向后翻页取排在游标之后（更早）的行，
+    向前翻页取排在游标之前（更晚）的行。类型序号在单张表内是常量，条件可化简为日期与id的比较
+    """
+    cursor_date, cursor_rank, cursor_id = cursor
+    if before:
+        if rank > cursor_rank:
+            return query.filter(date_column >= cursor_date)
+        if rank < cursor_rank:
+            return query.filter(date_column > cursor_date)
+        return query.filter(db.or_(
+            date_column > cursor_date,
+            db.and_(date_column == cursor_date, id_column > cursor_id)
+        ))
+    if rank < cursor_rank:
+        return query.filter(date_column <= cursor_date)
+    if rank > cursor_rank:
+        return query.filter(date_column < cursor_date)
+    return query.filter(db.or_(
+        date_column < cursor_date,
+        db.and_(date_column == cursor_date, id_column < cursor_id)
+    ))
+
+
+def _kind_rows(kind, year, source, limit, cursor, before):
+    """查询单个数据类型的一页候选行，统一列名为 id、date、category、amount、owner、description、kind"""
+    model, date_column, category_column, owner_column = LEDGERS[kind]
+    query = db.session.query(
+        model.id,
+        date_column.label('date'),
+        category_column.label('category'),
+        model.amount,
+        owner_column.label('owner'),
+        model.description,
+        db.literal(kind).label('kind')
+    )
+    if year is not None:
+        query = filter_by_year(query, date_column, year)
+    if source is not None:
+        query = query.filter(owner_column == source)
+    if cursor is not None:
+        query = _keyset_filter(query, date_column, model.id, KIND_ORDER.index(kind), cursor, before)
+
+    if before:
+        query = query.order_by(date_column.asc(), model.id.asc())
+    else:
+        query = query.order_by(date_column.desc(), model.id.desc())
+    return query.limit(limit).all()
+
+
+def ledger_page(kinds, year=None, source=None, per_page=DEFAULT_PAGE_SIZE, after=None, before=None):
+    """
+    按 (日期, 类型, id) 倒序做键集分页：每个数据类型只取 per_page+1 行，耗时与流水总量无关
+    :param kinds: 数据类型列表
+    :param year: 年份（可选）
+    :param source: 来源/支付人/所有者（可选）
+    :param per_page: 每页行数
+    :param after: 下一页游标（取排在该行之后的数据）
+    :param before: 上一页游标（取排在该行之前的数据），同时给出时优先使用
+    :return: (本页行列表, 上一页游标或None, 下一页游标或None)
+    """
+    backward = before is not None and decode_cursor(before) is not None
+    cursor = decode_cursor(before) if backward else (decode_cursor(after) if after else None)
+
+    candidates = [_kind_rows(kind, year, source, per_page + 1, cursor, backward) for kind in kinds]
+    # 各表结果已按同一排序键有序，归并后截取一页
+    merged = list(heapq.merge(*candidates, key=_sort_key, reverse=not backward))
+    has_more = len(merged) > per_page
+    rows = merged[:per_page]
+
+    if backward:
+        rows.reverse()
+        has_previous, has_next = has_more, True
+    else:
+        has_previous, has_next = cursor is not None, has_more
+
+    if not rows:
+        return rows, None, None
+    previous_cursor = encode_cursor(rows[0]) if has_previous else None
+    next_cursor = encode_cursor(rows[-1]) if has_next else None
+    return rows, previous_cursor, next_cursor
+
+
+def available_filters(kinds):
+    """
+    从月度汇总表DISTINCT查询可选的年份（倒序）与来源/支付人/所有者（升序）
+    :return: (年份列表, 人员列表)
+    """
+    base = db.session.query(MonthlySummary).filter(MonthlySummary.kind.in_(kinds))
+    years = [row[0] for row in base.with_entities(MonthlySummary.year).distinct()
+             .order_by(MonthlySummary.year.desc())]
+    sources = [row[0] for row in base.with_entities(MonthlySummary.person).distinct()
+               .order_by(MonthlySummary.person)]
+    return years, sources
@@ -0,0 +1,527 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.models import Income, Expense, Asset, Liability, EXPENSE_BUCKETS
+from app.services.aggregates import (
+    latest_data_year, year_bounds, rollup, totals_by, grand_total, ledger_rows
+)
+from app.services.cache import cached_report
+from app.services.ledger import ledger_rollup, ledger_bucket_rollup
+from app.services.holdings import history_span, net_worth_curve
+from app.services.settings import get_setting
+from app.services.snapshots import yearly_totals, yearly_snapshot_totals
+
+MONTH_NAMES = ['一月', '二月', '三月', '四月', '五月', '六月', '七月', '八月', '九月', '十月', '十一月', '十二月']
+
+# 财务健康得分规则：(指标, 比较方式, [(阈值, 得分), ...])，按顺序取第一个满足的阈值，都不满足得0分
+# 结余率30%、偿债率30%、净资产增长率20%、现金流比率20%
+HEALTH_SCORE_RULES = [
+    ('surplus_rate', '>=', [(0.3, 30), (0.1, 20), (0, 10)]),
+    ('debt_rate', '<', [(0.5, 30), (0.7, 20), (0.85, 10)]),
+    ('net_worth_growth', '>=', [(0.1, 20), (0.05, 15), (0, 10)]),
+    ('cash_flow_ratio', '>=', [(0.5, 20), (0.3, 15), (0, 10)])
+]
+
+# 健康等级：得分不低于阈值的第一个等级
+HEALTH_LEVELS = [(80, '优秀'), (60, '良好'), (40, '一般')]
+LOWEST_HEALTH_LEVEL = '需要改善'
+
+METRIC_NAMES = ['surplus_rate', 'debt_rate', 'net_worth_growth', 'cash_flow_ratio', 'roe']
+
+
+def parse_year(value, default_year):
+    """将请求中的年份参数转换为整数，缺省或无效时使用默认年份"""
+    if value is None:
+        return default_year
+    try:
+        return int(value)
+    except ValueError:
+        return default_year
+
+
+@cached_report('income_statement')
+def income_statement_report(year=None, period_type='all'):
+    """
+    收入利润表数据
+    :param year: 年份（字符串或整数），缺省时为最新有数据的年份
+    :param period_type: 'all'、'monthly' 或 'annual'
+    :return: 模板与API共用的报表字典
+    """
+    # 默认年份为最新有数据的年份，若无数据则为当前年份
+    year = parse_year(year, latest_data_year(Income.date, Expense.date))
+
+    # 在数据库中按年份、period_type过滤并按类别汇总收入和支出
+    income_rollups = rollup('income', year, period_type=period_type, group_by=('category',))
+    expense_rollups = rollup('expense', year, period_type=period_type, group_by=('category',))
+
+    # 计算总收入和总支出
+    total_income = grand_total(income_rollups)
+    total_expense = grand_total(expense_rollups)
+    net_surplus = total_income - total_expense
+
+    # 按类别汇总
+    categories = set()
+    category_data = {}
+
+    # 处理收入
+    for item in income_rollups:
+        categories.add(item.category)
+        if item.category not in category_data:
+            category_data[item.category] = {'income': 0, 'expense': 0, 'surplus': 0}
+        category_data[item.category]['income'] += item.total
+
+    # 处理支出
+    for item in expense_rollups:
+        categories.add(item.category)
+        if item.category not in category_data:
+            category_data[item.category] = {'income': 0, 'expense': 0, 'surplus': 0}
+        category_data[item.category]['expense'] += item.total
+
+    # 计算结余
+    for category in categories:
+        if category in category_data:
+            category_data[category]['surplus'] = category_data[category]['income'] - category_data[category]['expense']
+
+    # 生成收入支出对比柱状图数据
+    categories_list = sorted(list(categories))
+    income_values = [category_data[cat]['income'] for cat in categories_list]
+    expense_values = [category_data[cat]['expense'] for cat in categories_list]
+
+    # 准备Chart.js所需数据
+    chart_data = {
+        'categories': categories_list,
+        'income_values': income_values,
+        'expense_values': expense_values
+    }
+
+    return {
+        'year': year,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'net_surplus': net_surplus,
+        'categories': categories_list,
+        'category_data': category_data,
+        'chart_data': chart_data
+    }
+
+
+@cached_report('balance_sheet')
+def balance_sheet_report(year=None, period_type='all'):
+    """
+    资产负债表数据
+    :param year: 年份（字符串或整数），缺省时为最新有数据的年份
+    :param period_type: 'all'、'monthly' 或 'annual'
+    :return: 模板与API共用的报表字典
+    """
+    # 默认年份为最新有数据的年份，若无数据则为当前年份
+    year = parse_year(year, latest_data_year(Asset.update_date, Liability.update_date))
+
+    # 查询资产和负债明细（只取表格需要的列），在SQL中按年份和period_type过滤
+    assets = ledger_rows('asset', year, period_type)
+    liabilities = ledger_rows('liability', year, period_type)
+
+    # 在数据库中按类型汇总资产和负债
+    asset_types = totals_by(rollup('asset', year, period_type=period_type, group_by=('category',)), 'category')  # type: amount
+    liability_types = totals_by(rollup('liability', year, period_type=period_type, group_by=('category',)), 'category')  # type: amount
+
+    # 计算总资产和总负债
+    total_assets = sum(asset_types.values())
+    total_liabilities = sum(liability_types.values())
+    net_worth = total_assets - total_liabilities
+
+    # 准备图表数据
+    all_types = list(set(list(asset_types.keys()) + list(liability_types.keys())))
+    all_types.sort()
+
+    asset_values = [asset_types.get(atype, 0) for atype in all_types]
+    liability_values = [liability_types.get(atype, 0) for atype in all_types]
+
+    # 准备Chart.js所需数据
+    chart_data = {
+        'categories': all_types,
+        'asset_values': asset_values,
+        'liability_values': liability_values
+    }
+
+    return {
+        'year': year,
+        'assets': assets,
+        'liabilities': liabilities,
+        'total_assets': total_assets,
+        'total_liabilities': total_liabilities,
+        'net_worth': net_worth,
+        'chart_data': chart_data
+    }
+
+
+@cached_report('net_worth_curve')
+def net_worth_curve_report(year=None):
+    """
+    净资产曲线：指定年份时为该年逐日的曲线，缺省时为全部历史逐月（月末）的曲线
+    每个日期的资产、负债为各持有项截至该日最新余额的合计（见 app/services/holdings.py）
+    :param year: 年份（字符串或整数），可选
+    :return: 模板与API共用的报表字典
+    """
+    year = parse_year(year, None)
+    if year is not None:
+        start, end = year_bounds(year)
+        dates = pd.date_range(start, end - timedelta(days=1), freq='D')
+        frequency = 'daily'
+    else:
+        span = history_span()
+        dates = pd.date_range(span[0], span[1] + pd.offsets.MonthEnd(0), freq='ME') if span else []
+        frequency = 'monthly'
+
+    return {
+        'year': year,
+        'frequency': frequency,
+        **net_worth_curve([day.date() for day in dates])
+    }
+
+
+@cached_report('cash_flow')
+def cash_flow_report(year=None, period_type='all'):
+    """
+    现金流量表数据
+    :param year: 年份（字符串或整数），缺省时为最新有数据的年份
+    :param period_type: 'all'、'monthly' 或 'annual'
+    :return: 模板与API共用的报表字典
+    """
+    # 默认年份为最新有数据的年份，若无数据则为当前年份
+    year = parse_year(year, latest_data_year(Income.date, Expense.date))
+
+    # 查询收入和支出明细（只取表格需要的列），在SQL中按年份和period_type过滤
+    incomes = ledger_rows('income', year, period_type)
+    expenses = ledger_rows('expense', year, period_type)
+
+    # 组织现金流量项目
+    cash_flow_items = []
+
+    for income in incomes:
+        cash_flow_items.append({
+            'date': income.date,
+            'type': 'income',
+            'category': income.category,
+            'amount': income.amount
+        })
+
+    for expense in expenses:
+        cash_flow_items.append({
+            'date': expense.date,
+            'type': 'expense',
+            'category': expense.category,
+            'amount': expense.amount
+        })
+
+    # 按日期排序
+    cash_flow_items.sort(key=lambda x: x['date'])
+
+    # 在数据库中按类别汇总现金流入和流出
+    inflow_by_category = totals_by(rollup('income', year, period_type=period_type, group_by=('category',)), 'category')  # category: amount
+    outflow_by_category = totals_by(rollup('expense', year, period_type=period_type, group_by=('category',)), 'category')  # category: amount
+
+    # 计算现金流量
+    operating_inflow = sum(inflow_by_category.values())
+    operating_outflow = sum(outflow_by_category.values())
+    net_operating_flow = operating_inflow - operating_outflow
+
+    # 准备图表数据
+    all_categories = list(set(list(inflow_by_category.keys()) + list(outflow_by_category.keys())))
+    all_categories.sort()
+
+    inflow_values = [inflow_by_category.get(cat, 0) for cat in all_categories]
+    outflow_values = [outflow_by_category.get(cat, 0) for cat in all_categories]
+
+    # 准备Chart.js所需数据
+    chart_data = {
+        'categories': all_categories,
+        'inflow_values': inflow_values,
+        'outflow_values': outflow_values
+    }
+
+    return {
+        'year': year,
+        'cash_flow_items': cash_flow_items,
+        'operating_inflow': operating_inflow,
+        'operating_outflow': operating_outflow,
+        'net_operating_flow': net_operating_flow,
+        'chart_data': chart_data
+    }
+
+
+@cached_report('expense_analysis')
+def expense_analysis_report(year=None):
+    """
+    支出分析数据：三大类汇总、消费明细与年度消费趋势
+    :param year: 年份（字符串或整数），缺省时为最新有支出的年份
+    :return: 模板与API共用的报表字典
+    """
+    # 获取当前年份
+    current_year = datetime.now().year
+
+    # 在列式流水快照上按 (年份, 分析大类, 类别) 汇总全部支出，所选年份和趋势图共用
+    bucket_rows = ledger_bucket_rollup()
+
+    # 获取所有有支出记录的年份
+    all_expense_years = set(row.year for row in bucket_rows)
+
+    # 默认年份为最新有数据的年份
+    latest_year = max(all_expense_years) if all_expense_years else current_year
+    year = parse_year(year, latest_year)
+
+    # 聚合支出到三个主要类别
+    aggregated_expenses = {
+        'rent_mortgage': 0,  # 房租房贷
+        'repayments': 0,     # 还款（转账给他人、转账给自己）
+        'consumption': 0,    # 消费（其他所有）
+        'consumption_details': {}  # 消费分类明细
+    }
+
+    # 各年份的消费金额，用于趋势图
+    consumption_by_year = {}
+
+    # 分类规则见 ExpenseClassification，已在SQL中完成分组
+    for row in bucket_rows:
+        if row.bucket == 'consumption':
+            consumption_by_year[row.year] = consumption_by_year.get(row.year, 0) + row.total
+
+        if row.year != year:
+            continue
+
+        aggregated_expenses[row.bucket] += row.total
+        if row.bucket == 'consumption':
+            # 记录消费分类明细
+            if row.category not in aggregated_expenses['consumption_details']:
+                aggregated_expenses['consumption_details'][row.category] = 0
+            aggregated_expenses['consumption_details'][row.category] += row.total
+
+    # 准备消费分类饼图数据 - 使用三个主要聚合类别
+    pie_chart_data = {
+        'labels': [label for _, label in EXPENSE_BUCKETS],
+        'values': [aggregated_expenses[key] for key, _ in EXPENSE_BUCKETS]
+    }
+
+    # 准备年度消费变化曲线数据
+    trend_years_with_expenses = sorted(all_expense_years)  # 按升序排列
+
+    # 下拉菜单的年份列表：只显示有数据的年份，降序
+    dropdown_years = sorted(all_expense_years, reverse=True) if all_expense_years else [current_year]
+
+    trend_chart_data = {
+        'years': trend_years_with_expenses,
+        'values': [consumption_by_year.get(y, 0) for y in trend_years_with_expenses]
+    }
+
+    return {
+        'year': year,
+        'aggregated_expenses': aggregated_expenses,
+        'pie_chart_data': pie_chart_data,
+        'trend_chart_data': trend_chart_data,
+        'years_with_expenses': dropdown_years
+    }
+
+
+@cached_report('dashboard')
+def dashboard_report(year=None, month=None):
+    """
+    仪表盘数据：KPI、储蓄目标进度、支出分类与逐月收支
+    :param year: 年份（字符串或整数），缺省时为最新有数据的年份
+    :param month: 月份（字符串或整数），缺省或'all'表示全年
+    :return: 模板与API共用的报表字典
+    """
+    # 默认年份为最新有数据的年份，若无数据则为当前年份
+    year = parse_year(year, latest_data_year(Income.date, Expense.date))
+    month = int(month) if month is not None and month != 'all' else None
+
+    # 在列式流水快照上按 (收支, 月份, 类别) 向量化汇总所选年份（和月份）
+    rollups = ledger_rollup(('income', 'expense'), year, month, group_by=('kind', 'month', 'category'))
+    income_rollups = [item for item in rollups if item.kind == 'income']
+    expense_rollups = [item for item in rollups if item.kind == 'expense']
+
+    # 计算KPI指标
+    total_income = grand_total(income_rollups)
+    total_expense = grand_total(expense_rollups)
+    net_surplus = total_income - total_expense
+
+    # 储蓄目标进度（年目标取自家庭设置，如果是月度则按比例调整）
+    annual_savings_goal = get_setting('annual_savings_goal')
+    savings_goal = annual_savings_goal / 12 if month is not None else annual_savings_goal
+    savings_progress = min((net_surplus / savings_goal) * 100, 100) if savings_goal > 0 else 0
+
+    # 支出分类汇总
+    expense_categories = totals_by(expense_rollups, 'category')
+
+    # 准备饼图数据
+    pie_data = {
+        'labels': list(expense_categories.keys()),
+        'values': list(expense_categories.values())
+    }
+
+    # 准备收入支出对比柱状图数据
+    months = range(1, 13) if month is None else [month]
+    income_by_month = totals_by(income_rollups, 'month')
+    expense_by_month = totals_by(expense_rollups, 'month')
+
+    bar_chart_data = {
+        'months': [MONTH_NAMES[m - 1] for m in months],
+        'incomes': [income_by_month.get(m, 0) for m in months],
+        'expenses': [expense_by_month.get(m, 0) for m in months]
+    }
+
+    return {
+        'year': year,
+        'month': month,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'net_surplus': net_surplus,
+        'annual_savings_goal': annual_savings_goal,
+        'savings_goal': savings_goal,
+        'savings_progress': savings_progress,
+        'pie_data': pie_data,
+        'bar_chart_data': bar_chart_data
+    }
+
+
+@cached_report('comparison')
+def comparison_report():
+    """
+    历年收入、支出、结余对比数据（在列式流水快照上按年汇总）
+    :return: 模板与API共用的报表字典
+    """
+    income_by_year = totals_by(ledger_rollup('income', group_by=('year',)), 'year')
+    expense_by_year = totals_by(ledger_rollup('expense', group_by=('year',)), 'year')
+
+    years = sorted(set(income_by_year) | set(expense_by_year))
+    incomes = [income_by_year.get(y, 0) for y in years]
+    expenses = [expense_by_year.get(y, 0) for y in years]
+    surpluses = [income - expense for income, expense in zip(incomes, expenses)]
+
+    # 准备Chart.js所需数据
+    chart_data = {
+        'years': years,
+        'incomes': incomes,
+        'expenses': expenses,
+        'surpluses': surpluses
+    }
+
+    return {
+        'chart_data': chart_data,
+        'years': years,
+        'incomes': incomes,
+        'expenses': expenses,
+        'surpluses': surpluses
+    }
+
+
+def _meets(value, comparison, threshold):
+    return value >= threshold if comparison == '>=' else value < threshold
+
+
+def financial_metrics_frame(totals):
+    """
+    按年份索引的合计表一次算出所有年份的财务指标、健康得分与等级（向量化，不逐年循环）
+    净资产增长率、ROE和现金流比率只在当年有资产时计算
+    :param totals: DataFrame，索引为连续的年份，列为 income、expense、assets、liabilities（无数据为0）
+    :return: DataFrame，列为 METRIC_NAMES（未计算的指标为NaN）、net_worth、health_score、health_level
+    """
+    income, expense = totals['income'], totals['expense']
+    assets, liabilities = totals['assets'], totals['liabilities']
+    net_worth = assets - liabilities
+    net_worth_last_year = net_worth.shift(1, fill_value=0)
+    operating_cash_flow = income - expense
+    average_net_worth = (net_worth_last_year + net_worth) / 2
+    has_assets = assets > 0
+
+    frame = pd.DataFrame(index=totals.index)
+    # 不满足计算条件的指标为NaN（输出时为0，评分时按0计）
+    frame['surplus_rate'] = (operating_cash_flow / income).where(income > 0)
+    frame['debt_rate'] = (liabilities / assets).where(has_assets)
+    frame['net_worth_growth'] = ((net_worth - net_worth_last_year) / net_worth_last_year).where(
+        has_assets & (net_worth_last_year > 0))
+    frame['cash_flow_ratio'] = (operating_cash_flow / liabilities).where(has_assets & (liabilities > 0))
+    frame['roe'] = (operating_cash_flow / average_net_worth * 100).where(has_assets & (average_net_worth > 0))
+    frame['net_worth'] = net_worth
+
+    score = np.zeros(len(frame), dtype=int)
+    for name, comparison, steps in HEALTH_SCORE_RULES:
+        values = frame[name].fillna(0).to_numpy()
+        conditions = [_meets(values, comparison, threshold) for threshold, _ in steps]
+        score += np.select(conditions, [points for _, points in steps], 0)
+    frame['health_score'] = score
+    frame['health_level'] = np.select(
+        [score >= threshold for threshold, _ in HEALTH_LEVELS], [label for _, label in HEALTH_LEVELS],
+        LOWEST_HEALTH_LEVEL
+    )
+    return frame
+
+
+def _metric_values(row):
+    """取一行的各项指标，未计算的指标为0"""
+    return {name: 0 if pd.isna(row[name]) else float(row[name]) for name in METRIC_NAMES}
+
+
+@cached_report('financial_health')
+def financial_health_report(year=None):
+    """
+    财务健康分析数据：当年与上年的收支合计、资产负债快照合计在一次查询中取得，指标按 financial_metrics_frame 计算
+    （资产、负债取每个持有项当年的最新快照，见 app/services/snapshots.py）
+    :param year: 年份（字符串或整数），缺省时为最新有数据的年份
+    :return: 模板与API共用的报表字典
+    """
+    # 默认年份为最新有数据（收入、支出、资产、负债）的年份，若无数据则为当前年份
+    year = parse_year(year, latest_data_year(Income.date, Expense.date, Asset.update_date, Liability.update_date))
+
+    totals = pd.DataFrame.from_dict(yearly_totals([year - 1, year]), orient='index', dtype=float)
+    row = financial_metrics_frame(totals).loc[year]
+    metrics = _metric_values(row)
+
+    return {
+        'year': year,
+        'metrics': metrics,
+        'health_score': int(row['health_score']),
+        'health_level': str(row['health_level'])
+    }
+
+
+@cached_report('financial_health_trend')
+def financial_health_trend_report():
+    """
+    历年财务健康指标与得分：收支按年读取月度汇总表，资产负债按年取各持有项的最新快照，
+    在按年份索引的DataFrame上一次算出全部年份（口径与 financial_health_report 逐年计算一致）
+    :return: 模板与API共用的报表字典
+    """
+    totals = pd.DataFrame({
+        'income': pd.Series(totals_by(rollup('income', group_by=('year',)), 'year'), dtype=float),
+        'expense': pd.Series(totals_by(rollup('expense', group_by=('year',)), 'year'), dtype=float),
+        'assets': pd.Series(yearly_snapshot_totals('asset'), dtype=float),
+        'liabilities': pd.Series(yearly_snapshot_totals('liability'), dtype=float)
+    })
+    years = sorted(int(year) for year in totals.index)
+    if not years:
+        return {'years': [], 'rows': [], 'chart_data': {'years': [], 'health_scores': [],
+                                                        **{name: [] for name in METRIC_NAMES}}}
+
+    # 补齐中间没有数据的年份，上年数据按0计算（与逐年计算一致）
+    totals = totals.reindex(range(years[0], years[-1] + 1)).fillna(0)
+    frame = financial_metrics_frame(totals).loc[years]
+
+    rows = [
+        {'year': year, 'metrics': _metric_values(row), 'net_worth': float(row['net_worth']),
+         'health_score': int(row['health_score']), 'health_level': str(row['health_level'])}
+        for year, row in zip(years, frame.to_dict('records'))
+    ]
+
+    # 准备Chart.js所需数据
+    chart_data = {
+        'years': years,
+        'health_scores': frame['health_score'].tolist(),
+        **{name: frame[name].fillna(0).tolist() for name in METRIC_NAMES}
+    }
+
+    return {
+        'years': years,
+        'rows': rows,
+        'chart_data': chart_data
+    }
@@ -0,0 +1,61 @@
+from flask import current_app
+
+from app import db
+from app.models import Setting, DEFAULT_SETTINGS
+from app.services.cache import current_data_version, bump_data_version
+
+
+def _amount(value):
+    """解析金额设置：非负数，整数金额返回int"""
+    amount = float(value)
+    if amount < 0:
+        raise ValueError(value)
+    return int(amount) if amount.is_integer() else amount
+
+
+# 设置项：键 -> (显示名称, 解析函数)，默认值见 app/models.py 中的 DEFAULT_SETTINGS
+SETTING_TYPES = {
+    'annual_savings_goal': ('年度储蓄目标', _amount)
+}
+
+
+def load_settings():
+    """读取并解析全部设置，缺失或无效的值使用默认值"""
+    stored = dict(db.session.execute(db.select(Setting.key, Setting.value)).all())
+    settings = {}
+    for key, (_, parse) in SETTING_TYPES.items():
+        try:
+            settings[key] = parse(stored.get(key, DEFAULT_SETTINGS[key]))
+        except ValueError:
+            settings[key] = parse(DEFAULT_SETTINGS[key])
+    return settings
+
+
+def get_setting(key):
+    """读取设置值，按数据版本号缓存在进程内，设置修改后重新加载"""
+    version = current_data_version()
+    cached = current_app.extensions.get('settings')
+    if cached is None or cached[0] != version:
+        cached = (version, load_settings())
+        current_app.extensions['settings'] = cached
+    return cached[1][key]
+
+
+def update_setting(key, value):
+    """
+    校验并保存设置，数据版本号加一使报表缓存失效，调用方负责提交事务
+    :raises ValueError: 值无效
+    """
+    label, parse = SETTING_TYPES[key]
+    value = str(value).strip()
+    try:
+        parse(value)
+    except ValueError:
+        raise ValueError(f"{label}无效：{value}")
+
+    setting = Setting.query.filter_by(key=key).first()
+    if setting:
+        setting.value = value
+    else:
+        db.session.add(Setting(key=key, value=value))
+    bump_data_version()
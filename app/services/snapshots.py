@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from app import db
+from app.models import Asset, Liability, MonthlySummary
+from app.services.aggregates import year_bounds
+
+# 资产和负债按 (名称, 类型, 所有者) 区分持有项，每条记录是某一日期的余额快照
+HOLDINGS = {
+    'asset': Asset,
+    'liability': Liability
+}
+
+
+def latest_snapshots_select(kind, as_of, since=None):
+    """
+    每个持有项截至 as_of（含）的最新一条快照：ROW_NUMBER() OVER (PARTITION BY 名称, 类型, 所有者
+    ORDER BY 更新日期 DESC) 取第一行，一次查询完成；同一日期有多条快照时取最后录入的一条
+    :param kind: "asset" 或 "liability"
+    :param as_of: 截止日期（date）
+    :param since: 起始日期（可选），指定时只考虑该日期之后（含）的快照，此前没有快照的持有项不计入
+    :return: SELECT语句，列为 id、name、type、owner、amount、update_date
+    """
+    model = HOLDINGS[kind]
+    rank = db.func.row_number().over(
+        partition_by=(model.name, model.type, model.owner),
+        order_by=(model.update_date.desc(), model.id.desc())
+    ).label('rank')
+    ranked = db.select(
+        model.id, model.name, model.type, model.owner, model.amount, model.update_date, rank
+    ).where(model.update_date <= as_of)
+    if since is not None:
+        ranked = ranked.where(model.update_date >= since)
+    ranked = ranked.subquery()
+    return db.select(
+        ranked.c.id, ranked.c.name, ranked.c.type, ranked.c.owner, ranked.c.amount, ranked.c.update_date
+    ).where(ranked.c.rank == 1)
+
+
+def snapshot_total(kind, as_of, since=None):
+    """各持有项最新快照金额合计的标量子查询（参数见 latest_snapshots_select），可与其他合计组合为一次查询"""
+    snapshots = latest_snapshots_select(kind, as_of, since).subquery()
+    return db.select(db.func.coalesce(db.func.sum(snapshots.c.amount), 0)).scalar_subquery()
+
+
+def ledger_total(kind, year):
+    """某年收入或支出合计的标量子查询，读取月度汇总表"""
+    return db.select(db.func.coalesce(db.func.sum(MonthlySummary.total), 0)).where(
+        MonthlySummary.kind == kind, MonthlySummary.year == year
+    ).scalar_subquery()
+
+
+def yearly_totals(years):
+    """
+    一次查询得到各年份的收入、支出合计，以及资产、负债在该年内的最新快照合计
+    （每个持有项取当年最后一条快照，当年没有快照的持有项不计入）
+    :param years: 年份列表
+    :return: {年份: {'income', 'expense', 'assets', 'liabilities'}}
+    """
+    columns = []
+    for year in years:
+        start, end = year_bounds(year)
+        year_end = end - timedelta(days=1)
+        columns += [
+            ledger_total('income', year).label(f'income_{year}'),
+            ledger_total('expense', year).label(f'expense_{year}'),
+            snapshot_total('asset', year_end, since=start).label(f'assets_{year}'),
+            snapshot_total('liability', year_end, since=start).label(f'liabilities_{year}')
+        ]
+    if not columns:
+        return {}
+
+    row = db.session.execute(db.select(*columns)).one()._mapping
+    return {
+        year: {name: row[f'{name}_{year}'] for name in ('income', 'expense', 'assets', 'liabilities')}
+        for year in years
+    }
+
+
+def yearly_snapshot_totals(kind):
+    """
+    一次窗口函数查询得到每年各持有项当年最后一条快照的金额合计（与 yearly_totals 中的资产、负债口径一致）
+    :param kind: "asset" 或 "liability"
+    :return: {年份: 合计}
+    """
+    model = HOLDINGS[kind]
+    year = db.extract('year', model.update_date)
+    rank = db.func.row_number().over(
+        partition_by=(model.name, model.type, model.owner, year),
+        order_by=(model.update_date.desc(), model.id.desc())
+    ).label('rank')
+    ranked = db.select(year.label('year'), model.amount, rank).subquery()
+    rows = db.session.execute(
+        db.select(ranked.c.year, db.func.sum(ranked.c.amount)).where(ranked.c.rank == 1).group_by(ranked.c.year)
+    )
+    return {int(row_year): total for row_year, total in rows}
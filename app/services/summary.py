@@ -0,0 +1,120 @@
+import click
+from flask.cli import with_appcontext
+
+from app import db
+from app.models import MonthlySummary
+from app.services.aggregates import LEDGERS
+from app.services.cache import bump_data_version
+
+SUMMARY_COLUMNS = ['kind', 'year', 'month', 'category', 'person', 'period_type', 'total', 'count']
+
+
+def _record_columns(kind):
+    """返回某数据类型的记录中日期、类别、人员字段名"""
+    _, date_column, category_column, owner_column = LEDGERS[kind]
+    return date_column.key, category_column.key, owner_column.key
+
+
+def apply_deltas(kind, deltas):
+    """
+    将增量合并到月度汇总表，调用方负责提交事务
+    :param kind: 数据类型
+    :param deltas: {(year, month, category, person, period_type): [金额增量, 笔数增量]}，按首次出现顺序排列
+    """
+    if not deltas:
+        return
+
+    years = set(key[0] for key in deltas)
+    existing = {}
+    for row in MonthlySummary.query.filter(
+        MonthlySummary.kind == kind,
+        MonthlySummary.year.in_(years)
+    ):
+        existing[(row.year, row.month, row.category, row.person, row.period_type)] = row
+
+    for key, (total, count) in deltas.items():
+        row = existing.get(key)
+        if row is None:
+            if count <= 0:
+                continue
+            year, month, category, person, period_type = key
+            row = MonthlySummary(kind=kind, year=year, month=month, category=category,
+                                 person=person, period_type=period_type, total=0, count=0)
+            db.session.add(row)
+            existing[key] = row
+
+        row.total += total
+        row.count += count
+        # 该组已没有流水时删除汇总行
+        if row.count <= 0:
+            db.session.delete(row)
+            del existing[key]
+
+
+def _accumulate(deltas, key, amount, sign):
+    if key not in deltas:
+        deltas[key] = [0, 0]
+    deltas[key][0] += sign * amount
+    deltas[key][1] += sign
+
+
+def summarize_records(kind, records, sign=1):
+    """
+    将批量导入的记录（字典列表）汇总后合并到月度汇总表
+    :param sign: 1表示新增，-1表示删除
+    """
+    date_key, category_key, person_key = _record_columns(kind)
+    deltas = {}
+    for record in records:
+        record_date = record[date_key]
+        key = (record_date.year, record_date.month, record[category_key],
+               record[person_key], record['period_type'])
+        _accumulate(deltas, key, record['amount'], sign)
+    apply_deltas(kind, deltas)
+
+
+def item_deltas(kind, item, sign=1, deltas=None):
+    """
+    计算单条ORM记录对月度汇总的增量（按记录当前的值）
+    编辑时先以sign=-1记下旧值，修改后再以sign=1累加新值，最后一次性apply_deltas
+    :return: 累加后的增量字典
+    """
+    date_key, category_key, person_key = _record_columns(kind)
+    deltas = {} if deltas is None else deltas
+    item_date = getattr(item, date_key)
+    key = (item_date.year, item_date.month, getattr(item, category_key),
+           getattr(item, person_key), item.period_type or 'monthly')
+    _accumulate(deltas, key, item.amount, sign)
+    return deltas
+
+
+def rebuild_monthly_summary(kinds=None):
+    """
+    从流水表全量重建月度汇总（INSERT ... SELECT ... GROUP BY），调用方负责提交事务
+    :param kinds: 需要重建的数据类型列表，默认全部
+    """
+    table = MonthlySummary.__table__
+    for kind in kinds or LEDGERS:
+        model, date_column, category_column, owner_column = LEDGERS[kind]
+        year = db.cast(db.extract('year', date_column), db.Integer)
+        month = db.cast(db.extract('month', date_column), db.Integer)
+
+        db.session.execute(table.delete().where(table.c.kind == kind))
+        select = db.select(
+            db.literal(kind), year, month, category_column, owner_column, model.period_type,
+            db.func.sum(model.amount), db.func.count(model.id)
+        ).group_by(
+            year, month, category_column, owner_column, model.period_type
+        ).order_by(db.func.min(model.id))
+        db.session.execute(table.insert().from_select(SUMMARY_COLUMNS, select))
+
+
+@click.command('rebuild-summary')
+@with_appcontext
+def rebuild_summary_command():
+    """从流水表全量重建月度汇总表"""
+    rebuild_monthly_summary()
+    # 通常在直接修改过数据库后执行，内存中的列式流水快照也需全量重新加载
+    bump_data_version(rewrite=True)
+    db.session.commit()
+    click.echo(f'月度汇总重建完成，共 {MonthlySummary.query.count()} 行')
@@ -0,0 +1,160 @@
+from html.parser import HTMLParser
+
+# 空元素标签：开始标签即闭合，之后与之对应的一个多余结束标签被忽略（与 BeautifulSoup 的 html.parser 构建器一致）
+_VOID_TAGS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img',
+    'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+])
+
+# 内部文本不计入 get_text() 的标签（BeautifulSoup 用专门的字符串类型保存其中的文本）
+_OPAQUE_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+
+# 单元格中常见的字符实体，其他实体（及数字字符引用）出现在单元格中时改用BeautifulSoup解析
+_ENTITIES = {'nbsp': '\xa0', 'amp': '&', 'lt': '<', 'gt': '>', 'quot': '"', 'apos': "'"}
+
+
+class IrregularTableError(ValueError):
+    """表格中出现快速解析不处理的内容（脚本、少见的字符实体、CDATA等），需要完整的HTML解析"""
+
+
+class _FirstTableParser(HTMLParser):
+    """
+    单次扫描提取第一个 <table> 中各行 <td> 的文本，结果与 BeautifulSoup(html, 'html.parser') 下
+    soup.find('table').find_all('tr') 各行 find_all('td') 的 get_text(strip=True) 一致。
+
+    按 BeautifulSoup 的方式维护已打开标签的栈：结束标签闭合到最近一个同名的已打开标签（其间未闭合的标签一并闭合），
+    没有同名的已打开标签时忽略。因此缺少结束标签的单元格和行、嵌套表格、在表格外打开的标签提前闭合表格等情况
+    都与 BeautifulSoup 的解析结果相同；单元格内被标签或注释隔开的每段文本去掉首尾空白后直接拼接
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.rows = []
+        self.found = False  # 是否遇到过 <table>
+        self.done = False  # 第一个表格是否已闭合
+        self._stack = []  # 已打开的标签：[标签名, 行（tr）或单元格文本片段（td）]
+        self._open = {}  # 各标签名已打开的数量
+        self._closed_void = []  # 已自动闭合、可能还会出现多余结束标签的空元素标签
+        self._text = []  # 当前文本段（html.parser 可能分多次回调同一段文本）
+
+    def _cells(self):
+        return [payload for tag, payload in self._stack if tag == 'td' and payload is not None]
+
+    def _flush_text(self):
+        if self._text:
+            text = ''.join(self._text).strip()
+            self._text = []
+            if text:
+                for cell in self._cells():
+                    cell.append(text)
+
+    def _push(self, tag, payload=None):
+        self._stack.append([tag, payload])
+        self._open[tag] = self._open.get(tag, 0) + 1
+
+    def _pop_to(self, tag):
+        if not self._open.get(tag):
+            return
+        while True:
+            name, payload = self._stack.pop()
+            self._open[name] -= 1
+            if name == 'table' and payload is self.rows:
+                self.done = True
+            if name == tag:
+                return
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag)
+        if tag in _VOID_TAGS:
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag/> 写法的任何标签都按空元素处理
+        self._start(tag)
+        self._pop_to(tag)
+
+    def _start(self, tag):
+        if self.done:
+            return
+        self._flush_text()
+        payload = None
+        if tag == 'table':
+            if not self.found:
+                if any(name in _OPAQUE_TAGS for name, _ in self._stack):
+                    raise IrregularTableError(f'表格位于 <{tag}> 内')
+                self.found = True
+                payload = self.rows
+        elif not self.found:
+            pass
+        elif tag == 'tr':
+            # 第一个表格内的每个 <tr>（包括嵌套表格中的）都是一行
+            payload = []
+            self.rows.append(payload)
+        elif tag == 'td':
+            # 单元格属于所有包含它的行
+            rows = [row for name, row in self._stack if name == 'tr' and row is not None]
+            if rows:
+                payload = []
+                for row in rows:
+                    row.append(payload)
+        elif tag in _OPAQUE_TAGS:
+            raise IrregularTableError(f'表格内包含 <{tag}>')
+        self._push(tag, payload)
+
+    def handle_endtag(self, tag):
+        if self.done:
+            return
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+            return
+        self._flush_text()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        if self.found and not self.done:
+            self._text.append(data)
+
+    def handle_entityref(self, name):
+        if self.found and not self.done:
+            if name in _ENTITIES:
+                self._text.append(_ENTITIES[name])
+            elif self._cells():
+                raise IrregularTableError(f'单元格内包含字符实体 &{name};')
+
+    def handle_charref(self, name):
+        if self.found and not self.done and self._cells():
+            raise IrregularTableError(f'单元格内包含字符引用 &#{name};')
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def unknown_decl(self, data):
+        if self.found and not self.done and self._cells() and data.upper().startswith('CDATA['):
+            raise IrregularTableError('单元格内包含CDATA')
+        self._flush_text()
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+
+def read_first_table(html_content):
+    """
+    读取HTML中第一个表格各行 <td> 单元格的文本
+    :param html_content: 包含表格的HTML文本
+    :return: 行列表（每行为单元格文本列表），没有表格时返回None
+    :raises IrregularTableError: 表格中包含快速解析不处理的内容，需要改用BeautifulSoup解析
+    """
+    parser = _FirstTableParser()
+    parser.feed(html_content)
+    parser.close()
+    if not parser.found:
+        return None
+    return [[''.join(cell) for cell in row] for row in parser.rows]
@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# 视为临时故障、可以重试的HTTP状态码
+RETRY_STATUS_CODES = (429, 502, 503, 504)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """熔断器处于打开状态，请求未发送直接失败"""
+
+
+class CircuitBreaker:
+    """
+    简单的熔断器：连续失败达到阈值后打开，在reset_timeout秒内直接拒绝请求；
+    超时后放行一个试探请求（半开），成功则关闭，失败则重新打开
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half_open'
+        return 'open'
+
+    def allow_request(self):
+        """是否允许发送请求；半开状态下只放行一个试探请求"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ResilientSession:
+    """
+    带连接池、超时、抖动退避重试和熔断的HTTP客户端（基于requests.Session，保持长连接）
+    连接失败和 RETRY_STATUS_CODES 会重试；读取超时不重试（模型推理已经耗时很久），直接计为失败
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=120, max_retries=2, backoff=0.5,
+                 max_backoff=10, pool_size=4, breaker=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _sleep_before_retry(self, attempt):
+        """指数退避加全抖动：在 [0, min(max_backoff, backoff * 2^attempt)] 内随机等待"""
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt))))
+
+    def post(self, url, **kwargs):
+        """
+        发送POST请求
+        :return: 状态码为2xx的响应
+        :raises CircuitOpenError: 熔断器打开，服务被判定为不可用
+        :raises requests.exceptions.RequestException: 重试后仍然失败
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"OCR服务暂时不可用（连续失败 {self.breaker.failures} 次），请稍后再试：{url}")
+
+        kwargs.setdefault('timeout', self.timeout)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.post(url, **kwargs)
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    response.close()
+                    self._sleep_before_retry(attempt)
+                    continue
+                response.raise_for_status()
+            except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout):
+                if attempt < self.max_retries:
+                    self._sleep_before_retry(attempt)
+                    continue
+                self.breaker.record_failure()
+                raise
+            except requests.exceptions.HTTPError as e:
+                # 4xx为请求本身的问题，不代表服务故障
+                if e.response is not None and e.response.status_code < 500 and e.response.status_code != 429:
+                    self.breaker.record_success()
+                else:
+                    self.breaker.record_failure()
+                raise
+            except requests.exceptions.RequestException:
+                self.breaker.record_failure()
+                raise
+
+            self.breaker.record_success()
+            return response
@@ -0,0 +1,139 @@
+import io
+import math
+import os
+import threading
+
+try:
+    from PIL import Image, ImageChops, ImageOps
+except ImportError:  # 未安装Pillow时不做预处理，按原图上传
+    Image = None
+
+# 按扩展名判断原图的MIME类型
+IMAGE_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.webp': 'image/webp',
+}
+
+# 重新编码的格式与对应的MIME类型
+OUTPUT_FORMATS = {
+    'JPEG': 'image/jpeg',
+    'WEBP': 'image/webp',
+}
+
+
+def guess_mime_type(image_path):
+    """按扩展名判断图像的MIME类型，无法识别时按JPEG处理"""
+    return IMAGE_MIME_TYPES.get(os.path.splitext(image_path)[1].lower(), 'image/jpeg')
+
+
+def is_colorless(image, saturation=60, max_ratio=0.005):
+    """
+    判断图像是否基本没有彩色内容（可以安全地转为灰度）
+    在缩略图上统计饱和度和亮度都超过阈值的像素比例，深色像素的饱和度不稳定，不计入
+    :param saturation: 饱和度/亮度阈值（0-255）
+    :param max_ratio: 彩色像素比例上限
+    """
+    thumb = image.convert('RGB')
+    thumb.thumbnail((256, 256))
+    _, s, v = thumb.convert('HSV').split()
+    mask = ImageChops.multiply(
+        s.point(lambda x: 255 if x > saturation else 0),
+        v.point(lambda x: 255 if x > saturation else 0)
+    )
+    return mask.histogram()[255] <= max_ratio * thumb.width * thumb.height
+
+
+class ImagePreprocessor:
+    """
+    上传给视觉模型前的图像预处理：限制最长边、无彩色内容时转为灰度，并重新编码为较小的JPEG/WebP
+    重新编码后反而更大（且无需缩放）时保留原图，MIME类型与实际内容一致
+    """
+
+    def __init__(self, max_edge=1600, image_format='JPEG', quality=80, grayscale=True):
+        """
+        :param max_edge: 最长边的像素上限
+        :param image_format: 'JPEG' 或 'WEBP'
+        :param quality: 编码质量（1-95）
+        :param grayscale: 是否在图像基本无彩色时转为灰度
+        """
+        image_format = image_format.upper()
+        if image_format not in OUTPUT_FORMATS:
+            raise ValueError(f"不支持的图像编码格式：{image_format}")
+        self.max_edge = max_edge
+        self.image_format = image_format
+        self.quality = quality
+        self.grayscale = grayscale
+        self.images = 0
+        self.original_bytes = 0
+        self.encoded_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def options(self):
+        """预处理参数（参与OCR缓存键的计算，参数变化后重新识别）"""
+        return [self.max_edge, self.image_format, self.quality, self.grayscale]
+
+    def prepare(self, image_path):
+        """
+        读取并预处理图像
+        :param image_path: 图像路径
+        :return: (图像字节, MIME类型)
+        """
+        with open(image_path, 'rb') as f:
+            original = f.read()
+        data, mime_type = self._encode(original, guess_mime_type(image_path))
+
+        with self._lock:
+            self.images += 1
+            self.original_bytes += len(original)
+            self.encoded_bytes += len(data)
+        return data, mime_type
+
+    def _encode(self, original, original_mime_type):
+        if Image is None:
+            return original, original_mime_type
+
+        try:
+            image = Image.open(io.BytesIO(original))
+            scale = self.max_edge / max(image.size)
+            if scale < 1:
+                # JPEG在解码时直接按2的幂缩小（不小于目标尺寸），大幅减少大照片的解码和缩放耗时
+                image.draft('RGB', (math.ceil(image.width * scale), math.ceil(image.height * scale)))
+            ImageOps.exif_transpose(image, in_place=True)
+        except (OSError, ValueError):
+            # 无法解码的文件原样上传，由模型服务报告错误
+            return original, original_mime_type
+
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # 透明背景（截图常见）铺白底，JPEG不支持透明通道
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, (255, 255, 255))
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        # 先转灰度再缩放，单通道缩放更快
+        if self.grayscale and image.mode != 'L' and is_colorless(image):
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        resized = max(image.size) > self.max_edge
+        if resized:
+            image.thumbnail((self.max_edge, self.max_edge), Image.BICUBIC)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format=self.image_format, quality=self.quality, optimize=True)
+        data = buffer.getvalue()
+        if not resized and len(data) >= len(original):
+            return original, original_mime_type
+        return data, OUTPUT_FORMATS[self.image_format]
+
+    def stats(self):
+        """已处理的图像数、原始/编码后总字节数与节省的字节数"""
+        with self._lock:
+            return {
+                'images': self.images,
+                'original_bytes': self.original_bytes,
+                'encoded_bytes': self.encoded_bytes,
+                'bytes_saved': self.original_bytes - self.encoded_bytes
+            }
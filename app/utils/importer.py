@@ -0,0 +1,219 @@
+import io
+import os
+import time
+
+import pandas as pd
+
+from app import db
+from app.models import Income, Expense, Asset, Liability, ImportJob
+from app.services.summary import summarize_records
+from app.services.holdings import assign_holdings
+from app.services.cache import bump_data_version
+
+# 各数据类型的导入规格：模型、日期列、必填列
+IMPORT_SPECS = {
+    'income': {
+        'model': Income,
+        'date_column': 'date',
+        'required_columns': ['date', 'category', 'amount', 'source']
+    },
+    'expense': {
+        'model': Expense,
+        'date_column': 'date',
+        'required_columns': ['date', 'category', 'amount', 'payer']
+    },
+    'asset': {
+        'model': Asset,
+        'date_column': 'update_date',
+        'required_columns': ['name', 'type', 'amount', 'owner', 'update_date']
+    },
+    'liability': {
+        'model': Liability,
+        'date_column': 'update_date',
+        'required_columns': ['name', 'type', 'amount', 'owner', 'update_date']
+    }
+}
+
+VALID_PERIOD_TYPES = ['monthly', 'annual']
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_STREAM_CHUNK_ROWS = 20000
+
+
+def normalize_dataframe(df, data_type):
+    """
+    按列批量规范化导入数据（日期解析、period_type默认值与校验、描述空值处理）
+    :param df: 从CSV读取的DataFrame
+    :param data_type: 数据类型："income"、"expense"、"asset"或"liability"
+    :return: 可直接用于批量插入的字典列表
+    """
+    spec = IMPORT_SPECS[data_type]
+
+    missing = [col for col in spec['required_columns'] if col not in df.columns]
+    if missing:
+        raise ValueError(f"缺少必填列：{', '.join(missing)}")
+
+    columns = {}
+    for col in spec['required_columns']:
+        columns[col] = df[col]
+
+    # 日期列整体解析
+    date_column = spec['date_column']
+    columns[date_column] = pd.to_datetime(df[date_column]).dt.date
+
+    # 金额列整体转换为浮点数
+    columns['amount'] = df['amount'].astype(float)
+
+    # 检查是否有period_type列，如果没有默认设置为'monthly'，且只能是'monthly'或'annual'
+    if 'period_type' in df.columns:
+        period_type = df['period_type'].fillna('monthly').astype(str).str.strip().str.lower()
+        columns['period_type'] = period_type.where(period_type.isin(VALID_PERIOD_TYPES), 'monthly')
+    else:
+        columns['period_type'] = pd.Series('monthly', index=df.index)
+
+    # 描述列空值统一为None
+    if 'description' in df.columns:
+        description = df['description'].astype(object)
+        columns['description'] = description.where(pd.notna(description), None)
+    else:
+        columns['description'] = pd.Series(None, index=df.index, dtype=object)
+
+    return pd.DataFrame(columns).astype(object).to_dict('records')
+
+
+def bulk_insert(model, records, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    分块批量插入记录（executemany），调用方负责提交事务
+    :param model: 目标模型
+    :param records: 字典列表
+    :param chunk_size: 每批插入的行数
+    :return: 插入的行数
+    """
+    table = model.__table__
+    for start in range(0, len(records), chunk_size):
+        db.session.execute(table.insert(), records[start:start + chunk_size])
+    return len(records)
+
+
+def import_dataframe(df, data_type, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    批量导入DataFrame，所有分块在同一事务中提交
+    :param df: 从CSV读取的DataFrame
+    :param data_type: 数据类型
+    :param chunk_size: 每批插入的行数
+    :return: (导入行数, 耗时秒数)
+    """
+    if data_type not in IMPORT_SPECS:
+        raise ValueError(f"未知的数据类型：{data_type}")
+
+    start_time = time.perf_counter()
+    records = normalize_dataframe(df, data_type)
+
+    try:
+        if data_type in ('asset', 'liability'):
+            assign_holdings(data_type, records)
+        count = bulk_insert(IMPORT_SPECS[data_type]['model'], records, chunk_size)
+        summarize_records(data_type, records)
+        bump_data_version()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return count, time.perf_counter() - start_time
+
+
+def iter_csv_chunks(file_path, chunk_rows=DEFAULT_STREAM_CHUNK_ROWS, start_offset=0):
+    """
+    按固定行数分块读取CSV，每块都带上表头单独解析，内存占用与文件大小无关
+    :param file_path: CSV文件路径
+    :param chunk_rows: 每块的行数
+    :param start_offset: 续传时开始读取的字节偏移量（0表示从头开始）
+    :return: 生成器，产出 (DataFrame, 本块结束后的字节偏移量)
+    """
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        if start_offset > f.tell():
+            f.seek(start_offset)
+
+        while True:
+            lines = []
+            while len(lines) < chunk_rows:
+                line = f.readline()
+                if not line:
+                    break
+                # 引号内的换行属于同一条记录，继续读取直到引号闭合
+                while line.count(b'"') % 2 == 1:
+                    next_line = f.readline()
+                    if not next_line:
+                        break
+                    line += next_line
+                lines.append(line)
+
+            if not lines:
+                return
+
+            yield pd.read_csv(io.BytesIO(header + b''.join(lines))), f.tell()
+
+
+def create_import_job(data_type, filename, file_path):
+    """为已保存的上传文件创建流式导入任务"""
+    if data_type not in IMPORT_SPECS:
+        raise ValueError(f"未知的数据类型：{data_type}")
+
+    job = ImportJob(
+        data_type=data_type,
+        filename=filename,
+        file_path=file_path,
+        file_size=os.path.getsize(file_path)
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def stream_import_job(job, chunk_rows=DEFAULT_STREAM_CHUNK_ROWS, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    流式执行导入任务：每读取一块就写入并提交一次，同时记录字节偏移量，
+    失败后再次调用即可从上次提交的位置继续
+    :param job: ImportJob实例
+    :param chunk_rows: 每次读取并提交的行数
+    :param chunk_size: 每批插入的行数
+    :return: (本次导入行数, 耗时秒数)
+    """
+    model = IMPORT_SPECS[job.data_type]['model']
+    start_time = time.perf_counter()
+    count = 0
+
+    job.status = 'running'
+    job.error = None
+    db.session.commit()
+
+    try:
+        for df, offset in iter_csv_chunks(job.file_path, chunk_rows, job.byte_offset):
+            records = normalize_dataframe(df, job.data_type)
+            if job.data_type in ('asset', 'liability'):
+                assign_holdings(job.data_type, records)
+            bulk_insert(model, records, chunk_size)
+            summarize_records(job.data_type, records)
+            bump_data_version()
+            # 数据、月度汇总与偏移量在同一事务中提交，保证续传时不重复也不遗漏
+            job.byte_offset = offset
+            job.rows_imported += len(records)
+            db.session.commit()
+            count += len(records)
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.error = str(e)[:500]
+        db.session.commit()
+        raise
+
+    job.status = 'completed'
+    db.session.commit()
+    return count, time.perf_counter() - start_time
+
+
+def format_throughput(count, elapsed):
+    """生成导入吞吐量说明文字"""
+    rate = count / elapsed if elapsed > 0 else float(count)
+    return f"共 {count} 条记录，耗时 {elapsed:.2f} 秒（{rate:,.0f} 条/秒）"
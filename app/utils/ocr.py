@@ -4,25 +4,105 @@ import json
 import os
 import re
 
+from app.utils.ocr_cache import ocr_cache_key
+from app.utils.http_client import ResilientSession, CircuitBreaker
+from app.utils.image_prep import ImagePreprocessor, guess_mime_type
+from app.utils.html_table import IrregularTableError, read_first_table
+
+# 银行分类报告识别的系统提示词（同时参与OCR缓存键的计算）
+BANK_REPORT_SYSTEM_PROMPT = """你是一个专业的OCR识别专家：
+1. 请从人的视角来进行理解提取，仅提取与交易相关的内容
+2. 最终输出只保留：交易类型、金额。以纯文本形式输出，每行一个项目，每个项目包含交易类型和金额。
+3. 严禁以任何形式输出表格或HTML标签。严禁使用任何表格结构、HTML标签或Markdown表格语法。"
+"""
+
+# 文本清理与解析使用的正则表达式（模块加载时编译一次）
+WHITESPACE_RE = re.compile(r'\s+')
+# 只保留中文、英文和空白
+NON_WORD_RE = re.compile(r'[^\u4e00-\u9fa5a-zA-Z\s]')
+# 单独的金额行（如 8,030.47、1.28万）
+AMOUNT_LINE_RE = re.compile(r'^\d+,\d+\.\d+|\d+\.\d+万?$')
+# 行尾带金额（支持货币符号 ¥、$，可选 ** 包裹）
+TRAILING_AMOUNT_RE = re.compile(
+    r'((?:\*\*)?[¥$]?\s*(?:\d+,\d+|\d+)\.\d+(?:万)?|(?:\*\*)?[¥$]?\s*(?:\d+\.\d+|\d+)\s*万)(?:\*\*)?$'
+)
+# "分类名称 金额" 格式，支持数字格式：1.28万、8030.47、8,030.47，支持货币符号 ¥、$
+CATEGORY_LINE_RE = re.compile(r"(.+?)\s*([¥$]?\s*((?:\d+,\d+|\d+)\.\d+(?:万)?|(?:\d+\.\d+|\d+)\s*万))")
+# 块格式中的金额片段（支持可选的 ** 包裹）
+AMOUNT_TOKEN_RE = re.compile(r'^\s*(?:\*\*)?[¥$]?\s*((?:\d+,\d+|\d+)\.\d+(?:万)?|(?:\d+\.\d+|\d+)\s*万)\s*(?:\*\*)?$')
+# 块格式的分隔符：#### 分隔区块（捕获，用于识别区块边界），- 分隔区块内的分类和金额
+BLOCK_SEPARATOR_RE = re.compile(r'(####)|-')
+# 转换金额前移除的千位分隔符、** 包裹和货币符号
+AMOUNT_STRIP_CHARS = str.maketrans('', '', ',*¥$')
+# 汇总行，不作为分类导入
+SUMMARY_NAMES = frozenset(["总计", "总额", "合计"])
+# 年度对比表中餐饮类的"更多(XX类)"条目行
+MORE_CATEGORIES_RE = re.compile(r'更多\s*\(\d+类\)')
+
+
+def parse_amount(amount_str):
+    """
+    将金额片段转换为数字，支持千位分隔符、货币符号、** 包裹和"万"单位
+    :raises ValueError: 无法转换
+    """
+    amount_str = amount_str.translate(AMOUNT_STRIP_CHARS)
+    if "万" in amount_str:
+        return float(amount_str.replace("万", "").strip()) * 10000
+    return float(amount_str)
+
+
+def block_pairs(line):
+    """
+    单次扫描将块格式行（#### 分隔区块，- 分隔分类和金额）切分为候选的 (分类, 金额) 对
+    每个区块内按顺序两两配对，区块之间互不影响
+    """
+    pairs = []
+    tokens = []
+    parts = BLOCK_SEPARATOR_RE.split(line)
+    # split 的结果依次为：片段, 分隔符捕获组, 片段, ...（- 分隔时捕获组为None）
+    for i in range(0, len(parts), 2):
+        token = parts[i].strip()
+        if token:
+            tokens.append(token)
+        if i + 1 == len(parts) or parts[i + 1] is not None:
+            pairs.extend(zip(tokens[0::2], tokens[1::2]))
+            tokens = []
+    return pairs
+
+
 class LocalDeepSeekOCR:
-    def __init__(self, api_url="http://localhost:1234/v1/chat/completions"):
+    def __init__(self, api_url="http://localhost:1234/v1/chat/completions", cache=None, http=None,
+                 preprocessor=None, stream=False):
         """
         初始化本地LMstudio客户端
         :param api_url: LMstudio OCR服务地址
+        :param cache: OCRCache实例（可选），缓存识别结果
+        :param http: ResilientSession实例（可选），默认新建一个带连接池、超时、重试和熔断的会话
+        :param preprocessor: ImagePreprocessor实例（可选），上传前缩放并重新编码图像；为None时上传原图
+        :param stream: 是否以流式方式接收识别结果（提供 on_category 回调时生效）
         """
         self.api_url = api_url
+        self.cache = cache
+        self.http = http or ResilientSession()
+        self.preprocessor = preprocessor
+        self.stream = stream
         self.default_headers = {
             "Content-Type": "application/json"
         }
     
-    def image_to_base64(self, image_path):
+    def image_to_data_url(self, image_path):
         """
-        将图像文件转换为base64编码
+        将图像转换为data URL，配置了预处理时先缩放并重新编码
         :param image_path: 图像文件路径
-        :return: base64编码字符串
+        :return: data:<MIME类型>;base64,... 字符串
         """
-        with open(image_path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+        if self.preprocessor is not None:
+            data, mime_type = self.preprocessor.prepare(image_path)
+        else:
+            with open(image_path, "rb") as f:
+                data = f.read()
+            mime_type = guess_mime_type(image_path)
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
     
     def clean_raw_content(self, raw_content):
         """
@@ -30,22 +110,11 @@ class LocalDeepSeekOCR:
         :param raw_content: 原始提取的文本
         :return: 清理后的文本
         """
-        import re
-        
         # 移除制表符和其他格式符
-        content = raw_content.replace('\t', ' ')
-        content = content.replace('\r', '')
+        content = raw_content.replace('\t', ' ').replace('\r', '')
         
-        # 处理每行内容：移除行首行尾空格，保留换行符
-        lines = content.split('\n')
-        cleaned_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line:  # 只保留非空行
-                # 移除行内连续空格
-                line = re.sub(r'\s+', ' ', line)
-                cleaned_lines.append(line)
+        # 逐行移除行首行尾空格和行内连续空格，只保留非空行
+        cleaned_lines = [WHITESPACE_RE.sub(' ', line) for line in map(str.strip, content.split('\n')) if line]
         
         # 将清理后的行重新组合，保留换行结构
         return '\n'.join(cleaned_lines)
@@ -56,18 +125,39 @@ class LocalDeepSeekOCR:
         :param text: 原始文本
         :return: 清理后的文本
         """
-        import re
-        
-        # 只保留中文、英文
-        # 匹配中文：[\u4e00-\u9fa5]
-        # 匹配英文：[a-zA-Z]
-        # 匹配空格：\s
-        cleaned_text = re.sub(r'[^\u4e00-\u9fa5a-zA-Z\s]', '', text)
-        
-        # 移除多余的空格
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-        
-        return cleaned_text
+        # 只保留中文（\u4e00-\u9fa5）、英文和空格，再移除多余的空格
+        return WHITESPACE_RE.sub(' ', NON_WORD_RE.sub('', text)).strip()
+
+    def merge_line(self, line, current_category=None):
+        """
+        单行合并：金额行与前面的分类名称行合并到同一行
+        :param line: 清理后的一行文本
+        :param current_category: 之前尚未匹配到金额的分类名称行
+        :return: (合并后的行，没有输出时为None, 新的待匹配分类名称行)
+        """
+        line = line.strip()
+        if not line:
+            return None, current_category
+            
+        # 检查是否为金额行
+        if AMOUNT_LINE_RE.match(line):
+            if current_category:
+                # 将金额与前一个分类合并
+                return f"{current_category} {line}", None
+            # 单独的金额行，可能是格式问题，直接保留
+            return line, None
+        
+        # 已经包含金额的行，直接保留
+        if TRAILING_AMOUNT_RE.search(line):
+            return line, current_category
+        
+        # 可能是分类名称行或块格式行
+        # 检查是否为块格式行（包含多个 -），直接保留
+        if line.count('-') >= 2:
+            return line, current_category
+        
+        # 分类名称行
+        return None, line
 
     def merge_lines(self, cleaned_content):
         """
@@ -75,70 +165,27 @@ class LocalDeepSeekOCR:
         :param cleaned_content: 清理后的文本
         :return: 合并后的文本
         """
-        import re
-        
-        lines = cleaned_content.split('\n')
         merged_lines = []
         current_category = None
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # 检查是否为金额行
-            amount_pattern = r'^\d+,\d+\.\d+|\d+\.\d+万?$'
-            if re.match(amount_pattern, line):
-                if current_category:
-                    # 将金额与前一个分类合并
-                    merged_lines.append(f"{current_category} {line}")
-                    current_category = None
-                else:
-                    # 单独的金额行，可能是格式问题，直接保留
-                    merged_lines.append(line)
-            else:
-                # 检查是否包含金额（支持货币符号 ¥、$，可选 ** 包裹）
-                has_amount = re.search(r'((?:\*\*)?[¥$]?\s*(?:\d+,\d+|\d+)\.\d+(?:万)?|(?:\*\*)?[¥$]?\s*(?:\d+\.\d+|\d+)\s*万)(?:\*\*)?$', line)
-                if has_amount:
-                    # 已经包含金额的行，直接保留
-                    merged_lines.append(line)
-                else:
-                    # 可能是分类名称行或块格式行
-                    # 检查是否为块格式行（包含多个 -）
-                    if '-' in line and line.count('-') >= 2:
-                        # 块格式行，直接保留
-                        merged_lines.append(line)
-                    else:
-                        # 分类名称行
-                        current_category = line
+        for line in cleaned_content.split('\n'):
+            merged, current_category = self.merge_line(line, current_category)
+            if merged is not None:
+                merged_lines.append(merged)
         
         return '\n'.join(merged_lines)
 
-    def extract_raw_content(self, image_path, model_name="qwen/qwen3-vl-4b", temperature=0.1):
-        """
-        提取图像中的原始文本内容
-        :param image_path: 图像路径
-        :param model_name: 模型名称
-        :param temperature: 生成温度，设置为低确保输出稳定
-        :return: 原始提取的文本内容
-        """
-        if not os.path.exists(image_path):
-            raise FileNotFoundError(f"Image file not found: {image_path}")
-        
-        # 转换图像为base64
-        base64_image = self.image_to_base64(image_path)
+    def _bank_report_payload(self, image_path, model_name, temperature, stream=False):
+        """构建银行分类报告识别的请求 payload"""
+        # 转换图像为base64（按配置缩放、重新编码）
+        image_url = self.image_to_data_url(image_path)
         
-        # 构建请求 payload
-        payload = {
+        return {
             "model": model_name,
             "messages": [
                 {
                     "role": "system",
-                    "content": """你是一个专业的OCR识别专家：
-1. 请从人的视角来进行理解提取，仅提取与交易相关的内容
-2. 最终输出只保留：交易类型、金额。以纯文本形式输出，每行一个项目，每个项目包含交易类型和金额。
-3. 严禁以任何形式输出表格或HTML标签。严禁使用任何表格结构、HTML标签或Markdown表格语法。"
-"""
+                    "content": BANK_REPORT_SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
@@ -150,7 +197,7 @@ class LocalDeepSeekOCR:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+                                "url": image_url
                             }
                         }
                     ]
@@ -158,18 +205,31 @@ class LocalDeepSeekOCR:
             ],
             "temperature": temperature,
             "max_tokens": -1,
-            "stream": False
+            "stream": stream
         }
+
+    def extract_raw_content(self, image_path, model_name="qwen/qwen3-vl-4b", temperature=0.1):
+        """
+        提取图像中的原始文本内容
+        :param image_path: 图像路径
+        :param model_name: 模型名称
+        :param temperature: 生成温度，设置为低确保输出稳定
+        :return: 原始提取的文本内容
+        """
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        
+        # 构建请求 payload
+        payload = self._bank_report_payload(image_path, model_name, temperature)
         
         try:
-            # 发送请求
-            response = requests.post(
-                url=self.api_url,
+            # 发送请求（复用连接池，超时、重试和熔断见 ResilientSession）
+            response = self.http.post(
+                self.api_url,
                 headers=self.default_headers,
                 json=payload
             )
             
-            response.raise_for_status()
             result = response.json()
             return result["choices"][0]["message"]["content"]
             
@@ -178,127 +238,116 @@ class LocalDeepSeekOCR:
         except Exception as e:
             raise Exception(f"文本提取失败: {str(e)}") from e
 
+    def stream_raw_content(self, image_path, model_name="qwen/qwen3-vl-4b", temperature=0.1):
+        """
+        以流式方式提取图像中的原始文本（OpenAI兼容接口的SSE响应），模型每生成一段就返回一段
+        读取超时按相邻两段之间的间隔计算；服务不支持流式、返回普通JSON时整段返回
+        :param image_path: 图像路径
+        :param model_name: 模型名称
+        :param temperature: 生成温度
+        :return: 文本片段的生成器
+        """
+        if not os.path.exists(image_path):
+            raise FileNotFoundError(f"Image file not found: {image_path}")
+        
+        payload = self._bank_report_payload(image_path, model_name, temperature, stream=True)
+        
+        try:
+            response = self.http.post(
+                self.api_url,
+                headers=self.default_headers,
+                json=payload,
+                stream=True
+            )
+            with response:
+                if not response.headers.get('Content-Type', '').startswith('text/event-stream'):
+                    yield response.json()["choices"][0]["message"]["content"]
+                    return
+                
+                # text/event-stream 未声明字符集时requests会按ISO-8859-1解码
+                response.encoding = 'utf-8'
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    content = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if content:
+                        yield content
+            
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"OCR API调用失败: {str(e)}") from e
+        except (KeyError, IndexError, ValueError) as e:
+            raise Exception(f"文本提取失败: {str(e)}") from e
+
     def parse_category_report(self, raw_content, report_type="expense"):
         """
         解析银行分类报告（收入/支出分类）
+        每行先按块格式（#### 分隔区块，- 分隔分类和金额）解析，没有解析出分类时再按 "分类名称 金额" 格式匹配
         :param raw_content: OCR提取的原始文本
         :param report_type: 报告类型："income"或"expense"
         :return: 结构化的分类数据
         """
-        import re
-        
-        # 定义金额和分类的正则表达式模式
-        # 匹配 "分类名称 金额" 格式，支持数字格式：1.28万、8030.47、8,030.47，支持货币符号 ¥、$
-        pattern = r"(.+?)\s*([¥$]?\s*((?:\d+,\d+|\d+)\.\d+(?:万)?|(?:\d+\.\d+|\d+)\s*万))"
-        
+        category_type = "income" if report_type == "income" else "expense"
         categories = []
         
-        # 处理内容：支持分块和单行格式
-        content_blocks = raw_content.split("\n\n")  # 按段落分块
-        
-        for block in content_blocks:
-            block = block.strip()
-            if not block:
+        for line in raw_content.split("\n"):
+            line = line.strip()
+            if not line:
                 continue
-                
-            # 逐行处理块内内容
-            lines = block.split("\n")
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                    
-                # 尝试块格式处理
-                block_processed = False
-                
-                # 1. 先按 #### 分割成不同的区块（如果有）
-                sections = line.split("####")
-                
-                for section in sections:
-                    section = section.strip()
-                    if not section:
-                        continue
-                        
-                    # 2. 在每个区块内，按 "-" 分割为多个分类-金额对
-                    tokens = [t.strip() for t in section.split("-") if t.strip()]
-                    
-                    if len(tokens) >= 2:
-                        # 检查是否为有效的分类-金额对列表
-                        for i in range(0, len(tokens) - 1, 2):
-                            category_name_candidate = tokens[i]
-                            amount_str_candidate = tokens[i + 1]
-                            
-                            # 验证金额格式（支持可选的 ** 包裹）
-                            amount_pattern = r'^\s*(?:\*\*)?[¥$]?\s*((?:\d+,\d+|\d+)\.\d+(?:万)?|(?:\d+\.\d+|\d+)\s*万)\s*(?:\*\*)?$'
-                            if re.match(amount_pattern, amount_str_candidate):
-                                # 清理分类名称
-                                category_name = self.clean_special_chars(category_name_candidate)
-                                
-                                # 跳过汇总行
-                                if category_name in ["总计", "总额", "合计"]:
-                                    continue
-                                    
-                                # 转换金额为数字格式
-                                try:
-                                    amount_str = amount_str_candidate.replace(",", "")  # 移除千位分隔符
-                                    amount_str = amount_str.replace("**", "")  # 移除 ** 包裹
-                                    amount_str = re.sub(r'[¥$]', '', amount_str)  # 移除货币符号
-                                    
-                                    if "万" in amount_str:
-                                        num_part = amount_str.replace("万", "").strip()
-                                        amount = float(num_part) * 10000
-                                    else:
-                                        amount = float(amount_str)
-                                        
-                                    categories.append({
-                                        "category_name": category_name,
-                                        "amount": amount,
-                                        "type": "income" if report_type == "income" else "expense"
-                                    })
-                                    
-                                    block_processed = True  # 标记为已处理块格式
-                                    
-                                except ValueError as e:
-                                    print(f"警告：无法转换金额 {amount_str_candidate} 为数字，跳过该记录")
-                                    continue
-                
-                # 如果块格式处理没有成功匹配，尝试原始行匹配
-                if not block_processed:
-                    match = re.match(pattern, line)
-                    if not match:
+            
+            # 尝试块格式处理（不含分隔符的行不可能构成分类-金额对）
+            block_processed = False
+            if '-' in line:
+                for category_name, amount_str in block_pairs(line):
+                    if not AMOUNT_TOKEN_RE.match(amount_str):
                         continue
-                        
-                    # 清理分类名称和金额
-                    category_name = match.group(1).strip()
-                    amount_str = match.group(2).strip()
-                    
-                    # 清理特殊符号，只保留中文和英文
                     category_name = self.clean_special_chars(category_name)
                     
                     # 跳过汇总行
-                    if category_name in ["总计", "总额", "合计"]:
+                    if category_name in SUMMARY_NAMES:
                         continue
-                        
-                    # 转换金额为数字格式
+                    
                     try:
-                        amount_str = amount_str.replace(",", "")  # 移除千位分隔符
-                        amount_str = re.sub(r'[¥$]', '', amount_str)  # 移除货币符号
-                        
-                        if "万" in amount_str:
-                            num_part = amount_str.replace("万", "").strip()
-                            amount = float(num_part) * 10000
-                        else:
-                            amount = float(amount_str)
-                            
-                        categories.append({
-                            "category_name": category_name,
-                            "amount": amount,
-                            "type": "income" if report_type == "income" else "expense"
-                        })
-                        
-                    except ValueError as e:
+                        amount = parse_amount(amount_str)
+                    except ValueError:
                         print(f"警告：无法转换金额 {amount_str} 为数字，跳过该记录")
-                        continue  # 跳过无法转换的金额
+                        continue
+                    
+                    categories.append({
+                        "category_name": category_name,
+                        "amount": amount,
+                        "type": category_type
+                    })
+                    block_processed = True  # 标记为已处理块格式
+            
+            # 如果块格式处理没有成功匹配，尝试原始行匹配
+            if block_processed:
+                continue
+            match = CATEGORY_LINE_RE.match(line)
+            if not match:
+                continue
+            
+            # 清理特殊符号，只保留中文和英文
+            category_name = self.clean_special_chars(match.group(1).strip())
+            
+            # 跳过汇总行
+            if category_name in SUMMARY_NAMES:
+                continue
+            
+            amount_str = match.group(2).strip()
+            try:
+                amount = parse_amount(amount_str)
+            except ValueError:
+                print(f"警告：无法转换金额 {amount_str} 为数字，跳过该记录")
+                continue  # 跳过无法转换的金额
+            
+            categories.append({
+                "category_name": category_name,
+                "amount": amount,
+                "type": category_type
+            })
         
         # 计算总计
         total_amount = sum(cat["amount"] for cat in categories)
@@ -310,17 +359,63 @@ class LocalDeepSeekOCR:
             "categories": categories
         }
 
-    def analyze_bank_report(self, image_path, report_type="expense", model_name="qwen/qwen3-vl-4b"):
+    def analyze_bank_report(self, image_path, report_type="expense", model_name="qwen/qwen3-vl-4b",
+                            temperature=0.1, use_cache=True, on_category=None):
         """
         分析银行分类报告图像（收入/支出分类）
         :param image_path: 报告图像路径
         :param report_type: 报告类型："income"或"expense"
         :param model_name: 模型名称
+        :param temperature: 生成温度
+        :param use_cache: 为False时跳过缓存重新识别（结果仍会写入缓存）
+        :param on_category: 回调函数（可选），开启流式识别时每解析出一个分类就调用一次
         :return: 结构化分析结果
         """
+        cache_key = None
+        if self.cache is not None and os.path.exists(image_path):
+            with open(image_path, "rb") as f:
+                cache_key = ocr_cache_key(f.read(), model_name, temperature, BANK_REPORT_SYSTEM_PROMPT, report_type,
+                                          self.preprocessor.options if self.preprocessor is not None else None)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+        
+        result = self._analyze_bank_report(image_path, report_type, model_name, temperature, on_category)
+        
+        if cache_key is not None:
+            self.cache.set(cache_key, result)
+        return result
+    
+    def _analyze_bank_report(self, image_path, report_type, model_name, temperature, on_category=None):
+        """调用OCR模型并解析结果（不经过缓存）"""
         # 先提取原始文本
-        raw_content = self.extract_raw_content(image_path, model_name=model_name)
+        if self.stream and on_category is not None:
+            raw_content = self._stream_bank_report(image_path, report_type, model_name, temperature, on_category)
+        else:
+            raw_content = self.extract_raw_content(image_path, model_name=model_name, temperature=temperature)
         
+        return self.build_bank_report(raw_content, report_type)
+    
+    def _stream_bank_report(self, image_path, report_type, model_name, temperature, on_category):
+        """流式提取原始文本，边接收边解析并回调已完整的分类，返回完整的原始文本"""
+        parser = IncrementalReportParser(self, report_type)
+        chunks = []
+        for chunk in self.stream_raw_content(image_path, model_name=model_name, temperature=temperature):
+            chunks.append(chunk)
+            for category in parser.feed(chunk):
+                on_category(category)
+        for category in parser.close():
+            on_category(category)
+        return ''.join(chunks)
+    
+    def build_bank_report(self, raw_content, report_type="expense"):
+        """
+        将模型返回的原始文本解析为结构化分析结果
+        :param raw_content: OCR提取的原始文本
+        :param report_type: 报告类型："income"或"expense"
+        :return: 结构化分析结果
+        """
         # 检查是否包含HTML表格
         if '<table>' in raw_content:
             # 直接解析HTML表格
@@ -386,7 +481,7 @@ class LocalDeepSeekOCR:
         if not os.path.exists(image_path):
             raise FileNotFoundError(f"Image file not found: {image_path}")
         
-        base64_image = self.image_to_base64(image_path)
+        image_url = self.image_to_data_url(image_path)
         
         payload = {
             "model": model_name,
@@ -399,7 +494,7 @@ class LocalDeepSeekOCR:
                     "role": "user",
                     "content": [
                         {"type": "text", "text": prompt},
-                        {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}}
+                        {"type": "image_url", "image_url": {"url": image_url}}
                     ]
                 }
             ],
@@ -408,8 +503,7 @@ class LocalDeepSeekOCR:
             "stream": False
         }
         
-        response = requests.post(self.api_url, headers=self.default_headers, json=payload)
-        response.raise_for_status()
+        response = self.http.post(self.api_url, headers=self.default_headers, json=payload)
         
         result = response.json()
         return result["choices"][0]["message"]["content"]
@@ -444,60 +538,60 @@ class LocalDeepSeekOCR:
     def parse_html_table(self, html_content, report_type="expense"):
         """
         解析HTML表格并提取“对比去年”之后的有效交易数据
+        先用标准库 html.parser 单次扫描读取表格，表格中包含脚本、少见的字符实体等内容时改用BeautifulSoup解析
         :param html_content: HTML表格内容
-        :return: 结构化的交易数据
+        :return: 结构化的交易数据，没有表格时返回None
         """
+        try:
+            rows = read_first_table(html_content)
+        except IrregularTableError:
+            rows = self._read_first_table_bs4(html_content)
+        
+        if rows is None:
+            return None
+        return self._parse_table_rows(rows, report_type)
+    
+    def _read_first_table_bs4(self, html_content):
+        """用BeautifulSoup读取第一个表格各行 <td> 单元格的文本（可容错不规则的HTML）"""
         from bs4 import BeautifulSoup
-        import pandas as pd
         
         soup = BeautifulSoup(html_content, 'html.parser')
-        tables = soup.find_all('table')
-        
-        if not tables:
+        table = soup.find('table')  # 处理第一个表格
+        if table is None:
             return None
-            
-        table = tables[0]  # 处理第一个表格
-        rows = table.find_all('tr')
+        return [[cell.get_text(strip=True) for cell in row.find_all('td')] for row in table.find_all('tr')]
+    
+    def _parse_table_rows(self, rows, report_type="expense"):
+        """
+        从表格各行的单元格文本中提取分类和金额
+        :param rows: 行列表，第一行为表头
+        :return: 结构化的交易数据
+        """
+        if not rows or not rows[0]:
+            raise ValueError("HTML表格缺少表头")
         
         # 解析表头
-        headers = []
-        header_row = rows[0]
-        header_cells = header_row.find_all('td')
-        for cell in header_cells:
-            headers.append(cell.get_text(strip=True))
+        headers = rows[0]
         
-        # 解析表格数据
+        # 解析表格数据，确保行数据与表头长度一致
         table_data = []
-        for row in rows[1:]:
-            cells = row.find_all('td')
-            row_data = []
-            for cell in cells:
-                row_data.append(cell.get_text(strip=True))
-            
-            # 确保行数据与表头长度一致
-            if len(row_data) < len(headers):
-                row_data += [''] * (len(headers) - len(row_data))
-            
-            table_data.append(row_data)
-        
-        df = pd.DataFrame(table_data, columns=headers)
+        for row_data in rows[1:]:
+            if len(row_data) > len(headers):
+                raise ValueError(f"HTML表格的行有 {len(row_data)} 列，多于表头的 {len(headers)} 列")
+            table_data.append(row_data + [''] * (len(headers) - len(row_data)))
         
         # 检测表格格式
-        first_col = headers[0]
         second_col = headers[1] if len(headers) > 1 else ''
         
         # 处理简单的两列格式（如：支出项目 - 金额）
         if len(headers) == 2 and ('金额' in second_col or '元' in second_col or '万' in second_col):
             # 直接处理为单年度支出数据
-            valid_transactions = []
+            standardized_categories = []
             
             # 检查金额单位是否为万元
             is_ten_thousand_unit = '万元' in second_col
             
-            for index, row in df.iterrows():
-                transaction_type = row.iloc[0]
-                amount = row.iloc[1]
-                
+            for transaction_type, amount in table_data:
                 # 仅跳过空行和无效行，保留"更多(XX类)"行
                 if not transaction_type or not amount:
                     continue
@@ -508,27 +602,14 @@ class LocalDeepSeekOCR:
                     if is_ten_thousand_unit:
                         converted_amount *= 10000
                     
-                    valid_transactions.append({
-                        'transaction_type': transaction_type,
-                        'amounts': [{
-                            # 假设为当前年度或统一处理
-                            'year': '2024-2025',
-                            'amount': converted_amount
-                        }],
-                        'category': transaction_type
+                    standardized_categories.append({
+                        "category_name": transaction_type,
+                        "amount": converted_amount,
+                        "type": report_type
                     })
             
             # 计算总计信息
-            total_amount = sum(transaction['amounts'][0]['amount'] for transaction in valid_transactions)
-            
-            # 转换为与文本解析一致的格式
-            standardized_categories = []
-            for transaction in valid_transactions:
-                standardized_categories.append({
-                    "category_name": transaction['transaction_type'],
-                    "amount": transaction['amounts'][0]['amount'],
-                    "type": report_type
-                })
+            total_amount = sum(category['amount'] for category in standardized_categories)
             
             return {
                 "report_type": report_type,
@@ -538,20 +619,18 @@ class LocalDeepSeekOCR:
             }
         
         # 原有逻辑：处理年度对比格式
-        # 提取交易数据的核心逻辑
-        compare_row = df[df.iloc[:, 0] == '对比上年'].index
-        
-        if not compare_row.empty:
-            compare_idx = compare_row[0]
-            transaction_df = df.loc[compare_idx + 1:].reset_index(drop=True)
+        # 提取交易数据的核心逻辑：从第一个“对比上年”行之后开始
+        first_col_values = [row[0] for row in table_data]
+        if '对比上年' in first_col_values:
+            transaction_rows = table_data[first_col_values.index('对比上年') + 1:]
         else:
-            transaction_df = df
+            transaction_rows = table_data
             
-        # 筛选有效交易数据
-        valid_transactions = []
+        # 筛选有效交易数据，转换为标准化格式
+        standardized_categories = []
         
-        for index, row in transaction_df.iterrows():
-            transaction_type = row.iloc[0]
+        for row in transaction_rows:
+            transaction_type = row[0]
             # 跳过空行和无效行
             if not transaction_type:
                 continue
@@ -561,41 +640,31 @@ class LocalDeepSeekOCR:
             # 检查是否是餐饮类的更多条目行（兼容不同表格列数）
             if transaction_type == '餐饮':
                 # 检查最后一列是否为'更多(XX类)'（使用正则匹配）
-                if re.match(r'更多\s*\(\d+类\)', str(row.iloc[-1])):
+                if MORE_CATEGORIES_RE.match(row[-1]):
                     continue
                 
             # 收集所有非空金额列
             amounts = []
             for year_idx in range(1, len(row)):
-                amount = row.iloc[year_idx]
+                amount = row[year_idx]
                 if amount:
                     converted_amount = self._convert_amount(amount)
                     if converted_amount:
                         amounts.append({
-                            'year': df.columns[year_idx],
+                            'year': headers[year_idx],
                             'amount': converted_amount
                         })
             
             if amounts:
-                valid_transactions.append({
-                    'transaction_type': transaction_type,
-                    'amounts': amounts,
-                    'category': transaction_type  # 统一字段名
+                # 对于年度对比表，选择最新年份的金额
+                latest_year = max(amounts, key=lambda x: x['year'])
+                
+                standardized_categories.append({
+                    "category_name": transaction_type,
+                    "amount": latest_year['amount'],
+                    "type": report_type
                 })
         
-        # 转换为标准化格式
-        standardized_categories = []
-        
-        for transaction in valid_transactions:
-            # 对于年度对比表，选择最新年份的金额
-            latest_year = max(transaction['amounts'], key=lambda x: x['year'])
-            
-            standardized_categories.append({
-                "category_name": transaction['transaction_type'],
-                "amount": latest_year['amount'],
-                "type": report_type
-            })
-        
         # 计算总计信息
         total_amount = sum(category['amount'] for category in standardized_categories)
         
@@ -605,3 +674,77 @@ class LocalDeepSeekOCR:
             "category_count": len(standardized_categories),
             "categories": standardized_categories
         }
+
+
+class IncrementalReportParser:
+    """
+    流式识别结果的增量解析：每收到一整行就依次清理、与前面的分类名称行合并并解析，
+    结果与对完整文本调用 clean_raw_content、merge_lines、parse_category_report 一致；
+    出现HTML表格时停止输出，由完整文本统一解析
+    """
+
+    def __init__(self, ocr, report_type="expense"):
+        """
+        :param ocr: LocalDeepSeekOCR实例，复用其清理、合并和解析规则
+        :param report_type: 报告类型："income"或"expense"
+        """
+        self.ocr = ocr
+        self.report_type = report_type
+        self.buffer = ''
+        self.current_category = None
+        self.is_html = False
+
+    def feed(self, text):
+        """
+        追加一段文本，解析其中已完整的行
+        :return: 新解析出的分类列表
+        """
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split('\n')
+        return self._parse_lines(lines)
+
+    def close(self):
+        """文本结束，解析最后一行"""
+        lines, self.buffer = [self.buffer], ''
+        return self._parse_lines(lines)
+
+    def _parse_lines(self, lines):
+        categories = []
+        for line in lines:
+            if self.is_html or '<table>' in line:
+                self.is_html = True
+                return []
+            
+            line = self.ocr.clean_raw_content(line)
+            merged, self.current_category = self.ocr.merge_line(line, self.current_category)
+            if merged is not None:
+                categories.extend(self.ocr.parse_category_report(merged, self.report_type)['categories'])
+        return categories
+
+
+def init_ocr_client(app):
+    """
+    按配置创建应用共享的OCR客户端，所有请求复用同一个连接池和熔断器
+    :return: LocalDeepSeekOCR实例
+    """
+    config = app.config
+    http = ResilientSession(
+        connect_timeout=config['OCR_CONNECT_TIMEOUT'],
+        read_timeout=config['OCR_READ_TIMEOUT'],
+        max_retries=config['OCR_MAX_RETRIES'],
+        backoff=config['OCR_RETRY_BACKOFF'],
+        pool_size=config['OCR_MAX_WORKERS'],
+        breaker=CircuitBreaker(config['OCR_BREAKER_THRESHOLD'], config['OCR_BREAKER_RESET_TIMEOUT'])
+    )
+    preprocessor = None
+    if config['OCR_IMAGE_MAX_EDGE']:
+        preprocessor = ImagePreprocessor(
+            max_edge=config['OCR_IMAGE_MAX_EDGE'],
+            image_format=config['OCR_IMAGE_FORMAT'],
+            quality=config['OCR_IMAGE_QUALITY'],
+            grayscale=config['OCR_IMAGE_GRAYSCALE']
+        )
+    client = LocalDeepSeekOCR(api_url=config['OCR_API_URL'], cache=app.extensions.get('ocr_cache'), http=http,
+                              preprocessor=preprocessor, stream=config['OCR_STREAM'])
+    app.extensions['ocr_client'] = client
+    return client
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+def ocr_cache_key(image_bytes, model_name, temperature, system_prompt, report_type, preprocess_options=None):
+    """
+    计算OCR缓存键：图像内容、模型、温度、系统提示词、报告类型和图像预处理参数任一变化都对应不同的键
+    :return: SHA-256十六进制字符串
+    """
+    params = [model_name, temperature, system_prompt, report_type]
+    if preprocess_options is not None:
+        params.append(preprocess_options)
+    digest = hashlib.sha256()
+    digest.update(hashlib.sha256(image_bytes).digest())
+    digest.update(json.dumps(params, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class OCRCache:
+    """
+    OCR识别结果的磁盘缓存（SQLite），保存原始识别内容和解析结果，
+    总大小超过上限时按最近访问时间淘汰
+    """
+
+    def __init__(self, path, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        """打开缓存文件，首次使用时才创建目录和表"""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with sqlite3.connect(self.path, timeout=5) as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS ocr_cache ('
+                    'key TEXT PRIMARY KEY, result TEXT NOT NULL, size INTEGER NOT NULL, '
+                    'created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+                )
+                conn.execute('CREATE INDEX IF NOT EXISTS ix_ocr_cache_accessed_at ON ocr_cache (accessed_at)')
+            self._initialized = True
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key):
+        """
+        读取缓存的分析结果
+        :return: analyze_bank_report 的结果字典，未命中时返回None
+        """
+        with self._connect() as conn:
+            row = conn.execute('SELECT result FROM ocr_cache WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                conn.execute('UPDATE ocr_cache SET accessed_at = ? WHERE key = ?', (time.time(), key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, result):
+        """写入分析结果，并淘汰最久未访问的条目直到总大小不超过上限"""
+        data = json.dumps(result, ensure_ascii=False)
+        size = len(data.encode('utf-8'))
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO ocr_cache (key, result, size, created_at, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, data, size, now, now)
+            )
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM ocr_cache').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for old_key, old_size in conn.execute(
+                'SELECT key, size FROM ocr_cache ORDER BY accessed_at'
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM ocr_cache WHERE key = ?', (old_key,))
+                total -= old_size
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM ocr_cache')
+
+    def stats(self):
+        """条目数、总大小与命中/未命中计数"""
+        with self._connect() as conn:
+            entries, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM ocr_cache').fetchone()
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def init_ocr_cache(app):
+    """按配置创建OCR缓存，默认位于实例目录下；OCR_CACHE_MAX_BYTES 为0时关闭"""
+    max_bytes = app.config.get('OCR_CACHE_MAX_BYTES', 0)
+    if not max_bytes:
+        app.extensions['ocr_cache'] = None
+        return None
+
+    path = app.config.get('OCR_CACHE_PATH') or os.path.join(app.instance_path, 'ocr_cache.db')
+    cache = OCRCache(path, max_bytes)
+    app.extensions['ocr_cache'] = cache
+    return cache
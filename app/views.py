@@ -1,12 +1,21 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app, jsonify, Response, stream_with_context
 from app import db
-from app.models import Income, Expense, Asset, Liability
+from app.models import ImportJob, OCRJob, ExpenseClassification, EXPENSE_BUCKETS
 import pandas as pd
 import os
 import json
+import re
+import uuid
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from app.utils.ocr import LocalDeepSeekOCR
+from app.utils.importer import import_dataframe, create_import_job, format_throughput
+from app.services.summary import apply_deltas, item_deltas, rebuild_monthly_summary
+from app.services.holdings import assign_holding
+from app.services.settings import SETTING_TYPES, update_setting
+from app.services.cache import bump_data_version
+from app.services.pagination import KIND_ORDER, MAX_PAGE_SIZE, PAGE_SIZE_CHOICES, ledger_page, available_filters
+from app.services.ocr_jobs import create_ocr_jobs, batch_status, preview_expired
+from app.services.import_jobs import import_job_status
 import matplotlib
 matplotlib.use('Agg')  # 非GUI后端
 import matplotlib.pyplot as plt
@@ -35,6 +44,30 @@ def import_data():
         
         if file and file.filename.endswith('.csv'):
             filename = secure_filename(file.filename)
+            
+            # 上传文件的大小（文件对象已由Werkzeug缓存，可直接定位到末尾）
+            file.stream.seek(0, os.SEEK_END)
+            file_size = file.stream.tell()
+            file.stream.seek(0)
+            
+            # 流式导入：文件保留在上传目录，分块提交并记录进度，中断后可续传；
+            # 超过 STREAM_IMPORT_THRESHOLD 的文件即使未勾选也走流式导入，避免整个文件读入内存
+            if request.form.get('stream_mode') or file_size > current_app.config['STREAM_IMPORT_THRESHOLD']:
+                stored_name = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}_{filename}"
+                file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], stored_name)
+                file.save(file_path)
+                
+                try:
+                    job = create_import_job(data_type, file.filename, file_path)
+                except Exception as e:
+                    os.remove(file_path)
+                    flash(f'导入失败：{str(e)}', 'error')
+                    return redirect(url_for('main.import_data'))
+                
+                # 在后台线程池中导入，页面跳转到任务进度
+                current_app.extensions['import_jobs'].start(job.id)
+                return redirect(url_for('main.import_job', job_id=job.id))
+            
             file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
             file.save(file_path)
             
@@ -42,17 +75,13 @@ def import_data():
                 # 读取CSV文件
                 df = pd.read_csv(file_path)
                 
-                # 根据数据类型处理
-                if data_type == 'income':
-                    import_income(df)
-                elif data_type == 'expense':
-                    import_expense(df)
-                elif data_type == 'asset':
-                    import_asset(df)
-                elif data_type == 'liability':
-                    import_liability(df)
+                # 按列规范化后分块批量写入
+                count, elapsed = import_dataframe(
+                    df, data_type,
+                    chunk_size=current_app.config['IMPORT_CHUNK_SIZE']
+                )
                 
-                flash('数据导入成功！', 'success')
+                flash(f'数据导入成功！{format_throughput(count, elapsed)}', 'success')
                 
             except Exception as e:
                 flash(f'导入失败：{str(e)}', 'error')
@@ -62,368 +91,83 @@ def import_data():
                 
             return redirect(url_for('main.import_data'))
     
-    return render_template('import.html')
+    # 未完成的流式导入任务，可在页面上续传
+    unfinished_jobs = ImportJob.query.filter(
+        ImportJob.status != 'completed'
+    ).order_by(ImportJob.created_at.desc()).all()
+    
+    return render_template('import.html', unfinished_jobs=unfinished_jobs)
 
-def import_income(df):
-    """导入收入数据"""
-    for _, row in df.iterrows():
-        # 检查是否有period_type列，如果没有默认设置为'monthly'
-        period_type = row.get('period_type', 'monthly').lower()
-        # 确保period_type只能是'monthly'或'annual'
-        period_type = 'monthly' if period_type not in ['monthly', 'annual'] else period_type
-        
-        income = Income(
-            date=pd.to_datetime(row['date']).date(),
-            category=row['category'],
-            amount=float(row['amount']),
-            source=row['source'],
-            period_type=period_type,
-            description=row['description'] if 'description' in row and pd.notna(row['description']) else None
-        )
-        db.session.add(income)
-    db.session.commit()
+@main.route('/import/resume/<int:job_id>', methods=['POST'])
+def resume_import(job_id):
+    """从上次提交的字节偏移量继续流式导入（在后台执行）"""
+    job = ImportJob.query.get_or_404(job_id)
+    if job.status == 'completed':
+        flash('该导入任务已完成', 'info')
+        return redirect(url_for('main.import_data'))
+    
+    if not current_app.extensions['import_jobs'].start(job.id):
+        flash('该导入任务正在进行中', 'info')
+    return redirect(url_for('main.import_job', job_id=job.id))
 
-def import_expense(df):
-    """导入支出数据"""
-    for _, row in df.iterrows():
-        # 检查是否有period_type列，如果没有默认设置为'monthly'
-        period_type = row.get('period_type', 'monthly').lower()
-        # 确保period_type只能是'monthly'或'annual'
-        period_type = 'monthly' if period_type not in ['monthly', 'annual'] else period_type
-        
-        expense = Expense(
-            date=pd.to_datetime(row['date']).date(),
-            category=row['category'],
-            amount=float(row['amount']),
-            payer=row['payer'],
-            period_type=period_type,
-            description=row['description'] if 'description' in row and pd.notna(row['description']) else None
-        )
-        db.session.add(expense)
-    db.session.commit()
+@main.route('/import/job/<int:job_id>', methods=['GET'])
+def import_job(job_id):
+    """流式导入任务的进度页面，导入结束前轮询任务状态"""
+    job = ImportJob.query.get_or_404(job_id)
+    return render_template('import_job.html', status=import_job_status(job))
 
-def import_asset(df):
-    """导入资产数据"""
-    for _, row in df.iterrows():
-        # 检查是否有period_type列，如果没有默认设置为'monthly'
-        period_type = row.get('period_type', 'monthly').lower()
-        # 确保period_type只能是'monthly'或'annual'
-        period_type = 'monthly' if period_type not in ['monthly', 'annual'] else period_type
-        
-        asset = Asset(
-            name=row['name'],
-            type=row['type'],
-            amount=float(row['amount']),
-            owner=row['owner'],
-            update_date=pd.to_datetime(row['update_date']).date(),
-            period_type=period_type,
-            description=row['description'] if 'description' in row and pd.notna(row['description']) else None
-        )
-        db.session.add(asset)
-    db.session.commit()
+@main.route('/import/job/<int:job_id>/status', methods=['GET'])
+def import_job_status_json(job_id):
+    """流式导入任务的状态（JSON），供进度页面轮询"""
+    job = db.session.get(ImportJob, job_id)
+    if job is None:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(import_job_status(job))
 
-def import_liability(df):
-    """导入负债数据"""
-    for _, row in df.iterrows():
-        # 检查是否有period_type列，如果没有默认设置为'monthly'
-        period_type = row.get('period_type', 'monthly').lower()
-        # 确保period_type只能是'monthly'或'annual'
-        period_type = 'monthly' if period_type not in ['monthly', 'annual'] else period_type
-        
-        liability = Liability(
-            name=row['name'],
-            type=row['type'],
-            amount=float(row['amount']),
-            owner=row['owner'],
-            update_date=pd.to_datetime(row['update_date']).date(),
-            period_type=period_type,
-            description=row['description'] if 'description' in row and pd.notna(row['description']) else None
-        )
-        db.session.add(liability)
-    db.session.commit()
+def render_report_shell(template, **context):
+    """
+    渲染报表页面外壳：只用查询参数等轻量数据，不计算报表；
+    表格和图表由页面从 /api/v1 对应接口异步加载（见 base.html 中的 renderReport）
+    """
+    return render_template(
+        template,
+        year=request.args.get('year', ''),
+        period_type=request.args.get('period_type', 'all'),
+        **context
+    )
 
 @main.route('/income_statement', methods=['GET'])
 def income_statement():
     """收入利润表"""
-    # 获取所有有收入或支出数据的年份
-    all_years = set()
-    for income in Income.query.all():
-        all_years.add(income.date.year)
-    for expense in Expense.query.all():
-        all_years.add(expense.date.year)
-    all_years = sorted(list(all_years), reverse=True)
-    
-    # 默认年份为最新有数据的年份，若无数据则为当前年份
-    default_year = all_years[0] if all_years else datetime.now().year
-    year = request.args.get('year', default_year)
-    period_type = request.args.get('period_type', 'all')
-    
-    try:
-        year = int(year)
-    except ValueError:
-        year = default_year
-    
-    # 查询收入和支出，并根据period_type过滤
-    if period_type == 'all':
-        # 查询所有收入记录并按年份过滤（兼容SQLite）
-        incomes = []
-        for income in Income.query.all():
-            if income.date.year == year:
-                incomes.append(income)
-        # 查询所有支出记录并按年份过滤（兼容SQLite）
-        expenses = []
-        for expense in Expense.query.all():
-            if expense.date.year == year:
-                expenses.append(expense)
-    else:
-        # 查询所有收入记录并按年份和期间类型过滤（兼容SQLite）
-        incomes = []
-        for income in Income.query.all():
-            if income.date.year == year and income.period_type == period_type:
-                incomes.append(income)
-        # 查询所有支出记录并按年份和期间类型过滤（兼容SQLite）
-        expenses = []
-        for expense in Expense.query.all():
-            if expense.date.year == year and expense.period_type == period_type:
-                expenses.append(expense)
-    
-    # 计算总收入和总支出
-    total_income = sum(income.amount for income in incomes)
-    total_expense = sum(expense.amount for expense in expenses)
-    net_surplus = total_income - total_expense
-    
-    # 按类别汇总
-    categories = set()
-    category_data = {}
-    
-    # 处理收入
-    for income in incomes:
-        categories.add(income.category)
-        if income.category not in category_data:
-            category_data[income.category] = {'income': 0, 'expense': 0, 'surplus': 0}
-        category_data[income.category]['income'] += income.amount
-    
-    # 处理支出
-    for expense in expenses:
-        categories.add(expense.category)
-        if expense.category not in category_data:
-            category_data[expense.category] = {'income': 0, 'expense': 0, 'surplus': 0}
-        category_data[expense.category]['expense'] += expense.amount
-    
-    # 计算结余
-    for category in categories:
-        if category in category_data:
-            category_data[category]['surplus'] = category_data[category]['income'] - category_data[category]['expense']
-    
-    # 生成收入支出对比柱状图数据
-    categories_list = sorted(list(categories))
-    income_values = [category_data[cat]['income'] for cat in categories_list]
-    expense_values = [category_data[cat]['expense'] for cat in categories_list]
-    
-    # 准备Chart.js所需数据
-    chart_data = {
-        'categories': categories_list,
-        'income_values': income_values,
-        'expense_values': expense_values
-    }
-    
-    return render_template('income_statement.html',
-                           year=year,
-                           total_income=total_income,
-                           total_expense=total_expense,
-                           net_surplus=net_surplus,
-                           categories=categories_list,
-                           category_data=category_data,
-                           chart_data=chart_data)
+    return render_report_shell('income_statement.html')
 
 @main.route('/balance_sheet', methods=['GET'])
 def balance_sheet():
     """资产负债表"""
-    # 获取所有有资产或负债数据的年份
-    all_years = set()
-    for asset in Asset.query.all():
-        all_years.add(asset.update_date.year)
-    for liability in Liability.query.all():
-        all_years.add(liability.update_date.year)
-    all_years = sorted(list(all_years), reverse=True)
-    
-    # 默认年份为最新有数据的年份，若无数据则为当前年份
-    default_year = all_years[0] if all_years else datetime.now().year
-    year = request.args.get('year', default_year)
-    period_type = request.args.get('period_type', 'all')
-    
-    try:
-        year = int(year)
-    except ValueError:
-        year = default_year
-    
-    # 查询资产和负债，并根据period_type过滤（兼容SQLite）
-    assets = []
-    for asset in Asset.query.all():
-        match = False
-        if asset.update_date.year == year:
-            if period_type == 'all' or asset.period_type == period_type:
-                match = True
-        if match:
-            assets.append(asset)
-    liabilities = []
-    for liability in Liability.query.all():
-        match = False
-        if liability.update_date.year == year:
-            if period_type == 'all' or liability.period_type == period_type:
-                match = True
-        if match:
-            liabilities.append(liability)
-    
-    # 计算总资产和总负债
-    total_assets = sum(asset.amount for asset in assets)
-    total_liabilities = sum(liability.amount for liability in liabilities)
-    net_worth = total_assets - total_liabilities
-    
-    # 生成资产负债对比柱状图数据
-    # 按类型分组资产和负债
-    asset_types = {}  # type: amount
-    liability_types = {}  # type: amount
-    
-    for asset in assets:
-        if asset.type not in asset_types:
-            asset_types[asset.type] = 0
-        asset_types[asset.type] += asset.amount
-    
-    for liability in liabilities:
-        if liability.type not in liability_types:
-            liability_types[liability.type] = 0
-        liability_types[liability.type] += liability.amount
-    
-    # 准备图表数据
-    all_types = list(set(list(asset_types.keys()) + list(liability_types.keys())))
-    all_types.sort()
-    
-    asset_values = [asset_types.get(atype, 0) for atype in all_types]
-    liability_values = [liability_types.get(atype, 0) for atype in all_types]
-    
-    # 准备Chart.js所需数据
-    chart_data = {
-        'categories': all_types,
-        'asset_values': asset_values,
-        'liability_values': liability_values
-    }
-    
-    return render_template('balance_sheet.html',
-                           year=year,
-                           assets=assets,
-                           liabilities=liabilities,
-                           total_assets=total_assets,
-                           total_liabilities=total_liabilities,
-                           net_worth=net_worth,
-                           chart_data=chart_data)
+    return render_report_shell('balance_sheet.html')
 
 @main.route('/cash_flow', methods=['GET'])
 def cash_flow():
     """现金流量表"""
-    # 获取所有有收入或支出数据的年份
-    all_years = set()
-    for income in Income.query.all():
-        all_years.add(income.date.year)
-    for expense in Expense.query.all():
-        all_years.add(expense.date.year)
-    all_years = sorted(list(all_years), reverse=True)
-    
-    # 默认年份为最新有数据的年份，若无数据则为当前年份
-    default_year = all_years[0] if all_years else datetime.now().year
-    year = request.args.get('year', default_year)
-    period_type = request.args.get('period_type', 'all')
-    
-    try:
-        year = int(year)
-    except ValueError:
-        year = default_year
-    
-    # 查询收入和支出，并根据period_type过滤（兼容SQLite）
-    incomes = []
-    for income in Income.query.all():
-        match = False
-        if income.date.year == year:
-            if period_type == 'all' or income.period_type == period_type:
-                match = True
-        if match:
-            incomes.append(income)
-    expenses = []
-    for expense in Expense.query.all():
-        match = False
-        if expense.date.year == year:
-            if period_type == 'all' or expense.period_type == period_type:
-                match = True
-        if match:
-            expenses.append(expense)
-    
-    # 组织现金流量项目
-    cash_flow_items = []
-    
-    for income in incomes:
-        cash_flow_items.append({
-            'date': income.date,
-            'type': 'income',
-            'category': income.category,
-            'amount': income.amount
-        })
-    
-    for expense in expenses:
-        cash_flow_items.append({
-            'date': expense.date,
-            'type': 'expense',
-            'category': expense.category,
-            'amount': expense.amount
-        })
-    
-    # 按日期排序
-    cash_flow_items.sort(key=lambda x: x['date'])
-    
-    # 计算现金流量
-    operating_inflow = sum(item['amount'] for item in cash_flow_items if item['type'] == 'income')
-    operating_outflow = sum(item['amount'] for item in cash_flow_items if item['type'] == 'expense')
-    net_operating_flow = operating_inflow - operating_outflow
-    
-    # 生成现金流量对比柱状图数据
-    # 按类别分组现金流入和流出
-    inflow_by_category = {}  # category: amount
-    outflow_by_category = {}  # category: amount
-    
-    for item in cash_flow_items:
-        if item['type'] == 'income':
-            if item['category'] not in inflow_by_category:
-                inflow_by_category[item['category']] = 0
-            inflow_by_category[item['category']] += item['amount']
-        else:
-            if item['category'] not in outflow_by_category:
-                outflow_by_category[item['category']] = 0
-            outflow_by_category[item['category']] += item['amount']
-    
-    # 准备图表数据
-    all_categories = list(set(list(inflow_by_category.keys()) + list(outflow_by_category.keys())))
-    all_categories.sort()
-    
-    inflow_values = [inflow_by_category.get(cat, 0) for cat in all_categories]
-    outflow_values = [outflow_by_category.get(cat, 0) for cat in all_categories]
-    
-    # 准备Chart.js所需数据
-    chart_data = {
-        'categories': all_categories,
-        'inflow_values': inflow_values,
-        'outflow_values': outflow_values
-    }
-    
-    return render_template('cash_flow.html',
-                           year=year,
-                           cash_flow_items=cash_flow_items,
-                           operating_inflow=operating_inflow,
-                           operating_outflow=operating_outflow,
-                           net_operating_flow=net_operating_flow,
-                           chart_data=chart_data)
+    return render_report_shell('cash_flow.html')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def report_month_from_filename(filename, default_month):
+    """
+    从文件名中识别报告月份（如 2024-03.png、202403_支出.jpg、2024年3月.png）
+    :param filename: 上传的文件名
+    :param default_month: 无法识别时使用的月份，格式 YYYY-MM
+    :return: YYYY-MM 格式的月份
+    """
+    match = re.search(r'(20\d{2})\s*[-_.年]?\s*(1[0-2]|0?[1-9])(?!\d)', os.path.basename(filename))
+    if not match:
+        return default_month
+    return f"{match.group(1)}-{int(match.group(2)):02d}"
 
 @main.route('/import/image', methods=['GET', 'POST'])
 def import_image():
-    """图像OCR导入功能"""
+    """图像OCR导入功能，支持一次上传多张图像或整个文件夹"""
     # 生成当前年月默认值
     current_year_month = datetime.now().strftime('%Y-%m')
     
@@ -432,86 +176,172 @@ def import_image():
             flash('没有文件部分', 'error')
             return redirect(request.url)
         
-        file = request.files['image']
+        files = [f for f in request.files.getlist('image') if f.filename]
         report_month = request.form['report_month']
         data_type = request.form['data_type']
         owner = request.form['owner']
         
-        if file.filename == '':
+        if not files:
             flash('没有选择文件', 'error')
             return redirect(request.url)
         
-        if file and (file.filename.endswith('.jpg') or file.filename.endswith('.jpeg') or file.filename.endswith('.png')):
-            filename = secure_filename(file.filename)
-            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-            file.save(file_path)
-            
-            try:
-                # 初始化OCR客户端
-                ocr_client = LocalDeepSeekOCR(api_url="http://localhost:1234/v1/chat/completions")
-                
-                # 调用OCR分析银行分类报告
-                ocr_result = ocr_client.analyze_bank_report(
-                    image_path=file_path, 
-                    report_type=data_type  # 传入收入/支出类型
-                    # 使用默认模型 qwen/qwen3-vl-4b
-                )
-                
-                # 跳转到OCR识别预览页面，让用户确认后再导入
-                return render_template('ocr_preview.html',
-                                    raw_content=ocr_result['raw_content'],
-                                    merged_content=ocr_result['merged_content'],
-                                    categories=ocr_result['structured_data']['categories'],
-                                    report_month=report_month,
-                                    data_type=data_type,
-                                    owner=owner)
-            except Exception as e:
-                flash(f"OCR识别失败：{str(e)}", "error")
-            finally:
-                # 删除上传的文件
-                os.remove(file_path)
-                
-            return redirect(url_for('main.import_image'))
+        images = [f for f in files if f.filename.lower().endswith(IMAGE_EXTENSIONS)]
+        if not images:
+            flash('只支持JPG、PNG格式的图像', 'error')
+            return redirect(request.url)
+        
+        # 保存上传的图像，文件名加随机前缀避免同名文件互相覆盖
+        uploads = []
+        for image in images:
+            file_path = os.path.join(current_app.config['UPLOAD_FOLDER'],
+                                     f"{uuid.uuid4().hex}_{secure_filename(os.path.basename(image.filename))}")
+            image.save(file_path)
+            uploads.append((
+                image.filename,
+                file_path,
+                report_month_from_filename(image.filename, report_month) if len(images) > 1 else report_month
+            ))
+        
+        # 创建后台OCR任务后立即返回，识别在应用的任务线程池中进行
+        # 勾选"重新识别"时忽略已缓存的结果
+        batch_id, jobs = create_ocr_jobs(uploads, data_type, owner, use_cache=not request.form.get('bypass_cache'))
+        ocr_jobs = current_app.extensions['ocr_jobs']
+        for job in jobs:
+            ocr_jobs.submit(job.id)
+        
+        return redirect(url_for('main.ocr_batch', batch_id=batch_id))
     
     # GET请求，返回带有默认日期的表单
     return render_template('import_image.html', current_year_month=current_year_month)
 
+@main.route('/import/image/batch/<batch_id>', methods=['GET'])
+def ocr_batch(batch_id):
+    """OCR任务批次：全部识别结束后显示预览页面，否则显示进度并轮询状态"""
+    jobs = OCRJob.query.filter_by(batch_id=batch_id).order_by(OCRJob.id).all()
+    if not jobs:
+        flash('OCR任务不存在或已导入', 'error')
+        return redirect(url_for('main.import_image'))
+    
+    status = batch_status(jobs)
+    if not status['done']:
+        return render_template('ocr_jobs.html', batch_id=batch_id, status=status)
+    
+    if preview_expired(jobs, current_app.config['OCR_PREVIEW_TTL']):
+        flash('识别结果预览已过期，请重新上传图像', 'error')
+        OCRJob.query.filter_by(batch_id=batch_id).delete()
+        db.session.commit()
+        return redirect(url_for('main.import_image'))
+    
+    results = []
+    for job in jobs:
+        ocr_result = json.loads(job.result) if job.result else {}
+        results.append({
+            'job_id': job.id,
+            'filename': job.filename,
+            'report_month': job.report_month,
+            'error': job.error,
+            'raw_content': ocr_result.get('raw_content', ''),
+            'categories': ocr_result.get('categories', [])
+        })
+    
+    if all(result['error'] for result in results):
+        for result in results:
+            flash(result['error'], 'error')
+        OCRJob.query.filter_by(batch_id=batch_id).delete()
+        db.session.commit()
+        return redirect(url_for('main.import_image'))
+    
+    # 跳转到OCR识别预览页面，让用户确认后再导入
+    return render_template('ocr_preview.html', results=results, batch_id=batch_id)
+
+@main.route('/import/image/batch/<batch_id>/status', methods=['GET'])
+def ocr_batch_status(batch_id):
+    """OCR任务批次的状态（JSON），供进度页面轮询"""
+    jobs = OCRJob.query.filter_by(batch_id=batch_id).order_by(OCRJob.id).all()
+    if not jobs:
+        return jsonify({'error': 'not found'}), 404
+    return jsonify(batch_status(jobs))
+
+@main.route('/import/image/batch/<batch_id>/events', methods=['GET'])
+def ocr_batch_events(batch_id):
+    """
+    OCR任务批次的进度事件流（SSE）：流式识别过程中逐条推送已解析的分类（category），
+    任务状态变化时推送status，全部结束后推送done
+    """
+    job_ids = [job_id for (job_id,) in db.session.query(OCRJob.id).filter_by(batch_id=batch_id).order_by(OCRJob.id)]
+    if not job_ids:
+        return jsonify({'error': 'not found'}), 404
+    runner = current_app.extensions['ocr_jobs']
+    
+    def sse(event, data):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    def events():
+        sent = dict.fromkeys(job_ids, 0)
+        statuses = {}
+        version = None
+        while True:
+            jobs = OCRJob.query.filter(OCRJob.id.in_(job_ids)).order_by(OCRJob.id).all()
+            for job in jobs:
+                categories = runner.partial_categories(job.id)
+                for category in categories[sent[job.id]:]:
+                    yield sse('category', {'job_id': job.id, 'category': category})
+                sent[job.id] = max(sent[job.id], len(categories))
+                if statuses.get(job.id) != job.status:
+                    statuses[job.id] = job.status
+                    yield sse('status', {'job_id': job.id, 'status': job.status})
+            
+            if not jobs or all(job.finished for job in jobs):
+                yield sse('done', batch_status(jobs))
+                return
+            
+            # 结束本次读取的事务，等待工作线程的新结果；任务开始运行不会唤醒，超时后重新查询状态
+            # 并发送注释行保持连接
+            db.session.rollback()
+            new_version = runner.wait_for_update(version, timeout=2)
+            if new_version == version:
+                yield ': keepalive\n\n'
+            version = new_version
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @main.route('/confirm_ocr_import', methods=['POST'])
 def confirm_ocr_import():
-    """确认OCR识别结果并导入"""
+    """
+    确认OCR识别结果并导入（可包含多张图像的识别结果）
+    表单只提交批次ID（预览令牌）、各图像的报告月份和选中项，分类直接读取任务记录中保存的解析结果
+    """
     from app.models import Income, Expense
     
-    # 获取表单参数
-    merged_content = request.form['merged_content']
-    report_month = request.form['report_month']
-    data_type = request.form['data_type']
-    owner = request.form['owner']
-    selected_items = request.form.getlist('selected_items')
+    batch_id = request.form.get('batch_id', '')
+    jobs = OCRJob.query.filter_by(batch_id=batch_id).order_by(OCRJob.id).all()
+    if (not jobs or not batch_status(jobs)['done']
+            or preview_expired(jobs, current_app.config['OCR_PREVIEW_TTL'])):
+        flash('识别结果预览不存在或已过期，请重新上传图像', 'error')
+        return redirect(url_for('main.import_image'))
     
-    # 重新解析OCR结果
-    from app.utils.ocr import LocalDeepSeekOCR
-    ocr_client = LocalDeepSeekOCR()
+    data_type = jobs[0].data_type
+    owner = jobs[0].owner
+    # 选中项的值为 "任务ID:分类序号"
+    selected_items = set(request.form.getlist('selected_items'))
     
     try:
-        # 检查是否为HTML内容
-        if '<table>' in merged_content:
-            # 直接解析HTML表格
-            structured_data = ocr_client.parse_html_table(merged_content, report_type=data_type)
-            if not structured_data:
-                flash(f"HTML表格解析失败", "error")
-                return redirect(url_for('main.import_image'))
-        else:
-            # 解析合并后的内容（普通文本）
-            structured_data = ocr_client.parse_category_report(merged_content, report_type=data_type)
-        
-        # 只导入用户选择的项
-        imported_count = 0
-        for i, category in enumerate(structured_data['categories']):
-            if str(i) in selected_items:
-                report_date = pd.to_datetime(f"{report_month}-01").date()
+        records = []
+        summary_deltas = {}
+        for job in jobs:
+            if job.status != 'completed':
+                continue
+            report_month = request.form.get(f'report_month_{job.id}') or job.report_month
+            report_date = pd.to_datetime(f"{report_month}-01").date()
+            
+            # 只导入用户选择的项
+            for i, category in enumerate(json.loads(job.result)['categories']):
+                if f"{job.id}:{i}" not in selected_items:
+                    continue
                 
                 if data_type == "income":
-                    income = Income(
+                    record = Income(
                         date=report_date,
                         category=category["category_name"],
                         amount=float(category["amount"]),
@@ -519,9 +349,8 @@ def confirm_ocr_import():
                         period_type='monthly',
                         description=f"OCR识别：{report_month} {data_type}分类汇总"
                     )
-                    db.session.add(income)
                 elif data_type == "expense":
-                    expense = Expense(
+                    record = Expense(
                         date=report_date,
                         category=category["category_name"],
                         amount=float(category["amount"]),
@@ -529,99 +358,51 @@ def confirm_ocr_import():
                         period_type='monthly',
                         description=f"OCR识别：{report_month} {data_type}分类汇总"
                     )
-                    db.session.add(expense)
-                
-                imported_count += 1
+                else:
+                    continue
+                records.append(record)
+                item_deltas(data_type, record, 1, summary_deltas)
         
-        # 提交到数据库
+        db.session.add_all(records)
+        # 同步月度汇总，与删除批次的任务记录在同一事务中提交；
+        # 删除数与读取时不一致说明该批次已被另一个请求导入
+        apply_deltas(data_type, summary_deltas)
+        bump_data_version()
+        if OCRJob.query.filter_by(batch_id=batch_id).delete() != len(jobs):
+            raise ValueError("该批次已导入")
         db.session.commit()
-        flash(f"成功导入 {imported_count} 个分类记录！", "success")
+        flash(f"成功导入 {len(records)} 个分类记录！", "success")
         
     except Exception as e:
         db.session.rollback()
         flash(f"导入失败：{str(e)}", "error")
     
     return redirect(url_for('main.data_list', data_type=data_type))
-    
-    # GET请求，返回带有默认日期的表单
-    return render_template('import_image.html', current_year_month=current_year_month)
 
 @main.route('/data_list', methods=['GET'])
 def data_list():
-    """详细数据列表页面"""
-    from app.models import Income, Expense, Asset, Liability
-    
+    """详细数据列表页面（按日期倒序键集分页，筛选在SQL中完成）"""
     # 获取筛选参数
     data_type = request.args.get('data_type', 'all')
     year_filter = request.args.get('year', 'all')
     source_filter = request.args.get('source', 'all')
-    
-    # 根据数据类型查询数据
-    if data_type == 'income':
-        data_items = Income.query.all()
-    elif data_type == 'expense':
-        data_items = Expense.query.all()
-    elif data_type == 'asset':
-        data_items = Asset.query.all()
-    elif data_type == 'liability':
-        data_items = Liability.query.all()
-    else:
-        # 查询所有类型数据
-        data_items = []
-        data_items.extend(Income.query.all())
-        data_items.extend(Expense.query.all())
-        data_items.extend(Asset.query.all())
-        data_items.extend(Liability.query.all())
-    
-    # 计算可用的年份列表
-    available_years = set()
-    for item in data_items:
-        if hasattr(item, 'date'):
-            available_years.add(str(item.date.year))
-        elif hasattr(item, 'update_date'):
-            available_years.add(str(item.update_date.year))
-    available_years = sorted(list(available_years), reverse=True)
-    
-    # 计算可用的来源/支付人/所有者列表
-    available_sources = set()
-    for item in data_items:
-        if hasattr(item, 'source'):
-            available_sources.add(item.source)
-        elif hasattr(item, 'payer'):
-            available_sources.add(item.payer)
-        elif hasattr(item, 'owner'):
-            available_sources.add(item.owner)
-    available_sources = sorted(list(available_sources))
-    
-    # 应用年份筛选
-    if year_filter != 'all':
-        filtered_items = []
-        for item in data_items:
-            try:
-                if hasattr(item, 'date'):
-                    if str(item.date.year) == year_filter:
-                        filtered_items.append(item)
-                elif hasattr(item, 'update_date'):
-                    if str(item.update_date.year) == year_filter:
-                        filtered_items.append(item)
-            except:
-                continue
-        data_items = filtered_items
-    
-    # 应用来源/支付人/所有者筛选
-    if source_filter != 'all':
-        filtered_items = []
-        for item in data_items:
-            if hasattr(item, 'source'):
-                if item.source == source_filter:
-                    filtered_items.append(item)
-            elif hasattr(item, 'payer'):
-                if item.payer == source_filter:
-                    filtered_items.append(item)
-            elif hasattr(item, 'owner'):
-                if item.owner == source_filter:
-                    filtered_items.append(item)
-        data_items = filtered_items
+    per_page = request.args.get('per_page', current_app.config['DATA_LIST_PAGE_SIZE'], type=int)
+    per_page = min(max(per_page, 1), MAX_PAGE_SIZE)
+    
+    kinds = [data_type] if data_type in KIND_ORDER else KIND_ORDER
+    
+    # 可用的年份和来源/支付人/所有者列表
+    available_years, available_sources = available_filters(kinds)
+    available_years = [str(year) for year in available_years]
+    
+    data_items, previous_cursor, next_cursor = ledger_page(
+        kinds,
+        year=int(year_filter) if year_filter.isdigit() else None,
+        source=None if source_filter == 'all' else source_filter,
+        per_page=per_page,
+        after=request.args.get('after'),
+        before=request.args.get('before')
+    )
     
     return render_template(
         'data_list.html', 
@@ -630,106 +411,58 @@ def data_list():
         available_years=available_years,
         selected_year=year_filter,
         available_sources=available_sources,
-        selected_source=source_filter
+        selected_source=source_filter,
+        per_page=per_page,
+        page_sizes=PAGE_SIZE_CHOICES,
+        previous_cursor=previous_cursor,
+        next_cursor=next_cursor
     )
 
 @main.route('/expense_analysis', methods=['GET'])
 def expense_analysis():
-    """支出分析页面"""
-    # 获取当前年份
-    current_year = datetime.now().year
-    
-    # 获取所有有支出记录的年份（兼容SQLite）
-    all_expense_years = set()
-    for expense in Expense.query.all():
-        all_expense_years.add(expense.date.year)
+    """支出分析页面（分类规则随页面渲染，汇总和图表异步加载）"""
+    classifications = ExpenseClassification.query.order_by(
+        ExpenseClassification.bucket, ExpenseClassification.category
+    ).all()
+    
+    return render_report_shell('expense_analysis.html',
+                               classifications=classifications,
+                               expense_buckets=EXPENSE_BUCKETS)
+
+@main.route('/expense_analysis/classification', methods=['POST'])
+def expense_classification():
+    """维护支出分析的分类规则"""
+    category = request.form.get('category', '').strip()
+    bucket = request.form.get('bucket', '')
+    action = request.form.get('action', 'save')
     
-    # 计算最新有数据的年份
-    latest_year = max(all_expense_years) if all_expense_years else current_year
+    if not category:
+        flash('请输入支出类别', 'error')
+        return redirect(url_for('main.expense_analysis'))
     
-    # 默认年份为最新有数据的年份
-    year = request.args.get('year', latest_year)
+    rule = ExpenseClassification.query.filter_by(category=category).first()
     
     try:
-        year = int(year)
-    except ValueError:
-        year = latest_year
-    
-    # 查询所有支出记录
-    expenses = Expense.query.all()
-    # 按年份过滤
-    filtered_expenses = []
-    for expense in expenses:
-        if expense.date.year == year:
-            filtered_expenses.append(expense)
-    expenses = filtered_expenses
-    
-    # 聚合支出到三个主要类别
-    aggregated_expenses = {
-        'rent_mortgage': 0,  # 房租房贷
-        'repayments': 0,     # 还款（转账给他人、转账给自己）
-        'consumption': 0,    # 消费（其他所有）
-        'consumption_details': {}  # 消费分类明细
-    }
-    
-    # 定义分类规则
-    for expense in expenses:
-        category = expense.category.strip()  # 去除类别名称中的空格
-        amount = expense.amount
-        
-        if category in ['房租', '房贷','房租房贷']:
-            aggregated_expenses['rent_mortgage'] += amount
-        elif category in ['还款', '转账给他人', '转账给自己']:
-            aggregated_expenses['repayments'] += amount
+        if action == 'delete':
+            if rule:
+                db.session.delete(rule)
+            flash(f'已删除分类规则：{category}（将归为消费）', 'success')
+        elif bucket in dict(EXPENSE_BUCKETS):
+            if rule:
+                rule.bucket = bucket
+            else:
+                db.session.add(ExpenseClassification(category=category, bucket=bucket))
+            flash(f'已保存分类规则：{category} → {dict(EXPENSE_BUCKETS)[bucket]}', 'success')
         else:
-            aggregated_expenses['consumption'] += amount
-            # 记录消费分类明细
-            if category not in aggregated_expenses['consumption_details']:
-                aggregated_expenses['consumption_details'][category] = 0
-            aggregated_expenses['consumption_details'][category] += amount
-    
-    # 准备消费分类饼图数据 - 使用三个主要聚合类别
-    pie_labels = ['房租房贷', '还款', '消费']
-    pie_values = [
-        aggregated_expenses['rent_mortgage'],
-        aggregated_expenses['repayments'],
-        aggregated_expenses['consumption']
-    ]
-    
-    pie_chart_data = {
-        'labels': pie_labels,
-        'values': pie_values
-    }
-    
-    # 准备年度消费变化曲线数据
-    # 准备年度消费变化曲线数据
-    # 获取所有有支出记录的年份（兼容SQLite），用于趋势图
-    trend_years_with_expenses = sorted(all_expense_years)  # 按升序排列
-    
-    # 下拉菜单的年份列表：只显示有数据的年份，降序
-    dropdown_years = sorted(all_expense_years, reverse=True) if all_expense_years else [current_year]
-    
-    annual_consumption = []
-    for y in trend_years_with_expenses:
-        # 查询该年份的支出记录（兼容SQLite）
-        year_expenses = []
-        for expense in Expense.query.all():
-            if expense.date.year == y:
-                year_expenses.append(expense)
-        total = sum(exp.amount for exp in year_expenses if exp.category not in ['房租', '房贷','房租房贷', '还款','转账给他人', '转账给自己'])
-        annual_consumption.append(total)
-    
-    trend_chart_data = {
-        'years': trend_years_with_expenses,
-        'values': annual_consumption
-    }
+            flash('无效的分析大类', 'error')
+            return redirect(url_for('main.expense_analysis'))
+        bump_data_version()
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        flash(f'分类规则保存失败：{str(e)}', 'error')
     
-    return render_template('expense_analysis.html',
-                           year=year,
-                           aggregated_expenses=aggregated_expenses,
-                           pie_chart_data=pie_chart_data,
-                           trend_chart_data=trend_chart_data,
-                           years_with_expenses=dropdown_years)
+    return redirect(url_for('main.expense_analysis'))
 
 @main.route('/edit_data', methods=['POST'])
 def edit_data():
@@ -747,6 +480,7 @@ def edit_data():
     if data_type == 'income':
         item = Income.query.get(id)
         if item:
+            summary_deltas = item_deltas(data_type, item, -1)
             item.date = pd.to_datetime(date).date()
             item.category = category
             item.amount = float(amount)
@@ -755,6 +489,7 @@ def edit_data():
     elif data_type == 'expense':
         item = Expense.query.get(id)
         if item:
+            summary_deltas = item_deltas(data_type, item, -1)
             item.date = pd.to_datetime(date).date()
             item.category = category
             item.amount = float(amount)
@@ -763,6 +498,7 @@ def edit_data():
     elif data_type == 'asset':
         item = Asset.query.get(id)
         if item:
+            summary_deltas = item_deltas(data_type, item, -1)
             item.update_date = pd.to_datetime(date).date()
             item.type = category
             item.amount = float(amount)
@@ -771,12 +507,21 @@ def edit_data():
     elif data_type == 'liability':
         item = Liability.query.get(id)
         if item:
+            summary_deltas = item_deltas(data_type, item, -1)
             item.update_date = pd.to_datetime(date).date()
             item.type = category
             item.amount = float(amount)
             item.owner = request.form['owner']
             item.description = description
     
+    if item:
+        # 类型或所有者变化后归入对应的持有项
+        if data_type in ('asset', 'liability'):
+            assign_holding(data_type, item)
+        # 移除旧值、加入新值，同步月度汇总
+        apply_deltas(data_type, item_deltas(data_type, item, 1, summary_deltas))
+        bump_data_version(rewrite=True)
+    
     try:
         db.session.commit()
         flash('数据更新成功！', 'success')
@@ -806,7 +551,9 @@ def delete_data():
     
     if item:
         try:
+            apply_deltas(data_type, item_deltas(data_type, item, -1))
             db.session.delete(item)
+            bump_data_version(rewrite=True)
             db.session.commit()
             flash('数据删除成功！', 'success')
         except Exception as e:
@@ -861,6 +608,8 @@ def data_cleanup():
                 ).delete()
                 count += expense_count
                 
+                rebuild_monthly_summary(['income', 'expense'])
+                bump_data_version(rewrite=True)
                 db.session.commit()
                 flash(f'成功清理 {count} 条OCR导入记录', 'success')
                 
@@ -902,6 +651,8 @@ def data_cleanup():
                     )
                 
                 count = query.delete()
+                rebuild_monthly_summary([record_type])
+                bump_data_version(rewrite=True)
                 db.session.commit()
                 flash(f'成功清理 {count} 条记录', 'success')
                 
@@ -917,328 +668,41 @@ def data_cleanup():
 @main.route('/financial_health', methods=['GET'])
 def financial_health():
     """财务健康分析"""
-    # 获取所有有数据的年份（收入、支出、资产、负债）
-    all_years = set()
-    for income in Income.query.all():
-        all_years.add(income.date.year)
-    for expense in Expense.query.all():
-        all_years.add(expense.date.year)
-    for asset in Asset.query.all():
-        all_years.add(asset.update_date.year)
-    for liability in Liability.query.all():
-        all_years.add(liability.update_date.year)
-    all_years = sorted(list(all_years), reverse=True)
-    
-    # 默认年份为最新有数据的年份，若无数据则为当前年份
-    default_year = all_years[0] if all_years else datetime.now().year
-    year = request.args.get('year', default_year)
-    try:
-        year = int(year)
-    except ValueError:
-        year = default_year
-    
-    # 计算财务指标
-    metrics = {
-            'surplus_rate': 0,
-            'debt_rate': 0,
-            'net_worth_growth': 0,
-            'cash_flow_ratio': 0,
-            'roe': 0
-        }
-    
-    # 查询当年数据
-    incomes_this_year = Income.query.filter(db.extract('year', Income.date) == year).all()
-    expenses_this_year = Expense.query.filter(db.extract('year', Expense.date) == year).all()
-    
-    # 获取当年资产数据 - 仅使用年度周期或最新的月度数据
-    assets_query_this_year = Asset.query.filter(
-        db.extract('year', Asset.update_date) == year
-    ).order_by(Asset.name, Asset.type, Asset.owner, Asset.update_date.desc())
-    
-    # 按年度周期筛选资产数据（如果有年度数据则使用，否则使用最新的月度数据）
-    assets_dict_this_year = {}
-    for asset in assets_query_this_year:
-        key = (asset.name, asset.type, asset.owner)
-        if key not in assets_dict_this_year:
-            assets_dict_this_year[key] = asset
-            # 如果是年度数据，直接跳出循环
-            if asset.period_type == 'annual':
-                continue
-    assets_this_year = list(assets_dict_this_year.values())
-    
-    # 获取当年负债数据 - 仅使用年度周期或最新的月度数据
-    liabilities_query_this_year = Liability.query.filter(
-        db.extract('year', Liability.update_date) == year
-    ).order_by(Liability.name, Liability.type, Liability.owner, Liability.update_date.desc())
-    
-    # 按年度周期筛选负债数据
-    liabilities_dict_this_year = {}
-    for liability in liabilities_query_this_year:
-        key = (liability.name, liability.type, liability.owner)
-        if key not in liabilities_dict_this_year:
-            liabilities_dict_this_year[key] = liability
-            # 如果是年度数据，直接跳出循环
-            if liability.period_type == 'annual':
-                continue
-    liabilities_this_year = list(liabilities_dict_this_year.values())
-    
-    # 查询上年数据
-    incomes_last_year = Income.query.filter(db.extract('year', Income.date) == year-1).all()
-    expenses_last_year = Expense.query.filter(db.extract('year', Expense.date) == year-1).all()
-    
-    # 获取上年资产数据
-    assets_query_last_year = Asset.query.filter(
-        db.extract('year', Asset.update_date) == year-1
-    ).order_by(Asset.name, Asset.type, Asset.owner, Asset.update_date.desc())
-    
-    assets_dict_last_year = {}
-    for asset in assets_query_last_year:
-        key = (asset.name, asset.type, asset.owner)
-        if key not in assets_dict_last_year:
-            assets_dict_last_year[key] = asset
-            if asset.period_type == 'annual':
-                continue
-    assets_last_year = list(assets_dict_last_year.values())
-    
-    # 获取上年负债数据
-    liabilities_query_last_year = Liability.query.filter(
-        db.extract('year', Liability.update_date) == year-1
-    ).order_by(Liability.name, Liability.type, Liability.owner, Liability.update_date.desc())
-    
-    liabilities_dict_last_year = {}
-    for liability in liabilities_query_last_year:
-        key = (liability.name, liability.type, liability.owner)
-        if key not in liabilities_dict_last_year:
-            liabilities_dict_last_year[key] = liability
-            if liability.period_type == 'annual':
-                continue
-    liabilities_last_year = list(liabilities_dict_last_year.values())
-    
-    # 计算当年收入和支出
-    total_income_this_year = sum(income.amount for income in incomes_this_year)
-    total_expense_this_year = sum(expense.amount for expense in expenses_this_year)
-    total_assets_this_year = sum(asset.amount for asset in assets_this_year)
-    total_liabilities_this_year = sum(liability.amount for liability in liabilities_this_year)
-    net_worth_this_year = total_assets_this_year - total_liabilities_this_year
-    
-    # 计算上年净资产
-    total_assets_last_year = sum(asset.amount for asset in assets_last_year)
-    total_liabilities_last_year = sum(liability.amount for liability in liabilities_last_year)
-    net_worth_last_year = total_assets_last_year - total_liabilities_last_year
-    
-    # 计算经营活动现金净流量
-    operating_cash_flow = total_income_this_year - total_expense_this_year
-    
-    # 计算结余率
-    if total_income_this_year > 0:
-        metrics['surplus_rate'] = (total_income_this_year - total_expense_this_year) / total_income_this_year
-    
-    # 计算偿债率
-    if total_assets_this_year > 0:
-        metrics['debt_rate'] = total_liabilities_this_year / total_assets_this_year
-    
-    # 计算净资产增长率
-        if net_worth_last_year > 0:
-            metrics['net_worth_growth'] = (net_worth_this_year - net_worth_last_year) / net_worth_last_year
+    return render_report_shell('financial_health.html')
 
-        # 计算净资产收益率 (ROE)
-        net_income_this_year = total_income_this_year - total_expense_this_year
-        average_net_worth = (net_worth_last_year + net_worth_this_year) / 2
-        if average_net_worth > 0:
-            metrics['roe'] = (net_income_this_year / average_net_worth) * 100
-        else:
-            metrics['roe'] = 0
-
-        # 计算现金流比率
-        if total_liabilities_this_year > 0:
-            metrics['cash_flow_ratio'] = operating_cash_flow / total_liabilities_this_year
-    
-    # 计算健康得分
-    health_score = 0
-    
-    # 结余率 (30%)
-    if metrics['surplus_rate'] >= 0.3:
-        health_score += 30
-    elif metrics['surplus_rate'] >= 0.1:
-        health_score += 20
-    elif metrics['surplus_rate'] >= 0:
-        health_score += 10
-    
-    # 偿债率 (30%)
-    if metrics['debt_rate'] < 0.5:
-        health_score += 30
-    elif metrics['debt_rate'] < 0.7:
-        health_score += 20
-    elif metrics['debt_rate'] < 0.85:
-        health_score += 10
-    
-    # 净资产增长率 (20%)
-    if metrics['net_worth_growth'] >= 0.1:
-        health_score += 20
-    elif metrics['net_worth_growth'] >= 0.05:
-        health_score += 15
-    elif metrics['net_worth_growth'] >= 0:
-        health_score += 10
-    
-    # 现金流比率 (20%)
-    if metrics['cash_flow_ratio'] >= 0.5:
-        health_score += 20
-    elif metrics['cash_flow_ratio'] >= 0.3:
-        health_score += 15
-    elif metrics['cash_flow_ratio'] >= 0:
-        health_score += 10
-    
-    # 确定健康等级
-    if health_score >= 80:
-        health_level = '优秀'
-    elif health_score >= 60:
-        health_level = '良好'
-    elif health_score >= 40:
-        health_level = '一般'
-    else:
-        health_level = '需要改善'
-    
-    return render_template('financial_health.html',
-                           year=year,
-                           metrics=metrics,
-                           health_score=health_score,
-                           health_level=health_level)
+@main.route('/financial_health/trend', methods=['GET'])
+def financial_health_trend():
+    """历年财务健康指标与得分趋势"""
+    return render_report_shell('financial_health_trend.html')
 
 @main.route('/dashboard', methods=['GET'])
 def dashboard():
     """仪表盘 - 财务概览与图表"""
-    from datetime import datetime
-    # 获取筛选参数
-    # 获取所有有收入或支出数据的年份
-    all_years = set()
-    for income in Income.query.all():
-        all_years.add(income.date.year)
-    for expense in Expense.query.all():
-        all_years.add(expense.date.year)
-    all_years = sorted(list(all_years), reverse=True)
-    
-    # 默认年份为最新有数据的年份，若无数据则为当前年份
-    default_year = all_years[0] if all_years else datetime.now().year
-    year = request.args.get('year', default_year)
-    year = int(year)
-    
-    month = request.args.get('month')
-    month = int(month) if month is not None and month != 'all' else None
-    
     # Calculate year range for dropdown
     current_year = datetime.now().year
     year_range = range(current_year - 5, current_year + 2)
     
-    # 构建查询条件
-    income_query = Income.query.filter(db.extract('year', Income.date) == year)
-    expense_query = Expense.query.filter(db.extract('year', Expense.date) == year)
-    
-    # 添加月份筛选
-    if month is not None:
-        income_query = income_query.filter(db.extract('month', Income.date) == month)
-        expense_query = expense_query.filter(db.extract('month', Expense.date) == month)
-    
-    # 查询数据
-    incomes = income_query.all()
-    expenses = expense_query.all()
-    
-    # 计算KPI指标
-    total_income = sum(income.amount for income in incomes)
-    total_expense = sum(expense.amount for expense in expenses)
-    net_surplus = total_income - total_expense
-    
-    # 储蓄目标进度（默认年目标12万，如果是月度则按比例调整）
-    base_savings_goal = 120000
-    savings_goal = base_savings_goal / 12 if month is not None else base_savings_goal
-    savings_progress = min((net_surplus / savings_goal) * 100, 100) if savings_goal > 0 else 0
-    
-    # 支出分类汇总
-    expense_categories = {}
-    for expense in expenses:
-        if expense.category not in expense_categories:
-            expense_categories[expense.category] = 0
-        expense_categories[expense.category] += expense.amount
-    
-    # 准备饼图数据
-    pie_data = {
-        'labels': list(expense_categories.keys()),
-        'values': list(expense_categories.values())
-    }
-    
-    # 准备收入支出对比柱状图数据
-    # 获取所有月份的数据
-    monthly_data = []
-    months = range(1, 13) if month is None else [month]
-    
-    for m in months:
-        # 计算该月份的收入和支出
-        monthly_income = sum(income.amount for income in incomes if income.date.month == m)
-        monthly_expense = sum(expense.amount for expense in expenses if expense.date.month == m)
-        
-        month_name = ['一月', '二月', '三月', '四月', '五月', '六月', '七月', '八月', '九月', '十月', '十一月', '十二月'][m-1]
-        monthly_data.append({
-            'month': month_name,
-            'income': monthly_income,
-            'expense': monthly_expense
-        })
-    
-    bar_chart_data = {
-        'months': [item['month'] for item in monthly_data],
-        'incomes': [item['income'] for item in monthly_data],
-        'expenses': [item['expense'] for item in monthly_data]
-    }
-    
-    return render_template('dashboard.html',
-                           year=year,
-                           month=month,
-                           year_range=year_range,
-                           total_income=total_income,
-                           total_expense=total_expense,
-                           net_surplus=net_surplus,
-                           savings_goal=savings_goal,
-                           savings_progress=savings_progress,
-                           pie_data=pie_data,
-                           bar_chart_data=bar_chart_data)
+    # 月份为'all'或缺省时为None（全年）
+    return render_report_shell('dashboard.html', year_range=year_range,
+                               month=request.args.get('month', type=int))
 
 
+@main.route('/settings', methods=['POST'])
+def update_settings():
+    """保存家庭设置（如年度储蓄目标），完成后返回仪表盘"""
+    try:
+        for key in SETTING_TYPES:
+            if key in request.form:
+                update_setting(key, request.form[key])
+        db.session.commit()
+        flash('设置已保存', 'success')
+    except ValueError as e:
+        db.session.rollback()
+        flash(str(e), 'error')
+    
+    return redirect(url_for('main.dashboard', year=request.form.get('year'), month=request.form.get('month')))
+
 @main.route('/comparison_chart', methods=['GET'])
 def comparison_chart():
     """生成收入支出结余对比图表"""
-    import pandas as pd
-    import os
-    
-    # 获取所有年份的数据
-    all_income = Income.query.all()
-    all_expenses = Expense.query.all()
-    
-    # 转换为DataFrame以便处理
-    income_df = pd.DataFrame([(i.date.year, i.amount) for i in all_income], columns=['year', 'amount'])
-    expense_df = pd.DataFrame([(e.date.year, e.amount) for e in all_expenses], columns=['year', 'amount'])
-    
-    # 按年份分组求和
-    income_by_year = income_df.groupby('year')['amount'].sum().reset_index()
-    expense_by_year = expense_df.groupby('year')['amount'].sum().reset_index()
-    
-    # 合并数据
-    merged_df = pd.merge(income_by_year, expense_by_year, on='year', how='outer', suffixes=('_income', '_expense'))
-    merged_df = merged_df.fillna(0)
-    merged_df = merged_df.sort_values('year')
-    
-    # 计算结余
-    merged_df['surplus'] = merged_df['amount_income'] - merged_df['amount_expense']
-    
-    # 准备图表数据
-    years = merged_df['year'].tolist()
-    incomes = merged_df['amount_income'].tolist()
-    expenses = merged_df['amount_expense'].tolist()
-    surpluses = merged_df['surplus'].tolist()
-    
-    # 准备Chart.js所需数据
-    chart_data = {
-        'years': years,
-        'incomes': incomes,
-        'expenses': expenses,
-        'surpluses': surpluses
-    }
-    
-    return render_template('comparison_chart.html', chart_data=chart_data, years=years, incomes=incomes, expenses=expenses, surpluses=surpluses)
+    return render_report_shell('comparison_chart.html')
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""报表查询索引基准测试：在合成数据上对比建索引前后的查询计划与耗时（SQLite）"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app import create_app, db
+from app.config import Config
+from app.models import Income, Expense, Asset, Liability
+from app.utils.importer import bulk_insert
+
+MODELS = [Income, Expense, Asset, Liability]
+
+# 与报表访问模式对应的查询
+REPORT_QUERIES = [
+    ('默认年份 (MAX date)',
+     "SELECT MAX(date) FROM expense"),
+    ('收入利润表：年度+期间类型',
+     "SELECT category, SUM(amount) FROM expense "
+     "WHERE date >= '2023-01-01' AND date < '2024-01-01' AND period_type = 'annual' "
+     "GROUP BY category"),
+    ('现金流量表：年度明细',
+     "SELECT id, date, category, amount FROM expense "
+     "WHERE date >= '2023-01-01' AND date < '2024-01-01'"),
+    ('单类别年度趋势',
+     "SELECT SUM(amount) FROM expense "
+     "WHERE category = '旅游' AND date >= '2023-01-01' AND date < '2024-01-01'"),
+    ('数据列表：支付人+年度',
+     "SELECT * FROM expense WHERE payer = '爱人' "
+     "AND date >= '2023-01-01' AND date < '2024-01-01' ORDER BY date LIMIT 50"),
+    ('资产负债表：年度+期间类型',
+     "SELECT type, SUM(amount) FROM asset "
+     "WHERE update_date >= '2023-01-01' AND update_date < '2024-01-01' AND period_type = 'monthly' "
+     "GROUP BY type"),
+    ('单项资产最新快照',
+     "SELECT amount FROM asset WHERE name = '账户7' AND type = '基金' AND owner = '我' "
+     "ORDER BY update_date DESC LIMIT 1"),
+    ('所有者负债：年度',
+     "SELECT SUM(amount) FROM liability WHERE owner = '共同' "
+     "AND update_date >= '2023-01-01' AND update_date < '2024-01-01'"),
+]
+
+
+def random_date(rng, start_year=2014, years=11):
+    return date(start_year, 1, 1) + timedelta(days=rng.randrange(365 * years))
+
+
+def populate(rows, seed=42):
+    """生成合成流水：rows 条支出、rows/5 条收入，以及按月的资产/负债快照"""
+    rng = random.Random(seed)
+    people = ['我', '爱人', '共同']
+    expense_categories = ['餐饮', '购物', '交通', '房租', '房贷', '还款', '旅游', '医疗', '教育', '娱乐']
+    income_categories = ['工资', '奖金', '理财', '租金']
+
+    expenses = [{
+        'date': random_date(rng),
+        'category': rng.choice(expense_categories),
+        'amount': round(rng.uniform(1, 5000), 2),
+        'payer': rng.choice(people),
+        'period_type': 'annual' if rng.random() < 0.05 else 'monthly',
+        'description': None
+    } for _ in range(rows)]
+    bulk_insert(Expense, expenses, 20000)
+    del expenses
+
+    incomes = [{
+        'date': random_date(rng),
+        'category': rng.choice(income_categories),
+        'amount': round(rng.uniform(100, 50000), 2),
+        'source': rng.choice(people),
+        'period_type': 'annual' if rng.random() < 0.05 else 'monthly',
+        'description': None
+    } for _ in range(rows // 5)]
+    bulk_insert(Income, incomes, 20000)
+    del incomes
+
+    # 每个持仓每月一条快照
+    months = [date(2014 + i // 12, i % 12 + 1, 28) for i in range(12 * 11)]
+    holdings = max(rows // 2000, 10)
+    for model, types in [(Asset, ['银行存款', '基金', '股票', '房产']), (Liability, ['房贷', '车贷', '信用卡'])]:
+        records = []
+        for h in range(holdings if model is Asset else holdings // 4):
+            name, htype, owner = f'账户{h}', types[h % len(types)], people[h % len(people)]
+            for month in months:
+                records.append({
+                    'name': name,
+                    'type': htype,
+                    'amount': round(rng.uniform(1000, 1000000), 2),
+                    'owner': owner,
+                    'update_date': month,
+                    'period_type': 'annual' if month.month == 12 else 'monthly',
+                    'description': None
+                })
+        bulk_insert(model, records, 20000)
+
+    db.session.commit()
+
+
+def set_indexes(enabled):
+    """删除或创建模型上声明的报表索引"""
+    for model in MODELS:
+        for index in model.__table__.indexes:
+            if enabled:
+                index.create(bind=db.engine, checkfirst=True)
+            else:
+                index.drop(bind=db.engine, checkfirst=True)
+    with db.engine.begin() as conn:
+        conn.exec_driver_sql('ANALYZE')
+
+
+def run_queries(repeat=5):
+    """返回每个查询的查询计划和最佳耗时（毫秒）"""
+    results = []
+    with db.engine.connect() as conn:
+        for name, sql in REPORT_QUERIES:
+            plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                conn.exec_driver_sql(sql).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append((name, plan, min(timings)))
+    return results
+
+
+def benchmark(rows):
+    db_dir = tempfile.mkdtemp()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(db_dir, 'benchmark.db')
+        UPLOAD_FOLDER = os.path.join(db_dir, 'uploads')
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+
+        start = time.perf_counter()
+        populate(rows)
+        print(f"生成 {rows:,} 条支出及相关数据，耗时 {time.perf_counter() - start:.1f} 秒")
+
+        set_indexes(False)
+        before = run_queries()
+        set_indexes(True)
+        after = run_queries()
+
+        for (name, plan_before, ms_before), (_, plan_after, ms_after) in zip(before, after):
+            speedup = ms_before / ms_after if ms_after > 0 else float('inf')
+            print('=' * 60)
+            print(f"{name}：{ms_before:.2f} ms -> {ms_after:.2f} ms（{speedup:.1f}x）")
+            print(f"  无索引：{' | '.join(plan_before)}")
+            print(f"  有索引：{' | '.join(plan_after)}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='报表查询索引基准测试')
+    parser.add_argument('--rows', type=int, default=1000000, help='合成支出记录条数')
+    args = parser.parse_args()
+    benchmark(args.rows)
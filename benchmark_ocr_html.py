@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+OCR HTML表格解析基准测试：对比标准库 html.parser 单次扫描（parse_html_table 的默认路径）
+与BeautifulSoup回退路径每次调用的耗时，并在子进程中测量首次导入 bs4 / pandas 的耗时
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+
+from app.utils.ocr import LocalDeepSeekOCR
+
+CATEGORIES = ['餐饮', '交通出行', '日用百货', '服饰装扮', '医疗健康', '休闲娱乐', '住房缴费', '转账红包', '教育培训', '投资理财']
+
+
+def make_compare_table(rng, rows):
+    """生成年度对比格式的表格（与模型对年度对比截图的输出一致）"""
+    lines = ['<table>', '<tr><td>支出项目</td><td>2023年</td><td>2024年</td></tr>',
+             '<tr><td>对比上年</td><td></td><td></td></tr>']
+    for i in range(rows):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        lines.append(f"<tr><td>{category}</td><td>{rng.uniform(10, 9000):,.2f}</td>"
+                     f"<td>{rng.uniform(10, 9000):,.2f}</td></tr>")
+    lines.append('</table>')
+    return '\n'.join(lines)
+
+
+def make_simple_table(rng, rows):
+    """生成两列格式的表格（支出项目 - 金额）"""
+    lines = ['<table>', '<tr><td>支出项目</td><td>金额(元)</td></tr>']
+    for i in range(rows):
+        lines.append(f"<tr><td>{CATEGORIES[i % len(CATEGORIES)]}</td><td>¥{rng.uniform(10, 9000):,.2f}</td></tr>")
+    lines.append('</table>')
+    return '\n'.join(lines)
+
+
+def per_call(func, html_content, number, repeat):
+    """多轮运行取最快的一轮，返回每次调用的耗时（毫秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func(html_content)
+        best = min(best, time.perf_counter() - start)
+    return best / number * 1000
+
+
+def import_time(module):
+    """在新的子进程中测量首次导入模块的耗时（毫秒），模块未安装时返回None"""
+    code = f"import time; s = time.perf_counter(); import {module}; print(time.perf_counter() - s)"
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+    return float(result.stdout) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=12, help='表格数据行数')
+    parser.add_argument('--number', type=int, default=200, help='每轮调用次数')
+    parser.add_argument('--repeat', type=int, default=5, help='运行轮数（取最快）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    ocr_client = LocalDeepSeekOCR()
+
+    def bs4_path(html_content):
+        ocr_client._parse_table_rows(ocr_client._read_first_table_bs4(html_content))
+
+    tables = [('年度对比表', make_compare_table(rng, args.rows)), ('两列表', make_simple_table(rng, args.rows))]
+    print(f"每个表格 {args.rows} 行数据，每项 {args.number} 次调用取 {args.repeat} 轮中最快的一轮")
+    print(f"{'表格':<12}{'html.parser':>14}{'BeautifulSoup':>16}{'加速':>8}")
+    for label, html_content in tables:
+        # 两条路径的解析结果必须一致
+        assert ocr_client.parse_html_table(html_content) == ocr_client._parse_table_rows(
+            ocr_client._read_first_table_bs4(html_content))
+        fast = per_call(ocr_client.parse_html_table, html_content, args.number, args.repeat)
+        slow = per_call(bs4_path, html_content, args.number, args.repeat)
+        print(f"{label:<12}{fast:>12.3f}ms{slow:>14.3f}ms{slow / fast:>7.1f}x")
+
+    print("\n首次导入耗时（新进程，不含解释器启动）：")
+    for module in ('bs4', 'pandas'):
+        elapsed = import_time(module)
+        print(f"  {module:<8}{'未安装' if elapsed is None else f'{elapsed:.0f}ms'}")
+
+
+if __name__ == '__main__':
+    main()
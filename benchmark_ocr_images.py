@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""OCR图像预处理基准测试：对比上传原图与缩放、重新编码后的图像大小、预处理耗时和模型请求耗时"""
+
+import argparse
+import io
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from app.utils.image_prep import IMAGE_MIME_TYPES, ImagePreprocessor
+from app.utils.ocr import LocalDeepSeekOCR
+
+# 视觉模型按 28x28 像素的图块编码图像，图块数近似决定prefill的视觉token数
+PATCH_PIXELS = 28 * 28
+
+CATEGORIES = ['餐饮美食', '交通出行', '日用百货', '服饰装扮', '医疗健康', '休闲娱乐', '住房缴费', '转账红包']
+
+
+def make_screenshot(path, rng, size=(1170, 2532), accent=None):
+    """生成类似手机银行分类报告截图的合成图像（白底黑字，可选彩色图标）"""
+    image = Image.new('RGB', size, (255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    y = 200
+    for category in CATEGORIES:
+        if accent:
+            draw.ellipse((60, y, 140, y + 80), fill=accent)
+        draw.text((180, y + 20), category, fill=(30, 30, 30))
+        draw.text((size[0] - 300, y + 20), f"{rng.uniform(10, 9000):,.2f}", fill=(30, 30, 30))
+        draw.line((60, y + 120, size[0] - 60, y + 120), fill=(230, 230, 230), width=2)
+        y += 260
+    image.save(path)
+
+
+def make_image_set(directory, count, seed):
+    """生成基准图像集：无彩色与带彩色图标的PNG截图，以及一张JPEG照片"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        accent = (230, 80, 60) if i % 2 else None
+        path = os.path.join(directory, f"screenshot_{i}.png")
+        make_screenshot(path, rng, accent=accent)
+        paths.append(path)
+
+    photo = os.path.join(directory, 'photo.jpg')
+    noise = Image.effect_noise((3024, 4032), 40).convert('RGB')
+    noise.save(photo, quality=92)
+    paths.append(photo)
+    return paths
+
+
+def time_requests(client, paths, repeat):
+    """逐张调用模型服务，返回每次请求的耗时（秒）"""
+    timings = []
+    for _ in range(repeat):
+        for path in paths:
+            start = time.perf_counter()
+            client.extract_raw_content(path)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--images', help='基准图像目录（默认生成合成截图）')
+    parser.add_argument('--count', type=int, default=6, help='合成截图数量')
+    parser.add_argument('--max-edge', type=int, default=1600)
+    parser.add_argument('--format', default='JPEG', choices=['JPEG', 'WEBP'])
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--no-grayscale', action='store_true')
+    parser.add_argument('--url', help='OCR服务地址，提供时额外对比请求耗时（原图 vs 预处理后）')
+    parser.add_argument('--repeat', type=int, default=3, help='每张图像请求模型的次数')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.images:
+            paths = sorted(
+                os.path.join(args.images, name) for name in os.listdir(args.images)
+                if os.path.splitext(name)[1].lower() in IMAGE_MIME_TYPES
+            )
+        else:
+            paths = make_image_set(tmpdir, args.count, args.seed)
+
+        preprocessor = ImagePreprocessor(args.max_edge, args.format, args.quality, not args.no_grayscale)
+        print(f"{'图像':<24}{'原始尺寸':>14}{'处理后尺寸':>14}{'原始大小':>12}{'处理后':>12}{'MIME':>12}{'耗时':>10}")
+        original_patches = encoded_patches = 0
+        for path in paths:
+            with Image.open(path) as image:
+                original_size = image.size
+            start = time.perf_counter()
+            data, mime_type = preprocessor.prepare(path)
+            elapsed = time.perf_counter() - start
+            with Image.open(io.BytesIO(data)) as image:
+                encoded_size = image.size
+            original_patches += original_size[0] * original_size[1] // PATCH_PIXELS
+            encoded_patches += encoded_size[0] * encoded_size[1] // PATCH_PIXELS
+            print(f"{os.path.basename(path):<24}{'%dx%d' % original_size:>14}{'%dx%d' % encoded_size:>14}"
+                  f"{os.path.getsize(path) / 1024:>10.1f}KB{len(data) / 1024:>10.1f}KB{mime_type:>12}"
+                  f"{elapsed * 1000:>8.1f}ms")
+
+        stats = preprocessor.stats()
+        ratio = stats['bytes_saved'] / stats['original_bytes'] * 100 if stats['original_bytes'] else 0
+        print(f"\n合计：{stats['original_bytes'] / 1024:.1f}KB -> {stats['encoded_bytes'] / 1024:.1f}KB，"
+              f"节省 {stats['bytes_saved'] / 1024:.1f}KB（{ratio:.1f}%，base64后同比例）")
+        print(f"视觉图块数（28x28，近似prefill的视觉token数）：{original_patches} -> {encoded_patches}")
+
+        if args.url:
+            raw = time_requests(LocalDeepSeekOCR(args.url), paths, args.repeat)
+            prepared = time_requests(
+                LocalDeepSeekOCR(args.url, preprocessor=ImagePreprocessor(
+                    args.max_edge, args.format, args.quality, not args.no_grayscale)),
+                paths, args.repeat
+            )
+            for label, timings in (('原图', raw), ('预处理', prepared)):
+                print(f"{label}：请求耗时中位数 {statistics.median(timings) * 1000:.0f}ms，"
+                      f"平均 {statistics.mean(timings) * 1000:.0f}ms（{len(timings)} 次）")
+            change = (statistics.median(prepared) - statistics.median(raw)) / statistics.median(raw) * 100
+            print(f"中位数变化：{change:+.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""OCR文本解析基准测试：在样本语料上测量 clean_raw_content、merge_lines、parse_category_report 每秒处理的行数"""
+
+import argparse
+import os
+import time
+
+from app.utils.ocr import LocalDeepSeekOCR
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example_data', 'ocr_samples')
+
+
+def load_corpus():
+    """合并 example_data/ocr_samples/ 中的全部样本"""
+    texts = []
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        if name.endswith('.txt'):
+            with open(os.path.join(SAMPLES_DIR, name), encoding='utf-8') as f:
+                texts.append(f.read())
+    return '\n'.join(texts)
+
+
+def best_rate(func, text, lines, repeat):
+    """多次运行取最快的一次，返回每秒处理的行数"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(text)
+        best = min(best, time.perf_counter() - start)
+    return lines / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--copies', type=int, default=200, help='语料重复次数')
+    parser.add_argument('--repeat', type=int, default=5, help='每项测量的运行次数（取最快）')
+    args = parser.parse_args()
+
+    ocr_client = LocalDeepSeekOCR()
+    raw_content = '\n'.join([load_corpus()] * args.copies)
+    cleaned_content = ocr_client.clean_raw_content(raw_content)
+    merged_content = ocr_client.merge_lines(cleaned_content)
+    lines = raw_content.count('\n') + 1
+
+    def pipeline(text):
+        ocr_client.parse_category_report(ocr_client.merge_lines(ocr_client.clean_raw_content(text)))
+
+    stages = [
+        ('clean_raw_content', ocr_client.clean_raw_content, raw_content),
+        ('merge_lines', ocr_client.merge_lines, cleaned_content),
+        ('parse_category_report（合并后）', ocr_client.parse_category_report, merged_content),
+        ('parse_category_report（原始文本）', ocr_client.parse_category_report, raw_content),
+        ('clean_special_chars（逐行）', lambda text: [ocr_client.clean_special_chars(line) for line in text.split('\n')],
+         raw_content),
+        ('完整流程', pipeline, raw_content),
+    ]
+
+    print(f"语料：{lines} 行（{args.copies} 份样本），每项取 {args.repeat} 次中最快的一次")
+    for label, func, text in stages:
+        print(f"{label:<36}{best_rate(func, text, lines, args.repeat):>14,.0f} 行/秒")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+OCR识别流程基准测试：在本地启动模拟的 /v1/chat/completions 服务（可配置延迟，返回预置的普通文本、
+块格式或HTML表格结果），以不同并发数调用 LocalDeepSeekOCR.analyze_bank_report，
+统计请求耗时的p50/p95、吞吐量以及各解析阶段的耗时；无需运行LM Studio
+"""
+
+import argparse
+import base64
+import functools
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.config import Config
+from app.utils.http_client import CircuitBreaker, ResilientSession
+from app.utils.ocr import LocalDeepSeekOCR
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example_data', 'ocr_samples')
+
+# 预置的模型输出：普通文本和块格式取自 example_data/ocr_samples/，HTML表格为年度对比格式
+CANNED_SAMPLES = {
+    'text': 'split_lines.txt',
+    'markdown': 'markdown_bold.txt',
+    'block': 'block_format.txt',
+}
+
+HTML_CATEGORIES = ['餐饮', '交通出行', '日用百货', '服饰装扮', '医疗健康', '休闲娱乐', '住房缴费', '转账红包']
+
+# 模拟图像的内容以 "MOCK:<输出类型>" 开头，模拟服务据此选择返回的结果
+IMAGE_MARKER = b'MOCK:'
+
+# 统计的解析阶段（LocalDeepSeekOCR 的方法名）
+STAGES = ['image_to_data_url', 'clean_raw_content', 'merge_lines', 'parse_category_report', 'parse_html_table']
+
+
+def load_canned_responses(seed):
+    """读取预置的模型输出"""
+    responses = {}
+    for kind, name in CANNED_SAMPLES.items():
+        with open(os.path.join(SAMPLES_DIR, name), encoding='utf-8') as f:
+            responses[kind] = f.read()
+
+    rng = random.Random(seed)
+    rows = ['<tr><td>支出项目</td><td>2023年</td><td>2024年</td></tr>', '<tr><td>对比上年</td><td></td><td></td></tr>']
+    for category in HTML_CATEGORIES:
+        rows.append(f"<tr><td>{category}</td><td>{rng.uniform(10, 9000):,.2f}</td>"
+                    f"<td>{rng.uniform(10, 9000):,.2f}</td></tr>")
+    responses['html'] = '<table>\n' + '\n'.join(rows) + '\n</table>'
+    return responses
+
+
+class _QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端读到 [DONE] 后直接关闭流式响应的连接，不再打印连接重置的异常
+        pass
+
+
+class MockOCRServer:
+    """
+    模拟OCR模型服务（OpenAI兼容的 /v1/chat/completions），在后台线程中运行
+    普通请求等待 latency 秒（加随机抖动）后返回完整结果；流式请求等待同样的首字延迟后
+    每 chunk_delay 秒发送 chunk_size 个字符
+    """
+
+    def __init__(self, responses, latency=0.2, jitter=0.1, chunk_size=8, chunk_delay=0.005, seed=42):
+        self.responses = responses
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.requests = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _QuietHTTPServer(('127.0.0.1', 0), self._handler_class())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/v1/chat/completions"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _delay(self):
+        with self._lock:
+            self.requests += 1
+            return self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # 保持长连接，与LM Studio一致
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                image_url = body['messages'][1]['content'][1]['image_url']['url']
+                image = base64.b64decode(image_url.split(',', 1)[1])
+                kind = image[len(IMAGE_MARKER):].split(b'\n', 1)[0].decode() if image.startswith(IMAGE_MARKER) else ''
+                content = server.responses.get(kind)
+                time.sleep(server._delay())
+
+                if content is None:
+                    self.send_error(400, f"unknown mock image: {kind!r}")
+                elif body.get('stream'):
+                    self._send_stream(content)
+                else:
+                    self._send_json({"choices": [{"message": {"content": content}}]})
+
+            def _send_json(self, data):
+                payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _send_stream(self, content):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for i in range(0, len(content), server.chunk_size):
+                    delta = {"choices": [{"delta": {"content": content[i:i + server.chunk_size]}}]}
+                    self._write_chunk(f"data: {json.dumps(delta, ensure_ascii=False)}\n\n")
+                    time.sleep(server.chunk_delay)
+                self._write_chunk('data: [DONE]\n\n')
+                self.wfile.write(b'0\r\n\r\n')
+
+            def _write_chunk(self, text):
+                data = text.encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b'\r\n')
+                self.wfile.flush()
+
+        return Handler
+
+
+class StageTimer:
+    """包装客户端实例的解析方法，记录每次调用的耗时（多线程安全）"""
+
+    def __init__(self, client, stages):
+        self.timings = {stage: [] for stage in stages}
+        self._lock = threading.Lock()
+        for stage in stages:
+            setattr(client, stage, self._wrap(stage, getattr(client, stage)))
+
+    def _wrap(self, stage, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.timings[stage].append(elapsed)
+        return timed
+
+
+def percentile(values, q):
+    """最近秩法计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def make_images(directory, kinds, count, image_bytes, seed):
+    """生成模拟图像：以输出类型标记开头，其后填充随机字节使请求体接近真实截图的大小"""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        path = os.path.join(directory, f"{i:04d}_{kind}.png")
+        with open(path, 'wb') as f:
+            f.write(IMAGE_MARKER + kind.encode() + b'\n' + rng.randbytes(image_bytes))
+        paths.append(path)
+    return paths
+
+
+def make_client(url, concurrency, stream):
+    """按应用配置创建OCR客户端（连接池大小等于并发数，不使用缓存和图像预处理）"""
+    http = ResilientSession(
+        connect_timeout=Config.OCR_CONNECT_TIMEOUT,
+        read_timeout=Config.OCR_READ_TIMEOUT,
+        max_retries=Config.OCR_MAX_RETRIES,
+        backoff=Config.OCR_RETRY_BACKOFF,
+        pool_size=concurrency,
+        breaker=CircuitBreaker(Config.OCR_BREAKER_THRESHOLD, Config.OCR_BREAKER_RESET_TIMEOUT)
+    )
+    return LocalDeepSeekOCR(api_url=url, http=http, stream=stream)
+
+
+def run_level(url, paths, concurrency, stream):
+    """
+    以给定并发数识别全部图像
+    :return: (每次请求的耗时列表, 流式时首个分类的耗时列表, 失败数, 总耗时, 各阶段耗时)
+    """
+    client = make_client(url, concurrency, stream)
+    timer = StageTimer(client, STAGES)
+    latencies, first_categories = [], []
+    errors = 0
+    lock = threading.Lock()
+
+    def analyze(path):
+        nonlocal errors
+        start = time.perf_counter()
+        first = []
+
+        def on_category(category):
+            if not first:
+                first.append(time.perf_counter() - start)
+
+        try:
+            client.analyze_bank_report(path, use_cache=False, on_category=on_category if stream else None)
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            first_categories.extend(first)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(analyze, paths))
+    wall = time.perf_counter() - start
+    client.http.session.close()
+    return latencies, first_categories, errors, wall, timer.timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--concurrency', default='1,2,4,8', help='逗号分隔的并发数')
+    parser.add_argument('--requests', type=int, default=32, help='每个并发数下的请求数')
+    parser.add_argument('--kinds', default='text,markdown,block,html',
+                        help=f"轮流使用的模型输出类型（{', '.join(list(CANNED_SAMPLES) + ['html'])}）")
+    parser.add_argument('--latency', type=float, default=0.2, help='模拟模型的响应延迟（秒，流式时为首字延迟）')
+    parser.add_argument('--jitter', type=float, default=0.1, help='延迟的随机抖动比例')
+    parser.add_argument('--stream', action='store_true', help='以流式方式接收模型输出（与 OCR_STREAM 的后台任务一致）')
+    parser.add_argument('--chunk-size', type=int, default=8, help='流式输出每段的字符数')
+    parser.add_argument('--chunk-delay', type=float, default=0.005, help='流式输出相邻两段的间隔（秒）')
+    parser.add_argument('--image-kb', type=int, default=200, help='模拟图像的大小（KB）')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    responses = load_canned_responses(args.seed)
+    kinds = args.kinds.split(',')
+    unknown = [kind for kind in kinds if kind not in responses]
+    if unknown:
+        parser.error(f"未知的输出类型：{', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    server = MockOCRServer(responses, args.latency, args.jitter, args.chunk_size, args.chunk_delay,
+                           args.seed).start()
+    stage_timings = {stage: [] for stage in STAGES}
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = make_images(tmpdir, kinds, args.requests, args.image_kb * 1024, args.seed)
+            mode = '流式' if args.stream else '普通'
+            print(f"模拟服务：{server.url}，延迟 {args.latency * 1000:.0f}ms±{args.jitter * 100:.0f}%，{mode}响应；"
+                  f"每级 {args.requests} 次请求，输出类型 {','.join(kinds)}，图像 {args.image_kb}KB")
+            header = f"{'并发':>6}{'吞吐量(次/秒)':>16}{'p50':>10}{'p95':>10}{'最大':>10}{'失败':>6}"
+            if args.stream:
+                header += f"{'首个分类p50':>14}"
+            print(header)
+            for concurrency in levels:
+                latencies, first_categories, errors, wall, timings = run_level(
+                    server.url, paths, concurrency, args.stream)
+                line = (f"{concurrency:>6}{len(latencies) / wall:>16.1f}"
+                        f"{percentile(latencies, 50) * 1000:>8.0f}ms{percentile(latencies, 95) * 1000:>8.0f}ms"
+                        f"{max(latencies, default=0) * 1000:>8.0f}ms{errors:>6}")
+                if args.stream:
+                    line += f"{percentile(first_categories, 50) * 1000:>12.0f}ms"
+                print(line)
+                for stage, values in timings.items():
+                    stage_timings[stage].extend(values)
+    finally:
+        server.stop()
+
+    print(f"\n各阶段耗时（全部并发级别合计，模拟服务共收到 {server.requests} 次请求；流式时按行增量解析，调用次数更多）：")
+    print(f"{'阶段':<24}{'调用次数':>8}{'平均':>12}{'p95':>12}")
+    for stage, values in stage_timings.items():
+        if values:
+            print(f"{stage:<24}{len(values):>8}{sum(values) / len(values) * 1000:>10.3f}ms"
+                  f"{percentile(values, 95) * 1000:>10.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+检查OCR文本解析结果：对 example_data/ocr_samples/ 中的每个OCR输出样本依次执行
+clean_raw_content、merge_lines、parse_category_report（以及逐行的 clean_special_chars），
+与 golden.json 中记录的结果逐项对比；修改解析规则后确认结果变化符合预期，再用 --update 更新
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app.utils.ocr import LocalDeepSeekOCR
+
+SAMPLES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'example_data', 'ocr_samples')
+GOLDEN_PATH = os.path.join(SAMPLES_DIR, 'golden.json')
+
+
+def load_samples():
+    """读取样本文件，文件名以 income 开头的按收入报告解析"""
+    samples = {}
+    for name in sorted(os.listdir(SAMPLES_DIR)):
+        if name.endswith('.txt'):
+            with open(os.path.join(SAMPLES_DIR, name), encoding='utf-8') as f:
+                samples[name] = f.read()
+    return samples
+
+
+def parse_sample(ocr_client, name, raw_content):
+    report_type = 'income' if name.startswith('income') else 'expense'
+    cleaned_content = ocr_client.clean_raw_content(raw_content)
+    merged_content = ocr_client.merge_lines(cleaned_content)
+    return {
+        'report_type': report_type,
+        'cleaned_content': cleaned_content,
+        'merged_content': merged_content,
+        'special_chars': [ocr_client.clean_special_chars(line) for line in raw_content.split('\n')],
+        'structured_data': ocr_client.parse_category_report(merged_content, report_type=report_type),
+        # 未经合并的原始文本也直接解析一次，覆盖块格式和多余空白的处理
+        'structured_raw': ocr_client.parse_category_report(raw_content, report_type=report_type)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--update', action='store_true', help='用当前解析结果覆盖 golden.json')
+    args = parser.parse_args()
+
+    ocr_client = LocalDeepSeekOCR()
+    results = {name: parse_sample(ocr_client, name, raw) for name, raw in load_samples().items()}
+
+    if args.update:
+        with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f"已更新 {GOLDEN_PATH}（{len(results)} 个样本）")
+        return
+
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        golden = json.load(f)
+
+    failures = 0
+    for name in sorted(set(golden) | set(results)):
+        expected, actual = golden.get(name), results.get(name)
+        if expected is None or actual is None:
+            print(f"✗ {name}：样本与 golden.json 不对应")
+            failures += 1
+            continue
+        diffs = [key for key in expected if expected[key] != actual.get(key)]
+        if diffs:
+            print(f"✗ {name}：{', '.join(diffs)} 不一致")
+            failures += 1
+        else:
+            print(f"✓ {name}：{actual['structured_data']['category_count']} 个分类")
+
+    if failures:
+        print(f"\n{failures} 个样本的解析结果与 golden.json 不一致")
+        sys.exit(1)
+    print(f"\n全部 {len(results)} 个样本与 golden.json 一致")
+
+
+if __name__ == '__main__':
+    main()
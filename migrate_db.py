@@ -1,7 +1,13 @@
 from app import create_app, db
+from app.services.summary import rebuild_monthly_summary
 
 app = create_app()
 
 with app.app_context():
     db.create_all()
     print("Database tables created successfully!")
+    
+    # 已有流水的数据库新建汇总表后需要回填
+    rebuild_monthly_summary()
+    db.session.commit()
+    print("Monthly summary rebuilt successfully!")
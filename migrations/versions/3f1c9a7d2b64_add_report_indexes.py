@@ -0,0 +1,70 @@
+"""add composite indexes for report queries
+
+Revision ID: 3f1c9a7d2b64
+Revises: 
+Create Date: 2026-10-18 10:12:41.318205
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1c9a7d2b64'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# 表名 -> [(索引名, 列)]，与 app/models.py 中的 __table_args__ 保持一致
+REPORT_INDEXES = {
+    'income': [
+        ('ix_income_date_period_type', ['date', 'period_type', 'category', 'amount']),
+        ('ix_income_category_date', ['category', 'date', 'period_type', 'amount']),
+        ('ix_income_source_date', ['source', 'date']),
+    ],
+    'expense': [
+        ('ix_expense_date_period_type', ['date', 'period_type', 'category', 'amount']),
+        ('ix_expense_category_date', ['category', 'date', 'period_type', 'amount']),
+        ('ix_expense_payer_date', ['payer', 'date']),
+    ],
+    'asset': [
+        ('ix_asset_update_date_period_type', ['update_date', 'period_type', 'type', 'amount']),
+        ('ix_asset_holding_update_date', ['name', 'type', 'owner', 'update_date']),
+        ('ix_asset_owner_update_date', ['owner', 'update_date']),
+    ],
+    'liability': [
+        ('ix_liability_update_date_period_type', ['update_date', 'period_type', 'type', 'amount']),
+        ('ix_liability_holding_update_date', ['name', 'type', 'owner', 'update_date']),
+        ('ix_liability_owner_update_date', ['owner', 'update_date']),
+    ],
+}
+
+
+def _existing_indexes(inspector, table_name):
+    return {index['name'] for index in inspector.get_indexes(table_name)}
+
+
+def upgrade():
+    # 数据表由 migrate_db.py (db.create_all) 创建；新建的库已带索引，这里只补建缺失的
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table_name, indexes in REPORT_INDEXES.items():
+        if table_name not in tables:
+            continue
+        existing = _existing_indexes(inspector, table_name)
+        for index_name, columns in indexes:
+            if index_name not in existing:
+                op.create_index(index_name, table_name, columns)
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table_name, indexes in REPORT_INDEXES.items():
+        if table_name not in tables:
+            continue
+        existing = _existing_indexes(inspector, table_name)
+        for index_name, _ in indexes:
+            if index_name in existing:
+                op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,35 @@
+"""add data_version table
+
+Revision ID: 5d8e2a7c9f13
+Revises: c47a19e5d3b2
+Create Date: 2026-10-18 15:06:51.482213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d8e2a7c9f13'
+down_revision = 'c47a19e5d3b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'data_version' in inspector.get_table_names():
+        return
+
+    data_version = op.create_table(
+        'data_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.bulk_insert(data_version, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('data_version')
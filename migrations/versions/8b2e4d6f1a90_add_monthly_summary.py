@@ -0,0 +1,75 @@
+"""add monthly_summary table
+
+Revision ID: 8b2e4d6f1a90
+Revises: 3f1c9a7d2b64
+Create Date: 2026-10-18 11:05:27.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f1a90'
+down_revision = '3f1c9a7d2b64'
+branch_labels = None
+depends_on = None
+
+
+# 数据类型 -> (表名, 日期列, 类别列, 人员列)
+LEDGERS = {
+    'income': ('income', 'date', 'category', 'source'),
+    'expense': ('expense', 'date', 'category', 'payer'),
+    'asset': ('asset', 'update_date', 'type', 'owner'),
+    'liability': ('liability', 'update_date', 'type', 'owner'),
+}
+
+SUMMARY_COLUMNS = ['kind', 'year', 'month', 'category', 'person', 'period_type', 'total', 'count']
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    if 'monthly_summary' in tables:
+        return
+
+    summary = op.create_table(
+        'monthly_summary',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('person', sa.String(length=50), nullable=False),
+        sa.Column('period_type', sa.String(length=10), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('kind', 'year', 'month', 'category', 'person', 'period_type',
+                            name='uq_monthly_summary_key')
+    )
+
+    # 从已有流水回填汇总，与 app/services/summary.py 中的 rebuild_monthly_summary 一致
+    for kind, (table_name, date_name, category_name, person_name) in LEDGERS.items():
+        if table_name not in tables:
+            continue
+        ledger = sa.table(
+            table_name,
+            sa.column('id', sa.Integer), sa.column(date_name, sa.Date),
+            sa.column(category_name, sa.String), sa.column(person_name, sa.String),
+            sa.column('period_type', sa.String), sa.column('amount', sa.Float)
+        )
+        date_column = ledger.c[date_name]
+        year = sa.cast(sa.extract('year', date_column), sa.Integer)
+        month = sa.cast(sa.extract('month', date_column), sa.Integer)
+        select = sa.select(
+            sa.literal(kind), year, month, ledger.c[category_name], ledger.c[person_name],
+            ledger.c.period_type, sa.func.sum(ledger.c.amount), sa.func.count(ledger.c.id)
+        ).group_by(
+            year, month, ledger.c[category_name], ledger.c[person_name], ledger.c.period_type
+        ).order_by(sa.func.min(ledger.c.id))
+        op.execute(summary.insert().from_select(SUMMARY_COLUMNS, select))
+
+
+def downgrade():
+    op.drop_table('monthly_summary')
@@ -0,0 +1,92 @@
+"""add holding table and holding_id on asset/liability
+
+Revision ID: a6d3f8b1c2e5
+Revises: e91b6c3a4f70
+Create Date: 2026-10-18 21:17:03.842519
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d3f8b1c2e5'
+down_revision = 'e91b6c3a4f70'
+branch_labels = None
+depends_on = None
+
+
+# 数据类型 -> 表名，与 app/services/snapshots.py 中的 HOLDINGS 一致
+HOLDING_TABLES = {
+    'asset': 'asset',
+    'liability': 'liability',
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'holding' not in tables:
+        op.create_table(
+            'holding',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('kind', sa.String(length=20), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('type', sa.String(length=50), nullable=False),
+            sa.Column('owner', sa.String(length=50), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('kind', 'name', 'type', 'owner', name='uq_holding_key')
+        )
+    holding = sa.table(
+        'holding',
+        sa.column('id', sa.Integer), sa.column('kind', sa.String), sa.column('name', sa.String),
+        sa.column('type', sa.String), sa.column('owner', sa.String), sa.column('created_at', sa.DateTime)
+    )
+
+    for kind, table_name in HOLDING_TABLES.items():
+        if table_name not in tables:
+            continue
+        if 'holding_id' not in {column['name'] for column in inspector.get_columns(table_name)}:
+            with op.batch_alter_table(table_name) as batch_op:
+                batch_op.add_column(sa.Column('holding_id', sa.Integer(), nullable=True))
+                batch_op.create_foreign_key(f'fk_{table_name}_holding_id', 'holding', ['holding_id'], ['id'])
+        index_name = f'ix_{table_name}_holding_id_update_date'
+        if index_name not in {index['name'] for index in inspector.get_indexes(table_name)}:
+            op.create_index(index_name, table_name, ['holding_id', 'update_date', 'id', 'amount'])
+
+        # 从已有快照回填持有项，与 app/services/holdings.py 中的 rebuild_holdings 一致
+        ledger = sa.table(
+            table_name,
+            sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('type', sa.String),
+            sa.column('owner', sa.String), sa.column('holding_id', sa.Integer)
+        )
+        matching = sa.select(holding.c.id).where(
+            holding.c.kind == kind, holding.c.name == ledger.c.name,
+            holding.c.type == ledger.c.type, holding.c.owner == ledger.c.owner
+        )
+        missing = sa.select(
+            sa.literal(kind), ledger.c.name, ledger.c.type, ledger.c.owner, sa.func.current_timestamp()
+        ).where(~matching.exists()).group_by(
+            ledger.c.name, ledger.c.type, ledger.c.owner
+        ).order_by(sa.func.min(ledger.c.id))
+        op.execute(holding.insert().from_select(['kind', 'name', 'type', 'owner', 'created_at'], missing))
+        op.execute(ledger.update().values(holding_id=matching.scalar_subquery()))
+
+
+def downgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for table_name in HOLDING_TABLES.values():
+        if table_name not in tables:
+            continue
+        index_name = f'ix_{table_name}_holding_id_update_date'
+        if index_name in {index['name'] for index in inspector.get_indexes(table_name)}:
+            op.drop_index(index_name, table_name=table_name)
+        foreign_keys = {foreign_key['name'] for foreign_key in inspector.get_foreign_keys(table_name)}
+        with op.batch_alter_table(table_name) as batch_op:
+            if f'fk_{table_name}_holding_id' in foreign_keys:
+                batch_op.drop_constraint(f'fk_{table_name}_holding_id', type_='foreignkey')
+            batch_op.drop_column('holding_id')
+    op.drop_table('holding')
@@ -0,0 +1,46 @@
+"""add setting table
+
+Revision ID: b8e1c4d7f2a3
+Revises: a6d3f8b1c2e5
+Create Date: 2026-10-18 22:35:48.206671
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1c4d7f2a3'
+down_revision = 'a6d3f8b1c2e5'
+branch_labels = None
+depends_on = None
+
+
+# 与 app/models.py 中的 DEFAULT_SETTINGS 一致
+DEFAULT_SETTINGS = {
+    'annual_savings_goal': '120000'
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'setting' in inspector.get_table_names():
+        return
+
+    setting = op.create_table(
+        'setting',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.String(length=200), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key')
+    )
+    op.bulk_insert(setting, [
+        {'key': key, 'value': value}
+        for key, value in DEFAULT_SETTINGS.items()
+    ])
+
+
+def downgrade():
+    op.drop_table('setting')
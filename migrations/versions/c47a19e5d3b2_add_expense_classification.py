@@ -0,0 +1,50 @@
+"""add expense_classification table
+
+Revision ID: c47a19e5d3b2
+Revises: 8b2e4d6f1a90
+Create Date: 2026-10-18 13:42:09.117350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47a19e5d3b2'
+down_revision = '8b2e4d6f1a90'
+branch_labels = None
+depends_on = None
+
+
+# 与 app/models.py 中的 DEFAULT_EXPENSE_CLASSIFICATION 一致
+DEFAULT_EXPENSE_CLASSIFICATION = {
+    '房租': 'rent_mortgage',
+    '房贷': 'rent_mortgage',
+    '房租房贷': 'rent_mortgage',
+    '还款': 'repayments',
+    '转账给他人': 'repayments',
+    '转账给自己': 'repayments'
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'expense_classification' in inspector.get_table_names():
+        return
+
+    classification = op.create_table(
+        'expense_classification',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('bucket', sa.String(length=20), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('category')
+    )
+    op.bulk_insert(classification, [
+        {'category': category, 'bucket': bucket}
+        for category, bucket in DEFAULT_EXPENSE_CLASSIFICATION.items()
+    ])
+
+
+def downgrade():
+    op.drop_table('expense_classification')
@@ -0,0 +1,30 @@
+"""add rewrite_version to data_version
+
+Revision ID: d2a7e9c4b815
+Revises: b8e1c4d7f2a3
+Create Date: 2026-10-18 23:48:26.551093
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7e9c4b815'
+down_revision = 'b8e1c4d7f2a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'rewrite_version' in {column['name'] for column in inspector.get_columns('data_version')}:
+        return
+
+    with op.batch_alter_table('data_version') as batch_op:
+        batch_op.add_column(sa.Column('rewrite_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('data_version') as batch_op:
+        batch_op.drop_column('rewrite_version')
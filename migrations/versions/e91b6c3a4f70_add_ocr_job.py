@@ -0,0 +1,48 @@
+"""add ocr_job table
+
+Revision ID: e91b6c3a4f70
+Revises: 5d8e2a7c9f13
+Create Date: 2026-10-18 18:42:10.315907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b6c3a4f70'
+down_revision = '5d8e2a7c9f13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'ocr_job' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'ocr_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('batch_id', sa.String(length=32), nullable=False),
+        sa.Column('filename', sa.String(length=200), nullable=False),
+        sa.Column('file_path', sa.String(length=300), nullable=False),
+        sa.Column('report_month', sa.String(length=7), nullable=False),
+        sa.Column('data_type', sa.String(length=20), nullable=False),
+        sa.Column('owner', sa.String(length=50), nullable=False),
+        sa.Column('use_cache', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('result', sa.Text(), nullable=True),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_ocr_job_batch_id', 'ocr_job', ['batch_id'])
+    op.create_index('ix_ocr_job_status', 'ocr_job', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_ocr_job_status', table_name='ocr_job')
+    op.drop_index('ix_ocr_job_batch_id', table_name='ocr_job')
+    op.drop_table('ocr_job')
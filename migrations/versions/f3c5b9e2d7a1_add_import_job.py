@@ -0,0 +1,43 @@
+"""add import_job table
+
+Revision ID: f3c5b9e2d7a1
+Revises: d2a7e9c4b815
+Create Date: 2026-10-18 23:41:27.508163
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c5b9e2d7a1'
+down_revision = 'd2a7e9c4b815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 流式导入任务表随流式导入功能加入模型，但早于迁移目录建立；已建表的数据库跳过
+    inspector = sa.inspect(op.get_bind())
+    if 'import_job' in inspector.get_table_names():
+        return
+
+    op.create_table(
+        'import_job',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('data_type', sa.String(length=20), nullable=False),
+        sa.Column('filename', sa.String(length=200), nullable=False),
+        sa.Column('file_path', sa.String(length=300), nullable=False),
+        sa.Column('file_size', sa.BigInteger(), nullable=False),
+        sa.Column('byte_offset', sa.BigInteger(), nullable=False),
+        sa.Column('rows_imported', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('error', sa.String(length=500), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('import_job')